@@ -1,11 +1,21 @@
-from django.contrib import admin
+from django.conf import settings
+from django.contrib import admin, messages
+from django.core.paginator import Paginator
+from django.db import DatabaseError, connections
+from django.utils.functional import cached_property
+
+from .contadores import recontar_contadores
+from .notificacoes import marcar_lidas_em_lote
 # 1. Importe os outros modelos que você quer ver no admin
 from .models import (
-    PerfilUsuario, 
-    Categoria, 
-    Noticia, 
-    InteracaoNoticia, 
-    Notificacao
+    PerfilUsuario,
+    Categoria,
+    Noticia,
+    InteracaoNoticia,
+    Notificacao,
+    EnvioNotificacao,
+    DistribuicaoFeed,
+    ResumoInteracoes,
 )
 
 # 2. Sua configuração personalizada para PerfilUsuario (continua igual)
@@ -18,6 +28,135 @@ class PerfilUsuarioAdmin(admin.ModelAdmin):
 # 3. Registre os outros modelos de forma simples
 # (Você pode criar classes personalizadas para eles depois, se quiser)
 admin.site.register(Categoria)
-admin.site.register(Noticia)
-admin.site.register(InteracaoNoticia)
-admin.site.register(Notificacao)
\ No newline at end of file
+
+
+# ===================== TABELAS GRANDES =====================
+
+def contagem_estimada(queryset):
+    """
+    Linhas do queryset segundo as estatísticas do banco, sem COUNT(*); None
+    quando não há estimativa. PostgreSQL: pg_class.reltuples sem filtro,
+    EXPLAIN com filtro. SQLite: sqlite_stat1 (depois de um ANALYZE), só sem filtro;
+    a maior contagem entre os índices da tabela, porque a de um índice parcial
+    (ex.: notif_nao_lidas_idx) é só das linhas dele.
+    """
+    conexao = connections[queryset.db]
+    tabela = queryset.model._meta.db_table
+    filtrado = bool(queryset.query.where)
+    try:
+        with conexao.cursor() as cursor:
+            if conexao.vendor == 'postgresql':
+                if filtrado:
+                    sql, params = queryset.query.sql_with_params()
+                    cursor.execute(f"EXPLAIN (FORMAT JSON) {sql}", params)
+                    return int(cursor.fetchone()[0][0]['Plan']['Plan Rows'])
+                cursor.execute("SELECT reltuples FROM pg_class WHERE oid = %s::regclass", [conexao.ops.quote_name(tabela)])
+                linha = cursor.fetchone()
+                return int(linha[0]) if linha and linha[0] >= 0 else None  # -1: tabela nunca analisada
+            if conexao.vendor == 'sqlite' and not filtrado:
+                cursor.execute(
+                    "SELECT MAX(CAST(stat AS INTEGER)) FROM sqlite_stat1 WHERE tbl = %s", [tabela]
+                )  # idx NULL (tabela sem índices) traz só o total; nos índices, o total vem primeiro
+                linha = cursor.fetchone()
+                return linha[0] if linha else None
+    except DatabaseError:  # Sem sqlite_stat1 (nunca houve ANALYZE), permissão...
+        pass
+    return None
+
+
+class PaginadorEstimado(Paginator):
+    """
+    Usa a estimativa do banco quando ela passa de ADMIN_CONTAGEM_EXATA_ATE
+    linhas; abaixo disso (ou sem estimativa), o COUNT(*) exato, que é barato.
+    """
+
+    @cached_property
+    def count(self):
+        estimada = contagem_estimada(self.object_list)
+        if estimada is None or estimada <= getattr(settings, 'ADMIN_CONTAGEM_EXATA_ATE', 10000):
+            return super().count
+        return estimada
+
+
+class TabelaGrandeAdmin(admin.ModelAdmin):
+    """
+    Changelist de tabela grande: contagem estimada e sem o segundo COUNT(*)
+    do total sem filtros. As subclasses trazem as FKs da lista com
+    list_select_related e as editam por raw_id_fields (sem <select> com a
+    tabela inteira).
+    """
+    paginator = PaginadorEstimado
+    show_full_result_count = False
+    list_per_page = 50
+    # Sem date_hierarchy: o nível de cima faz um DISTINCT por ano na tabela
+    # inteira. O filtro de data do list_filter só usa faixas fixas (hoje,
+    # 7 dias, mês, ano), resolvidas pelo índice da data.
+
+
+@admin.register(Noticia)
+class NoticiaAdmin(TabelaGrandeAdmin):
+    list_display = ("titulo", "categoria", "autor", "data_publicacao", "curtidas_count", "salvamentos_count")
+    list_select_related = ("categoria", "autor")
+    list_filter = ("categoria", "data_publicacao")  # noticia_data_idx
+    raw_id_fields = ("autor",)
+    ordering = ("-data_publicacao", "-id")
+    actions = ["recontar"]
+
+    @admin.action(description="Recontar curtidas e salvamentos")
+    def recontar(self, request, queryset):
+        atualizadas = recontar_contadores(queryset)  # Um UPDATE
+        self.message_user(request, f"{atualizadas} notícia(s) recontada(s).", messages.SUCCESS)
+
+
+@admin.register(InteracaoNoticia)
+class InteracaoNoticiaAdmin(TabelaGrandeAdmin):
+    list_display = ("usuario", "noticia", "tipo", "data_interacao")
+    list_select_related = ("usuario", "noticia")  # __str__ de cada uma
+    list_filter = ("tipo", "data_interacao")  # interacao_data_idx
+    raw_id_fields = ("usuario", "noticia")
+    ordering = ("-data_interacao", "-id")
+
+
+@admin.register(Notificacao)
+class NotificacaoAdmin(TabelaGrandeAdmin):
+    list_display = ("manchete", "usuario", "lida", "data_criacao")
+    list_select_related = ("usuario",)
+    list_filter = ("lida", "data_criacao")  # notif_data_idx
+    raw_id_fields = ("usuario", "noticia")
+    ordering = ("-data_criacao", "-id")
+    actions = ["marcar_lidas", "marcar_nao_lidas"]
+
+    def _marcar(self, request, queryset, lida):
+        alteradas = marcar_lidas_em_lote(queryset, lida)  # Um UPDATE nos contadores e outro nas notificações
+        self.message_user(request, f"{alteradas} notificação(ões) alterada(s).", messages.SUCCESS)
+
+    @admin.action(description="Marcar como lidas")
+    def marcar_lidas(self, request, queryset):
+        self._marcar(request, queryset, True)
+
+    @admin.action(description="Marcar como não lidas")
+    def marcar_nao_lidas(self, request, queryset):
+        self._marcar(request, queryset, False)
+
+
+@admin.register(EnvioNotificacao)
+class EnvioNotificacaoAdmin(admin.ModelAdmin):
+    list_display = ("noticia", "categoria", "status", "total_enviadas", "tentativas", "data_criacao", "data_conclusao")
+    list_filter = ("status",)
+    raw_id_fields = ("noticia",)
+    readonly_fields = ("ultimo_perfil_id", "total_enviadas", "tentativas", "reservado_ate", "data_conclusao")
+
+
+@admin.register(DistribuicaoFeed)
+class DistribuicaoFeedAdmin(admin.ModelAdmin):
+    list_display = ("noticia", "solicitada_em", "reservado_ate", "tentativas")
+    raw_id_fields = ("noticia",)
+    readonly_fields = ("reservado_ate", "tentativas")
+
+
+@admin.register(ResumoInteracoes)
+class ResumoInteracoesAdmin(admin.ModelAdmin):
+    list_display = ("noticia", "categoria", "tipo", "mes", "total")
+    list_filter = ("tipo", "categoria", "mes")  # resumo_categoria_mes_idx
+    raw_id_fields = ("noticia",)
+    readonly_fields = ("noticia", "categoria", "tipo", "mes", "total")  # Escrito só pelo arquivo (Echo_app/retencao.py)
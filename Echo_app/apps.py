@@ -4,3 +4,9 @@ from django.apps import AppConfig
 class EchoAppConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'Echo_app'
+
+    def ready(self):
+        # Registra os sinais do feed, das variantes de imagem, do índice de
+        # busca, das versões do cache de fragmentos, da fila de notificações,
+        # da pontuação de interesses, das notícias em alta e do cadastro
+        from . import busca, cadastro, em_alta, feed, fragmentos, imagens, interesses, notificacoes  # noqa: F401
@@ -0,0 +1,183 @@
+# Echo/Echo_app/busca.py
+
+"""
+Busca textual em Noticia (titulo + conteudo) com índice invertido.
+
+- PostgreSQL (produção): coluna gerada `busca` (tsvector, stemming em
+  português) com índice GIN, criada na migração 0008_busca_textual.
+- SQLite (dev e testes): tabela virtual FTS5 sincronizada por triggers,
+  criada aqui no sinal post_migrate. O FTS5 não tem stemmer de português;
+  usamos busca por prefixo e remoção de acentos como aproximação.
+- Outros bancos: sem índice, `icontains` em cada palavra (mais recentes
+  primeiro). Lento em tabela grande, mas a busca continua respondendo.
+
+Os resultados vêm ordenados por relevância e paginados por cursor
+(relevância, id), sem OFFSET: a página 100 custa o mesmo que a primeira.
+"""
+
+import base64
+import re
+
+from django.db import connections
+from django.db.models import Q
+from django.db.models.signals import post_migrate
+from django.dispatch import receiver
+
+from .models import Noticia
+
+RESULTADOS_POR_PAGINA = 20
+
+_PALAVRAS = re.compile(r'\w+', re.UNICODE)
+
+FTS_TABELA = 'Echo_app_noticia_fts'
+FTS_CRIAR = [
+    f"""
+    CREATE VIRTUAL TABLE IF NOT EXISTS "{FTS_TABELA}" USING fts5(
+        titulo, conteudo,
+        content='Echo_app_noticia', content_rowid='id',
+        tokenize='unicode61 remove_diacritics 2'
+    )
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS "{FTS_TABELA}_ai" AFTER INSERT ON "Echo_app_noticia" BEGIN
+        INSERT INTO "{FTS_TABELA}" (rowid, titulo, conteudo) VALUES (new.id, new.titulo, new.conteudo);
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS "{FTS_TABELA}_ad" AFTER DELETE ON "Echo_app_noticia" BEGIN
+        INSERT INTO "{FTS_TABELA}" ("{FTS_TABELA}", rowid, titulo, conteudo) VALUES ('delete', old.id, old.titulo, old.conteudo);
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS "{FTS_TABELA}_au" AFTER UPDATE OF titulo, conteudo ON "Echo_app_noticia" BEGIN
+        INSERT INTO "{FTS_TABELA}" ("{FTS_TABELA}", rowid, titulo, conteudo) VALUES ('delete', old.id, old.titulo, old.conteudo);
+        INSERT INTO "{FTS_TABELA}" (rowid, titulo, conteudo) VALUES (new.id, new.titulo, new.conteudo);
+    END
+    """,
+]
+
+# Relevância: no FTS5, bm25() é menor quanto mais relevante (título pesa 10x)
+_SQL = {
+    'sqlite': {
+        'rank': f'-bm25("{FTS_TABELA}", 10.0, 1.0)',
+        'from': f'"{FTS_TABELA}" JOIN "Echo_app_noticia" n ON n.id = "{FTS_TABELA}".rowid',
+        'match': f'"{FTS_TABELA}" MATCH %s',
+    },
+    'postgresql': {
+        'rank': "ts_rank_cd(n.busca, websearch_to_tsquery('portuguese', %s))::float8",
+        'from': '"Echo_app_noticia" n',
+        'match': "n.busca @@ websearch_to_tsquery('portuguese', %s)",
+    },
+}
+
+
+def _consulta_fts5(termo):
+    """Converte o texto do usuário numa consulta FTS5 segura: "palavra"* AND ..."""
+    return ' '.join(f'"{palavra}"*' for palavra in _PALAVRAS.findall(termo))
+
+
+def codificar_cursor(rank, pk):
+    return base64.urlsafe_b64encode(f"{rank!r}:{pk}".encode()).decode()
+
+
+def decodificar_cursor(cursor):
+    """Retorna (rank, pk) ou None se o cursor for inválido."""
+    try:
+        rank, pk = base64.urlsafe_b64decode(cursor.encode()).decode().split(':')
+        return float(rank), int(pk)
+    except (ValueError, UnicodeDecodeError):
+        return None
+
+
+def buscar(termo, categoria_id=None, cursor=None, limite=RESULTADOS_POR_PAGINA, using='default'):
+    """
+    Busca notícias por relevância.
+
+    Retorna (noticias, proximo_cursor); proximo_cursor é None na última página.
+    """
+    connection = connections[using]
+    sql = _SQL.get(connection.vendor)
+    if sql is None:
+        return _buscar_sem_indice(termo, categoria_id, cursor, limite, using)
+
+    if connection.vendor == 'sqlite':
+        termo = _consulta_fts5(termo)
+        rank_params = []
+    else:
+        rank_params = [termo]
+    if not termo.strip():
+        return [], None
+
+    where = [sql['match']]
+    params = [termo]
+    if categoria_id is not None:
+        where.append('n.categoria_id = %s')
+        params.append(categoria_id)
+
+    posicao = decodificar_cursor(cursor) if cursor else None
+    if posicao is not None:
+        rank, pk = posicao
+        where.append(f"({sql['rank']} < %s OR ({sql['rank']} = %s AND n.id < %s))")
+        params += rank_params + [rank] + rank_params + [rank, pk]
+
+    consulta = (
+        f"SELECT n.id, {sql['rank']} AS relevancia FROM {sql['from']} "
+        f"WHERE {' AND '.join(where)} ORDER BY relevancia DESC, n.id DESC LIMIT %s"
+    )
+    with connection.cursor() as c:
+        c.execute(consulta, rank_params + params + [limite + 1])
+        linhas = c.fetchall()
+
+    proximo_cursor = None
+    if len(linhas) > limite:
+        linhas = linhas[:limite]
+        pk, relevancia = linhas[-1]
+        proximo_cursor = codificar_cursor(relevancia, pk)
+
+    noticias = Noticia.objects.using(using).select_related('categoria').in_bulk([pk for pk, _ in linhas])
+    return [noticias[pk] for pk, _ in linhas if pk in noticias], proximo_cursor
+
+
+def _buscar_sem_indice(termo, categoria_id, cursor, limite, using):
+    """`buscar` nos bancos sem índice textual: todas as palavras, no título ou no conteúdo; cursor com relevância 0."""
+    palavras = _PALAVRAS.findall(termo)
+    if not palavras:
+        return [], None
+    noticias = Noticia.objects.using(using).select_related('categoria')
+    for palavra in palavras:
+        noticias = noticias.filter(Q(titulo__icontains=palavra) | Q(conteudo__icontains=palavra))
+    if categoria_id is not None:
+        noticias = noticias.filter(categoria_id=categoria_id)
+    posicao = decodificar_cursor(cursor) if cursor else None
+    if posicao is not None:
+        noticias = noticias.filter(pk__lt=posicao[1])
+
+    noticias = list(noticias.order_by('-pk')[:limite + 1])
+    proximo_cursor = None
+    if len(noticias) > limite:
+        noticias = noticias[:limite]
+        proximo_cursor = codificar_cursor(0.0, noticias[-1].pk)
+    return noticias, proximo_cursor
+
+
+@receiver(post_migrate)
+def criar_indice_sqlite(sender, using='default', **kwargs):
+    """Cria (ou recria, se uma migração apagou os triggers) o índice FTS5 no SQLite."""
+    if sender.name != 'Echo_app':
+        return
+    connection = connections[using]
+    if connection.vendor != 'sqlite':
+        return
+
+    with connection.cursor() as c:
+        c.execute(
+            "SELECT count(*) FROM sqlite_master WHERE type = 'trigger' AND name LIKE %s",
+            [f'{FTS_TABELA}_%'],
+        )
+        triggers_ok = c.fetchone()[0] == 3
+        if triggers_ok:
+            return
+        for sql in FTS_CRIAR:
+            c.execute(sql)
+        # Triggers ausentes: o índice pode estar defasado, reindexa tudo
+        c.execute(f"""INSERT INTO "{FTS_TABELA}" ("{FTS_TABELA}") VALUES ('rebuild')""")
@@ -0,0 +1,117 @@
+# Echo/Echo_app/cadastro.py
+
+"""
+Cadastro de usuários.
+
+Nome de usuário e e-mail são únicos sem diferenciar maiúsculas, garantidos
+por índices únicos funcionais no banco (migração 0017):
+
+- usuario_username_lower_unico: LOWER(username);
+- usuario_email_lower_unico: LOWER(email), só para e-mails preenchidos.
+
+Por isso o cadastro não consulta antes de inserir: tenta o INSERT e, se o
+banco recusar, só então descobre (pelos mesmos índices) qual campo repetiu.
+Dois cadastros simultâneos com o mesmo nome não passam os dois, e uma onda
+de cadastros não vira uma sequência de varreduras da tabela de usuários.
+
+O perfil e as categorias de interesse entram na mesma transação, pelo sinal
+que cria o perfil (models.criar_perfil_automaticamente); o feed é montado
+uma única vez, já com as categorias.
+
+A lista de categorias do formulário fica no cache por CATEGORIAS_SEGUNDOS
+(e é apagada quando alguma muda, no processo que mudou). Outro worker pode
+mostrar por esse tempo uma categoria já apagada, então `cadastrar` confere
+as categorias escolhidas no banco e ignora as que não existem mais.
+"""
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import IntegrityError, transaction
+from django.db.models import BooleanField
+from django.db.models.expressions import RawSQL
+from django.db.models.functions import Lower
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .models import Categoria
+
+User = get_user_model()
+
+CHAVE_CATEGORIAS = 'cadastro:categorias'
+CATEGORIAS_SEGUNDOS = 300
+
+# Literal (sem parâmetro) igual à condição do índice parcial de e-mail, para
+# que o planejador do SQLite reconheça que o índice serve
+_EMAIL_PREENCHIDO = RawSQL("email <> ''", [], output_field=BooleanField())
+
+
+class CadastroDuplicado(Exception):
+    """Nome de usuário e/ou e-mail já cadastrados (sem diferenciar maiúsculas)."""
+
+    def __init__(self, username_em_uso, email_em_uso):
+        super().__init__(username_em_uso, email_em_uso)
+        self.username_em_uso = username_em_uso
+        self.email_em_uso = email_em_uso
+
+
+def usuarios_com_username(username):
+    """Usuários com esse nome, sem diferenciar maiúsculas (pelo índice funcional)."""
+    return User.objects.alias(username_lower=Lower('username')).filter(username_lower=username.lower())
+
+
+def usuarios_com_email(email):
+    """Usuários com esse e-mail, sem diferenciar maiúsculas (pelo índice funcional parcial)."""
+    return User.objects.alias(email_lower=Lower('email')).filter(_EMAIL_PREENCHIDO, email_lower=email.lower())
+
+
+def cadastrar(username, email, password, categoria_ids=()):
+    """
+    Cria o usuário, o perfil e as categorias de interesse numa transação.
+    Categorias que não existem mais são ignoradas. Levanta CadastroDuplicado
+    se o nome ou o e-mail já existirem.
+    """
+    usuario = User(username=username, email=User.objects.normalize_email(email))
+    usuario.set_password(password)
+    try:
+        with transaction.atomic():
+            usuario._categorias_iniciais = _categorias_existentes(categoria_ids)  # Lidas por criar_perfil_automaticamente
+            usuario.save()
+    except IntegrityError:
+        # Caminho raro: só aqui consulta, pelos índices, qual campo repetiu
+        username_repetido = usuarios_com_username(username).exists()
+        email_repetido = bool(usuario.email) and usuarios_com_email(usuario.email).exists()
+        if not (username_repetido or email_repetido):
+            raise
+        raise CadastroDuplicado(username_repetido, email_repetido)
+    return usuario
+
+
+def _categorias_existentes(categoria_ids):
+    """Os ids dados que ainda existem; se faltar algum, a lista em cache deste processo está velha e sai do cache."""
+    categoria_ids = set(categoria_ids)
+    if not categoria_ids:
+        return []
+    existentes = list(Categoria.objects.filter(pk__in=categoria_ids).values_list('pk', flat=True))
+    if len(existentes) < len(categoria_ids):
+        cache.delete(CHAVE_CATEGORIAS)
+    return existentes
+
+
+def categorias_do_formulario():
+    """Todas as categorias, para os checkboxes do cadastro (cacheadas por CATEGORIAS_SEGUNDOS)."""
+    categorias = cache.get(CHAVE_CATEGORIAS)
+    if categorias is None:
+        categorias = list(Categoria.objects.order_by('pk'))
+        cache.set(CHAVE_CATEGORIAS, categorias, CATEGORIAS_SEGUNDOS)
+    return categorias
+
+
+# ===================== SINAIS =====================
+
+@receiver(post_save, sender=Categoria)
+@receiver(post_delete, sender=Categoria)
+def categoria_alterada(sender, raw=False, **kwargs):
+    if not raw:
+        # De novo após o commit: uma leitura no meio da transação recolocaria a lista antiga
+        cache.delete(CHAVE_CATEGORIAS)
+        transaction.on_commit(lambda: cache.delete(CHAVE_CATEGORIAS))
@@ -0,0 +1,69 @@
+# Echo/Echo_app/concorrencia.py
+
+"""
+Leituras independentes em paralelo para as views assíncronas.
+
+O ORM assíncrono do Django (aget, acount, ...) executa cada consulta numa
+única thread por requisição, então `asyncio.gather` sobre ele ainda faz as
+idas ao banco uma depois da outra. `em_paralelo` despacha cada leitura para
+um pool próprio de threads, cada uma com a sua conexão (persistente, via
+CONN_MAX_AGE), e espera todas juntas: a latência passa a ser a da consulta
+mais lenta, não a soma delas.
+
+Cai para execução em sequência quando paralelizar não ajuda ou não é
+seguro:
+- SQLite, que serializa os acessos de qualquer forma;
+- dentro de uma transação (ex.: TestCase), que as outras conexões não veem;
+- com CONSULTAS_CONCORRENTES = False nas settings.
+"""
+
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, close_old_connections, connections
+
+from .orcamento import medir_nesta_thread
+
+# Limita também quantas conexões extras cada processo abre no banco
+_executor = ThreadPoolExecutor(
+    max_workers=getattr(settings, 'CONSULTAS_CONCORRENTES_THREADS', 8),
+    thread_name_prefix='consultas',
+)
+
+
+def _pode_paralelizar(using=DEFAULT_DB_ALIAS):
+    conexao = connections[using]
+    return (
+        getattr(settings, 'CONSULTAS_CONCORRENTES', True)
+        and conexao.vendor != 'sqlite'
+        and not conexao.in_atomic_block
+    )
+
+
+def _executar(consulta):
+    try:
+        with medir_nesta_thread():  # Entra no orçamento de consultas da requisição
+            return consulta()
+    finally:
+        close_old_connections()  # Respeita CONN_MAX_AGE / descarta conexões com erro
+
+
+async def em_paralelo(*consultas):
+    """
+    Executa as funções síncronas (leituras independentes entre si) ao mesmo
+    tempo e retorna os resultados na mesma ordem. Exceções são propagadas.
+
+        perfil, noticias = await em_paralelo(
+            lambda: PerfilUsuario.objects.filter(usuario=user).first(),
+            lambda: list(Noticia.recomendar_para(user)),
+        )
+    """
+    if not await sync_to_async(_pode_paralelizar)():
+        return [await sync_to_async(consulta)() for consulta in consultas]
+
+    return await asyncio.gather(*(
+        sync_to_async(_executar, thread_sensitive=False, executor=_executor)(consulta)
+        for consulta in consultas
+    ))
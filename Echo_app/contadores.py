@@ -0,0 +1,148 @@
+# Echo/Echo_app/contadores.py
+
+"""
+Contadores de curtidas e salvamentos de Noticia.
+
+Os contadores são atualizados com deltas atômicos no banco
+(UPDATE ... SET curtidas_count = curtidas_count + 1), na mesma transação
+que insere ou remove a InteracaoNoticia, e tocando apenas a coluna do
+contador. Assim não há recontagem O(n) nem escrita de valor desatualizado
+quando duas requisições chegam ao mesmo tempo.
+
+Qualquer divergência (ex.: interações apagadas direto no banco) é corrigida
+em lote por `reconciliar_contadores` (comando de mesmo nome), que conta
+também os totais arquivados em ResumoInteracoes.
+
+Uma interação arquivada continua sendo do usuário: alternar de novo a
+curtida (ou o salvamento) de uma notícia antiga a desfaz (ver
+Echo_app/retencao.py), em vez de somar uma segunda.
+
+Com as tabelas particionadas no PostgreSQL, a restrição única inclui a data
+da interação e já não impede duas iguais: `alternar_interacao` serializa os
+toggles de cada (usuário, notícia) com um advisory lock da transação.
+"""
+
+from django.db import IntegrityError, connection, transaction
+from django.db.models import Count, F, OuterRef, Subquery, Sum, Value
+from django.db.models.functions import Coalesce, Greatest, Now
+
+from .estado_interacoes import invalidar_estado
+from .models import InteracaoNoticia, Noticia, ResumoInteracoes
+from .retencao import desarquivar_interacao, particionamento_ativo
+
+# Tipo de interação -> coluna do contador em Noticia
+CAMPOS_CONTADOR = {
+    'CURTIDA': 'curtidas_count',
+    'SALVAMENTO': 'salvamentos_count',
+}
+
+
+def aplicar_delta(noticia_id, tipo, delta):
+    """Soma `delta` ao contador do tipo, direto no banco e sem ficar negativo."""
+    campo = CAMPOS_CONTADOR[tipo]
+    Noticia.objects.filter(pk=noticia_id).update(**{
+        campo: Greatest(F(campo) + delta, Value(0)),
+        'atualizado_em': Now(),  # A página mostra o contador: muda o ETag/Last-Modified
+    })
+
+
+def alternar_interacao(usuario, noticia_id, tipo):
+    """
+    Adiciona a interação se ela não existe, ou remove se já existe.
+
+    Retorna uma tupla (status_interacao, nova_contagem), onde status_interacao
+    é True quando a interação passou a existir.
+    """
+    campo = CAMPOS_CONTADOR[tipo]
+
+    with transaction.atomic():
+        if particionamento_ativo():
+            with connection.cursor() as cursor:
+                cursor.execute("SELECT pg_advisory_xact_lock(hashtextextended(%s, 0))", [f"interacao:{usuario.pk}:{noticia_id}"])
+        removidas, _ = InteracaoNoticia.objects.filter(
+            usuario=usuario, noticia_id=noticia_id, tipo=tipo
+        ).delete()
+
+        if removidas or desarquivar_interacao(usuario.pk, noticia_id, tipo):
+            status_interacao = False
+            aplicar_delta(noticia_id, tipo, -1)
+        else:
+            status_interacao = True
+            try:
+                with transaction.atomic():  # Savepoint: outra requisição pode ter criado antes
+                    InteracaoNoticia.objects.create(usuario=usuario, noticia_id=noticia_id, tipo=tipo)
+            except IntegrityError:
+                pass  # Já existe: o contador foi incrementado por quem criou
+            else:
+                aplicar_delta(noticia_id, tipo, 1)
+
+        nova_contagem = Noticia.objects.filter(pk=noticia_id).values_list(campo, flat=True).first()
+        invalidar_estado(usuario.pk)  # Curtidas/salvas do usuário (Echo_app/estado_interacoes.py)
+
+    return status_interacao, nova_contagem
+
+
+def _contagem_real(tipo):
+    """Subquery com o número real de interações do tipo para cada notícia, arquivadas inclusive."""
+    vivas = Coalesce(
+        Subquery(
+            InteracaoNoticia.objects
+            .filter(noticia=OuterRef('pk'), tipo=tipo)
+            .order_by()
+            .values('noticia')
+            .annotate(total=Count('pk'))
+            .values('total')
+        ),
+        Value(0),
+    )
+    arquivadas = Coalesce(
+        Subquery(
+            ResumoInteracoes.objects
+            .filter(noticia=OuterRef('pk'), tipo=tipo)
+            .order_by()
+            .values('noticia')
+            .annotate(total=Sum('total'))
+            .values('total')
+        ),
+        Value(0),
+    )
+    return vivas + arquivadas
+
+
+def recontar_contadores(noticias):
+    """Recalcula curtidas e salvamentos das notícias do queryset num único UPDATE. Retorna quantas atualizou."""
+    return Noticia.objects.filter(pk__in=noticias.values('pk')).update(**{
+        campo: _contagem_real(tipo) for tipo, campo in CAMPOS_CONTADOR.items()
+    }, atualizado_em=Now())
+
+
+def reconciliar_contadores(tamanho_lote=5000):
+    """
+    Recalcula os contadores que divergem das interações registradas.
+
+    Percorre as notícias por faixas de id, para não segurar locks na tabela
+    inteira, e em cada faixa faz um UPDATE por contador apenas nas linhas
+    divergentes. Retorna {campo: linhas corrigidas}.
+    """
+    corrigidas = dict.fromkeys(CAMPOS_CONTADOR.values(), 0)
+
+    ultimo_id = 0
+    while True:
+        ids = list(
+            Noticia.objects.filter(pk__gt=ultimo_id)
+            .order_by('pk')
+            .values_list('pk', flat=True)[:tamanho_lote]
+        )
+        if not ids:
+            break
+        ultimo_id = ids[-1]
+
+        faixa = Noticia.objects.filter(pk__gte=ids[0], pk__lte=ultimo_id)
+        for tipo, campo in CAMPOS_CONTADOR.items():
+            divergentes = faixa.annotate(real=_contagem_real(tipo)).exclude(**{campo: F('real')})
+            with transaction.atomic():
+                corrigidas[campo] += Noticia.objects.filter(
+                    pk__in=divergentes.values('pk')
+                ).update(**{campo: _contagem_real(tipo), 'atualizado_em': Now()})
+
+    return corrigidas
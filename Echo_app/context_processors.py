@@ -0,0 +1,19 @@
+# Echo/Echo_app/context_processors.py
+
+from django.utils.functional import SimpleLazyObject
+
+from .notificacoes import nao_lidas
+
+
+def notificacoes(request):
+    """
+    `notificacoes_nao_lidas` para o sino do cabeçalho. Lê o contador do
+    perfil (sem COUNT) e só consulta se o template usar a variável.
+    """
+    def contar():
+        usuario = getattr(request, 'user', None)
+        if usuario is None or not usuario.is_authenticated:
+            return 0
+        return nao_lidas(usuario.pk)
+
+    return {'notificacoes_nao_lidas': SimpleLazyObject(contar)}
@@ -0,0 +1,141 @@
+# Echo/Echo_app/em_alta.py
+
+"""
+Notícias em alta (a seção "urgentes" do dashboard).
+
+Cada curtida ou salvamento confirmado soma seu peso (os mesmos PESOS de
+Echo_app/interesses.py) ao balde de BALDE minutos da notícia em
+AtividadeNoticia, com um único INSERT ... ON CONFLICT DO UPDATE. Desfazer
+a interação subtrai do balde em que ela tinha entrado.
+
+A pontuação em alta é a atividade por hora em três janelas, ponderada:
+
+    Σ PESOS_JANELAS[h] · pontos das últimas h horas / h,   h ∈ {1, 6, 24}
+
+A janela curta pega o que está subindo agora; a longa dá estabilidade.
+
+O ranking (ids das TAMANHO_RANKING primeiras, completado pelas mais
+recentes quando há pouca atividade) sai de uma agregação sobre os baldes
+das últimas 24h e fica no cache por EM_ALTA_INTERVALO segundos: é o mesmo
+para todos os usuários. O dashboard busca as notícias do topo numa
+consulta por pk e tira as já recomendadas em Python.
+
+Baldes mais antigos que a janela longa não entram na conta; o comando
+`podar_atividade` os apaga.
+"""
+
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connection, transaction
+from django.db.models import Q, Sum, Value
+from django.db.models.functions import Coalesce
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from django.utils import timezone
+
+from .interesses import PESOS
+from .models import AtividadeNoticia, InteracaoNoticia, Noticia
+
+BALDE = timedelta(minutes=10)
+PESOS_JANELAS = {1: 0.5, 6: 0.3, 24: 0.2}  # Horas da janela -> peso na pontuação
+JANELA_LONGA = timedelta(hours=max(PESOS_JANELAS))
+TAMANHO_RANKING = 50  # Notícias guardadas no ranking compartilhado
+CHAVE_CACHE = 'em_alta:ranking'
+
+
+def intervalo():
+    return getattr(settings, 'EM_ALTA_INTERVALO', 60)
+
+
+def inicio_do_balde(instante):
+    """Início do balde de BALDE minutos que contém `instante`."""
+    epoca = instante.replace(minute=0, second=0, microsecond=0)
+    return epoca + (instante - epoca) // BALDE * BALDE
+
+
+# ===================== ATIVIDADE =====================
+
+def _sql_upsert():
+    tabela = connection.ops.quote_name(AtividadeNoticia._meta.db_table)
+    maior = 'GREATEST' if connection.vendor == 'postgresql' else 'MAX'  # MAX(a, b) escalar no SQLite
+    return (
+        f"INSERT INTO {tabela} (noticia_id, inicio, pontos) VALUES (%s, %s, %s) "
+        f"ON CONFLICT (noticia_id, inicio) DO UPDATE "
+        f"SET pontos = {maior}({tabela}.pontos + EXCLUDED.pontos, 0)"
+    )
+
+
+def registrar(noticia_id, instante, delta):
+    """Soma `delta` ao balde de `instante` da notícia (ignora baldes fora da janela longa)."""
+    if instante < timezone.now() - JANELA_LONGA:
+        return
+    inicio = inicio_do_balde(instante)
+    with connection.cursor() as cursor:
+        cursor.execute(_sql_upsert(), [noticia_id, connection.ops.adapt_datetimefield_value(inicio), delta])
+
+
+def podar(agora=None):
+    """Apaga os baldes que já saíram da janela longa. Retorna quantos apagou."""
+    agora = agora or timezone.now()
+    apagados, _ = AtividadeNoticia.objects.filter(inicio__lt=agora - JANELA_LONGA - BALDE).delete()
+    return apagados
+
+
+# ===================== RANKING =====================
+
+def consulta_ranking(agora):
+    """Ids das notícias com atividade na janela longa, da maior pontuação para a menor."""
+    pontuacao = Value(0.0)
+    for horas, peso in PESOS_JANELAS.items():
+        pontos = Coalesce(Sum('pontos', filter=Q(inicio__gte=agora - timedelta(hours=horas))), Value(0.0))
+        pontuacao += pontos * Value(peso / horas)
+    return (
+        AtividadeNoticia.objects.filter(inicio__gte=agora - JANELA_LONGA)
+        .values('noticia_id')
+        .annotate(em_alta=pontuacao)
+        .filter(em_alta__gt=0)
+        .order_by('-em_alta', '-noticia_id')
+        .values_list('noticia_id', flat=True)
+    )
+
+
+def calcular_ranking(agora=None, tamanho=TAMANHO_RANKING):
+    """Ids das TAMANHO_RANKING primeiras notícias em alta."""
+    ranking = list(consulta_ranking(agora or timezone.now())[:tamanho])
+    if len(ranking) < tamanho:
+        # Pouca atividade: completa com as mais recentes (o comportamento antigo)
+        ranking += Noticia.objects.exclude(pk__in=ranking).order_by('-data_publicacao', '-id').values_list(
+            'pk', flat=True
+        )[:tamanho - len(ranking)]
+    return ranking
+
+
+def ranking():
+    """Ranking compartilhado, recalculado no máximo a cada EM_ALTA_INTERVALO segundos."""
+    ids = cache.get(CHAVE_CACHE)
+    if ids is None:
+        ids = calcular_ranking()
+        cache.set(CHAVE_CACHE, ids, intervalo())
+    return ids
+
+
+def noticias_em_alta(quantidade):
+    """As `quantidade` primeiras notícias do ranking, na ordem do ranking (uma consulta)."""
+    ids = ranking()[:quantidade]
+    noticias = Noticia.objects.select_related('categoria').in_bulk(ids)
+    return [noticias[pk] for pk in ids if pk in noticias]
+
+
+# ===================== SINAIS =====================
+
+@receiver(post_save, sender=InteracaoNoticia)
+def interacao_criada(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        transaction.on_commit(lambda: registrar(instance.noticia_id, instance.data_interacao, PESOS[instance.tipo]))
+
+
+@receiver(post_delete, sender=InteracaoNoticia)
+def interacao_removida(sender, instance, **kwargs):
+    transaction.on_commit(lambda: registrar(instance.noticia_id, instance.data_interacao, -PESOS[instance.tipo]))
@@ -0,0 +1,81 @@
+# Echo/Echo_app/estado_interacoes.py
+
+"""
+O que o usuário curtiu e salvou, para marcar qualquer lista de notícias.
+
+`estado_interacoes(usuario)` traz numa consulta só os ids das notícias
+curtidas e salvas (pelo índice único usuario/noticia/tipo, sem tocar na
+tabela), com as interações arquivadas (pela chave de InteracaoArquivada;
+ver Echo_app/retencao.py), e guarda os dois conjuntos no cache, por usuário. Com ele,
+`anotar_interacoes` marca `usuario_curtiu`/`usuario_salvou` em cada notícia
+de uma lista, em memória: a página de notícia, o dashboard, o feed e a
+busca mostram o estado de todos os cards com no máximo uma consulta.
+
+A chave do cache leva PerfilUsuario.versao_interacoes, lida do banco a
+cada chamada (uma consulta pela chave do perfil). `alternar_interacao`
+(Echo_app/contadores.py) incrementa a versão na mesma transação que curte
+ou salva, então todos os workers passam a ler a chave nova assim que a
+transação confirma, mesmo com um cache local por processo (LocMem). As
+entradas antigas só expiram. Quem escreve InteracaoNoticia por outro
+caminho (admin, seed_scale) conta com a validade ESTADO_INTERACOES_SEGUNDOS.
+"""
+
+from django.core.cache import cache
+from django.db.models import F
+
+from .models import InteracaoArquivada, InteracaoNoticia, PerfilUsuario
+
+ESTADO_INTERACOES_SEGUNDOS = 3600
+_VAZIO = (frozenset(), frozenset())
+
+
+def _chave(usuario_id, versao):
+    return f"estado_interacoes:{usuario_id}:{versao}"
+
+
+def versao_do_estado(usuario_id):
+    """PerfilUsuario.versao_interacoes do usuário; None quando ele não tem perfil."""
+    return PerfilUsuario.objects.filter(usuario_id=usuario_id).values_list('versao_interacoes', flat=True).first()
+
+
+def estado_interacoes(usuario, versao=None):
+    """
+    (ids curtidos, ids salvos) do usuário, do cache ou de uma consulta; vazios
+    para anônimos. `versao`: a de `versao_do_estado`, se quem chama já a leu.
+    """
+    if not usuario.is_authenticated:
+        return _VAZIO
+    if versao is None:
+        versao = versao_do_estado(usuario.pk)
+    chave = _chave(usuario.pk, versao or 0)
+    estado = cache.get(chave)
+    if estado is None:
+        curtidas, salvamentos = set(), set()
+        por_tipo = {'CURTIDA': curtidas, 'SALVAMENTO': salvamentos}
+        interacoes = InteracaoNoticia.objects.filter(usuario_id=usuario.pk).values_list('noticia_id', 'tipo').union(
+            InteracaoArquivada.objects.filter(usuario_id=usuario.pk).values_list('noticia_id', 'tipo'),
+            all=True,
+        )
+        for noticia_id, tipo in interacoes:
+            por_tipo[tipo].add(noticia_id)
+        estado = (frozenset(curtidas), frozenset(salvamentos))
+        cache.set(chave, estado, ESTADO_INTERACOES_SEGUNDOS)
+    return estado
+
+
+def anotar_interacoes(noticias, estado):
+    """Marca usuario_curtiu/usuario_salvou em cada notícia da lista (None é ignorado) e a devolve."""
+    curtidas, salvamentos = estado
+    for noticia in noticias:
+        if noticia is not None:
+            noticia.usuario_curtiu = noticia.pk in curtidas
+            noticia.usuario_salvou = noticia.pk in salvamentos
+    return noticias
+
+
+def invalidar_estado(*usuario_ids):
+    """
+    Troca a versão do estado dos usuários, na transação de quem chama: quem
+    ler antes do commit vê a versão antiga (e o estado antigo, coerente com ela).
+    """
+    PerfilUsuario.objects.filter(usuario_id__in=usuario_ids).update(versao_interacoes=F('versao_interacoes') + 1)
@@ -0,0 +1,270 @@
+# Echo/Echo_app/eventos.py
+
+"""
+Eventos de notificação em tempo real (server-sent events).
+
+Cada usuário logado mantém uma conexão SSE aberta (views.eventos_notificacoes),
+servida pelo ASGI: uma conexão ociosa é só uma corrotina esperando numa fila,
+bem mais barata que o cliente consultar o servidor a cada poucos segundos.
+
+O `hub` de cada processo guarda as filas dos usuários conectados e recebe
+eventos de duas fontes:
+
+- do próprio processo, após o commit (notificação criada pelo admin,
+  notificações marcadas como lidas), entregues na hora;
+- do banco, para o que acontece em outros processos (o worker
+  `processar_notificacoes`, outros workers do gunicorn): uma única tarefa
+  por processo consulta, a cada EVENTOS_INTERVALO segundos, as notificações
+  novas e os contadores de não lidas de todos os usuários conectados ali.
+  Sem broker externo: funciona igual em desenvolvimento e nos testes.
+
+Eventos enviados: `notificacao` (id = id da notificação, para o
+Last-Event-ID da reconexão) e `nao_lidas` (contador do sino).
+
+Ids fora de ordem: no PostgreSQL o id sai da sequence antes do commit, e
+os workers de envio gravam em paralelo; o id 100 pode aparecer depois do
+101. Por isso o vigia não avança direto para o maior id visto: relê tudo
+acima de um piso que só sobe para o maior id visto há mais de
+EVENTOS_JANELA_ATRASO segundos (mais que qualquer transação que cria
+notificações), e o hub descarta os ids que já publicou. Na reconexão, as
+notificações dessa janela são reenviadas mesmo abaixo do Last-Event-ID;
+o navegador ignora as repetidas.
+"""
+
+import asyncio
+import json
+import logging
+import threading
+import time
+from collections import defaultdict, deque
+from datetime import timedelta
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import close_old_connections, transaction
+from django.db.models import Q
+from django.urls import reverse
+from django.utils import timezone
+
+from .models import Notificacao, PerfilUsuario
+
+logger = logging.getLogger(__name__)
+
+TAMANHO_FILA = 100  # Eventos pendentes por conexão; um cliente lento perde os mais novos
+LOTE_USUARIOS = 1000  # Usuários por consulta do vigia (tamanho da lista IN)
+LOTE_NOTIFICACOES = 500  # Notificações lidas por consulta do vigia
+PERDIDAS_NA_RECONEXAO = 20  # Notificações reenviadas a quem reconecta com Last-Event-ID
+
+
+def intervalo():
+    return getattr(settings, 'EVENTOS_INTERVALO', 2)
+
+
+def janela_atraso():
+    return getattr(settings, 'EVENTOS_JANELA_ATRASO', 30)
+
+
+def evento_notificacao(notificacao):
+    """Evento a partir de um dict com os campos de Notificacao (ver CAMPOS_NOTIFICACAO)."""
+    noticia_id = notificacao['noticia_id']
+    return {
+        'tipo': 'notificacao',
+        'id': notificacao['id'],
+        'dados': {
+            'id': notificacao['id'],
+            'manchete': notificacao['manchete'],
+            'noticia_id': noticia_id,
+            'url': reverse('noticia_detalhe', args=[noticia_id]) if noticia_id else None,
+            'data_criacao': notificacao['data_criacao'].isoformat(),
+        },
+    }
+
+
+def evento_nao_lidas(total):
+    return {'tipo': 'nao_lidas', 'dados': {'nao_lidas': total}}
+
+
+def formatar(evento):
+    """Serializa o evento no formato text/event-stream."""
+    linhas = []
+    if 'id' in evento:
+        linhas.append(f"id: {evento['id']}")
+    linhas.append(f"event: {evento['tipo']}")
+    linhas.append(f"data: {json.dumps(evento['dados'], ensure_ascii=False)}")
+    return "\n".join(linhas) + "\n\n"
+
+
+CAMPOS_NOTIFICACAO = ('id', 'manchete', 'noticia_id', 'data_criacao', 'usuario_id')
+
+
+def notificacoes_desde(usuario_id, ultimo_id, limite=PERDIDAS_NA_RECONEXAO):
+    """
+    Notificações do usuário com id maior que `ultimo_id` ou criadas dentro
+    da janela de atraso (commits fora de ordem), da mais antiga para a mais nova.
+    """
+    recentes = Q(data_criacao__gte=timezone.now() - timedelta(seconds=janela_atraso()))
+    return list(
+        Notificacao.objects.filter(Q(pk__gt=ultimo_id) | recentes, usuario_id=usuario_id)
+        .order_by('-pk').values(*CAMPOS_NOTIFICACAO)[:limite]
+    )[::-1]
+
+
+def _novidades(usuario_ids, piso, vistos):
+    """
+    Uma rodada do vigia: (notificações com id acima do piso que ainda não
+    estão em `vistos`, {usuario_id: não lidas}). Lê só os ids da janela e
+    depois as linhas das que faltam.
+    """
+    ids, contagens = [], {}
+    for inicio in range(0, len(usuario_ids), LOTE_USUARIOS):
+        lote = usuario_ids[inicio:inicio + LOTE_USUARIOS]
+        ids += [
+            pk for pk in Notificacao.objects.filter(usuario_id__in=lote, pk__gt=piso).values_list('pk', flat=True)
+            if pk not in vistos
+        ]
+        contagens.update(PerfilUsuario.objects.filter(usuario_id__in=lote).values_list(
+            'usuario_id', 'notificacoes_nao_lidas'
+        ))
+    # As de menor id primeiro: as que ficarem para a próxima rodada estão todas acima das publicadas
+    ids = sorted(ids)[:LOTE_NOTIFICACOES]
+    novas = list(Notificacao.objects.filter(pk__in=ids).order_by('pk').values(*CAMPOS_NOTIFICACAO)) if ids else []
+    return novas, contagens
+
+
+def _ultimo_id_notificacao():
+    return Notificacao.objects.order_by('-pk').values_list('pk', flat=True).first() or 0
+
+
+class Hub:
+    """Filas dos usuários conectados a este processo."""
+
+    def __init__(self):
+        self._trava = threading.Lock()  # publicar() é chamado de threads síncronas
+        self._inscritos = defaultdict(set)  # usuario_id -> {(loop, fila)}
+        self._contagens = {}  # Último contador de não lidas enviado, por usuário
+        self._piso = None  # Ids até aqui já foram todos vistos pelo vigia
+        self._vistos = set()  # Ids acima do piso já publicados
+        self._marcas = deque()  # (instante, maior id visto) de cada rodada do vigia
+        self._vigia = None
+
+    def inscrever(self, usuario_id):
+        loop = asyncio.get_running_loop()
+        fila = asyncio.Queue(maxsize=TAMANHO_FILA)
+        with self._trava:
+            self._inscritos[usuario_id].add((loop, fila))
+        if self._vigia is None or self._vigia.done() or self._vigia.get_loop() is not loop:
+            self._vigia = loop.create_task(self._vigiar())
+        return fila
+
+    def cancelar(self, usuario_id, fila):
+        with self._trava:
+            inscritos = self._inscritos.get(usuario_id, set())
+            inscritos.difference_update({par for par in inscritos if par[1] is fila})
+            if not inscritos:
+                self._inscritos.pop(usuario_id, None)
+                self._contagens.pop(usuario_id, None)
+
+    def tem_inscritos(self, usuario_id):
+        return usuario_id in self._inscritos
+
+    def publicar(self, usuario_id, evento):
+        """Entrega o evento às conexões do usuário neste processo (de qualquer thread), uma vez só."""
+        with self._trava:
+            inscritos = list(self._inscritos.get(usuario_id, ()))
+            if evento['tipo'] == 'nao_lidas':
+                self._contagens[usuario_id] = evento['dados']['nao_lidas']
+            elif inscritos:  # Notificação: pelo commit neste processo e pelo vigia
+                if evento['id'] in self._vistos or (self._piso is not None and evento['id'] <= self._piso):
+                    return
+                self._vistos.add(evento['id'])
+        for loop, fila in inscritos:
+            loop.call_soon_threadsafe(_entregar, fila, evento)
+
+    async def _vigiar(self):
+        """Traz do banco o que outros processos criaram, enquanto houver alguém conectado."""
+        with self._trava:  # Começa do maior id de agora
+            self._piso = None
+            self._vistos.clear()
+            self._marcas.clear()
+        while self._inscritos:
+            try:
+                if self._piso is None:
+                    self._piso = await sync_to_async(_ultimo_id_notificacao)()
+                await asyncio.sleep(intervalo())
+                usuario_ids = list(self._inscritos)
+                if not usuario_ids:
+                    break
+                with self._trava:
+                    vistos = set(self._vistos)
+                novas, contagens = await sync_to_async(_novidades)(usuario_ids, self._piso, vistos)
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                logger.exception("Falha ao buscar eventos de notificação no banco")
+                await sync_to_async(close_old_connections)()  # Descarta uma conexão quebrada
+                await asyncio.sleep(intervalo())
+                continue
+
+            for notificacao in novas:
+                self.publicar(notificacao['usuario_id'], evento_notificacao(notificacao))
+            self._subir_piso()
+            for usuario_id, total in contagens.items():
+                if self._contagens.get(usuario_id) != total:
+                    self.publicar(usuario_id, evento_nao_lidas(total))
+
+    def _subir_piso(self):
+        """Sobe o piso para o maior id visto há mais de EVENTOS_JANELA_ATRASO segundos."""
+        agora = time.monotonic()
+        with self._trava:
+            self._marcas.append((agora, max(self._vistos, default=self._piso)))
+            while self._marcas and self._marcas[0][0] <= agora - janela_atraso():
+                self._piso = max(self._piso, self._marcas.popleft()[1])
+            self._vistos = {pk for pk in self._vistos if pk > self._piso}
+
+
+def _entregar(fila, evento):
+    try:
+        fila.put_nowait(evento)
+    except asyncio.QueueFull:
+        pass  # Cliente parado: o próximo `nao_lidas` corrige o sino
+
+
+hub = Hub()
+
+
+def publicar_apos_commit(usuario_id, evento):
+    """Publica no hub quando a transação atual for confirmada."""
+    transaction.on_commit(lambda: hub.publicar(usuario_id, evento))
+
+
+async def fluxo(usuario_id, ultimo_id=None):
+    """
+    Gerador assíncrono da resposta SSE de um usuário. Começa pelo contador
+    atual (e, na reconexão, pelas notificações perdidas) e depois repassa
+    os eventos do hub, com comentários de keep-alive nos intervalos.
+    """
+    fila = hub.inscrever(usuario_id)
+    reenviadas = set()
+    try:
+        yield f"retry: {int(intervalo() * 1000)}\n\n"
+        if ultimo_id is not None:
+            for notificacao in await sync_to_async(notificacoes_desde)(usuario_id, ultimo_id):
+                yield formatar(evento_notificacao(notificacao))
+                reenviadas.add(notificacao['id'])
+        total = await PerfilUsuario.objects.filter(usuario_id=usuario_id).values_list(
+            'notificacoes_nao_lidas', flat=True
+        ).afirst()
+        hub.publicar(usuario_id, evento_nao_lidas(total or 0))  # Também vira a referência do vigia
+
+        keepalive = getattr(settings, 'EVENTOS_KEEPALIVE', 15)
+        while True:
+            try:
+                evento = await asyncio.wait_for(fila.get(), timeout=keepalive)
+            except asyncio.TimeoutError:
+                yield ": keepalive\n\n"  # Mantém proxies e balanceadores com a conexão aberta
+                continue
+            if evento['tipo'] == 'notificacao' and evento['id'] in reenviadas:
+                continue  # Já reenviada na reconexão
+            yield formatar(evento)
+    finally:
+        hub.cancelar(usuario_id, fila)
@@ -0,0 +1,284 @@
+# Echo/Echo_app/feed.py
+
+"""
+Feed de recomendações materializado.
+
+Em vez de recalcular as recomendações a cada acesso ao dashboard, guardamos
+em FeedRecomendacao as notícias mais recentes de cada usuário e mantemos a
+tabela atualizada de forma incremental:
+
+- quando uma Noticia é publicada, ou muda de categoria ou de data;
+- quando PerfilUsuario.categorias_de_interesse muda;
+- quando a pontuação de HistoricoInteresse muda.
+
+Uma notícia pode ir para o feed de quase todos os usuários, então o save
+não faz essa distribuição: só enfileira um DistribuicaoFeed na mesma
+transação (um INSERT). O worker `processar_notificacoes` consome essa fila
+junto com a de notificações (Echo_app/notificacoes.py) e distribui a
+notícia por faixas de usuários, um INSERT ... SELECT por faixa, sem trazer
+ids para o Python. Editar título ou conteúdo não enfileira nada.
+
+Noticia.recomendar_para só precisa ler o feed (mais as notícias similares
+de Echo_app/similaridade.py), com uma consulta indexada.
+"""
+
+import logging
+from datetime import timedelta
+
+from django.contrib.auth import get_user_model
+from django.db import connection, transaction
+from django.db.models import Count, DateTimeField, Exists, F, OuterRef, Q, Subquery, Value, Window
+from django.db.models.functions import Coalesce, RowNumber
+from django.db.models.signals import m2m_changed, post_save, pre_save
+from django.dispatch import receiver
+from django.utils import timezone
+
+from .models import DistribuicaoFeed, FeedRecomendacao, HistoricoInteresse, Noticia, PerfilUsuario
+
+logger = logging.getLogger(__name__)
+
+User = get_user_model()
+
+FEED_TAMANHO = 50  # Quantas notícias ficam materializadas por usuário
+TOP_CATEGORIAS = 3  # Quantas categorias do histórico alimentam o feed de quem não declarou interesses
+TAMANHO_LOTE = 1000  # Usuários por INSERT ... SELECT (e por transação) na distribuição
+RESERVA = timedelta(minutes=5)  # Por quanto tempo um worker segura uma distribuição
+
+_Interesses = PerfilUsuario.categorias_de_interesse.through
+
+
+def categorias_do_feed(usuario_id):
+    """
+    Retorna os ids das categorias que alimentam o feed do usuário, seguindo
+    a mesma regra de antes: categorias de interesse do perfil, senão as 3
+    categorias com maior pontuação no histórico. Retorna None quando o
+    usuário deve receber apenas as últimas notícias.
+
+    `_publico` aplica a mesma regra em SQL, para todos os usuários de uma vez.
+    """
+    categorias = list(
+        _Interesses.objects
+        .filter(perfilusuario__usuario_id=usuario_id)
+        .values_list('categoria_id', flat=True)
+    )
+    if categorias:
+        return categorias
+
+    categorias = list(
+        HistoricoInteresse.objects
+        .filter(usuario_id=usuario_id)
+        .order_by('-pontuacao', 'categoria_id')  # Empates: mesma ordem de `_no_top_do_historico`
+        .values_list('categoria_id', flat=True)[:TOP_CATEGORIAS]
+    )
+    return categorias or None
+
+
+def reconstruir_feed(usuario_id):
+    """Recalcula do zero o feed de um usuário."""
+    categorias = categorias_do_feed(usuario_id)
+
+    noticias = Noticia.objects.all()
+    if categorias is not None:
+        noticias = noticias.filter(categoria_id__in=categorias)
+    noticias = noticias.order_by('-data_publicacao').values_list('pk', 'data_publicacao')[:FEED_TAMANHO]
+
+    with transaction.atomic():
+        FeedRecomendacao.objects.filter(usuario_id=usuario_id).delete()
+        FeedRecomendacao.objects.bulk_create([
+            FeedRecomendacao(usuario_id=usuario_id, noticia_id=pk, data_publicacao=data)
+            for pk, data in noticias
+        ])
+
+
+# ===================== DISTRIBUIÇÃO =====================
+
+def _no_top_do_historico(categoria_id):
+    """Linhas de histórico da categoria que estão no top TOP_CATEGORIAS do usuário (OuterRef: o usuário)."""
+    acima = (
+        HistoricoInteresse.objects
+        .filter(usuario_id=OuterRef('usuario_id'))
+        .filter(Q(pontuacao__gt=OuterRef('pontuacao')) | Q(pontuacao=OuterRef('pontuacao'), categoria_id__lt=OuterRef('categoria_id')))
+        .order_by()
+        .values('usuario_id')
+        .annotate(total=Count('pk'))
+        .values('total')
+    )
+    return (
+        HistoricoInteresse.objects
+        .filter(usuario_id=OuterRef('pk'), categoria_id=categoria_id)
+        .annotate(acima=Coalesce(Subquery(acima), Value(0)))
+        .filter(acima__lt=TOP_CATEGORIAS)
+    )
+
+
+def _publico(noticia):
+    """Usuários cujo feed deve conter a notícia: a regra de `categorias_do_feed`, em SQL."""
+    declarados = _Interesses.objects.filter(perfilusuario__usuario_id=OuterRef('pk'))
+    sem_interesse = ~Exists(declarados)
+    # Sem interesse nem histórico: recebe todas as notícias
+    regra = sem_interesse & ~Exists(HistoricoInteresse.objects.filter(usuario_id=OuterRef('pk')))
+    if noticia.categoria_id is not None:
+        regra |= Exists(declarados.filter(categoria_id=noticia.categoria_id))
+        regra |= sem_interesse & Exists(_no_top_do_historico(noticia.categoria_id))
+    return User.objects.filter(regra)
+
+
+def _sql_inserir(selecao):
+    sql, params = selecao.query.sql_with_params()
+    tabela = connection.ops.quote_name(FeedRecomendacao._meta.db_table)
+    return (
+        f"INSERT INTO {tabela} (usuario_id, noticia_id, data_publicacao) {sql} "
+        f"ON CONFLICT (usuario_id, noticia_id) DO NOTHING"
+    ), params
+
+
+def _podar_feeds(primeiro_id, ultimo_id):
+    """Apaga as entradas além das FEED_TAMANHO mais recentes de cada feed da faixa de usuários."""
+    excedentes = (
+        FeedRecomendacao.objects.filter(usuario_id__gte=primeiro_id, usuario_id__lte=ultimo_id)
+        .annotate(posicao=Window(
+            RowNumber(), partition_by=F('usuario_id'), order_by=[F('data_publicacao').desc(), F('noticia_id').desc()]
+        ))  # feed_usuario_data_idx
+        .filter(posicao__gt=FEED_TAMANHO)
+        .values('pk')
+    )
+    FeedRecomendacao.objects.filter(pk__in=Subquery(excedentes)).delete()
+
+
+def distribuir_noticia(noticia, tamanho_lote=TAMANHO_LOTE):
+    """
+    Coloca uma notícia (nova, ou com categoria/data alterada) nos feeds que
+    devem contê-la, por faixas de id de usuário: em cada faixa, na mesma
+    transação, apaga as entradas antigas da notícia, insere as novas com um
+    INSERT ... SELECT e poda os feeds da faixa para FEED_TAMANHO entradas.
+    Sem a poda, os feeds de quem recebe todas as notícias (sem interesses
+    nem histórico) cresceriam sem limite.
+    """
+    publico = _publico(noticia).order_by().values_list(
+        'pk', Value(noticia.pk), Value(noticia.data_publicacao, output_field=DateTimeField())
+    )
+    ultimo_id = 0
+    while True:
+        ids = list(User.objects.filter(pk__gt=ultimo_id).order_by('pk').values_list('pk', flat=True)[:tamanho_lote])
+        if not ids:
+            break
+        ultimo_id = ids[-1]
+        with transaction.atomic(), connection.cursor() as cursor:
+            FeedRecomendacao.objects.filter(noticia=noticia, usuario_id__gte=ids[0], usuario_id__lte=ultimo_id).delete()
+            cursor.execute(*_sql_inserir(publico.filter(pk__gte=ids[0], pk__lte=ultimo_id)))
+            _podar_feeds(ids[0], ultimo_id)
+
+
+def solicitar_distribuicao(noticia):
+    """Enfileira a distribuição da notícia (um pedido em aberto por notícia; um novo pedido renova o anterior)."""
+    DistribuicaoFeed.objects.update_or_create(
+        noticia_id=noticia.pk, defaults={'solicitada_em': timezone.now(), 'reservado_ate': None}
+    )
+
+
+def reservar_distribuicao():
+    """
+    Reserva o pedido mais antigo sem reserva (ou com a reserva de um worker
+    que parou expirada). Retorna None se a fila estiver vazia.
+    """
+    agora = timezone.now()
+    with transaction.atomic():
+        pedido = (
+            DistribuicaoFeed.objects
+            .select_for_update(skip_locked=True)
+            .filter(Q(reservado_ate__isnull=True) | Q(reservado_ate__lt=agora))
+            .order_by('solicitada_em')
+            .first()
+        )
+        if pedido is None:
+            return None
+        pedido.reservado_ate = agora + RESERVA
+        pedido.tentativas += 1
+        pedido.save(update_fields=['reservado_ate', 'tentativas'])
+    return pedido
+
+
+def distribuir_pendentes(tamanho_lote=TAMANHO_LOTE, maximo=None):
+    """Consome a fila de distribuição até esvaziá-la (ou até `maximo` pedidos). Retorna quantos distribuiu."""
+    distribuidas = 0
+    while maximo is None or distribuidas < maximo:
+        pedido = reservar_distribuicao()
+        if pedido is None:
+            break
+        try:
+            noticia = Noticia.objects.only('pk', 'categoria_id', 'data_publicacao').get(pk=pedido.noticia_id)
+            distribuir_noticia(noticia, tamanho_lote)
+        except Noticia.DoesNotExist:  # Notícia apagada: o CASCADE já removeu o pedido
+            continue
+        except Exception:
+            # A reserva expira e o pedido volta para a fila
+            logger.exception("Falha ao distribuir a notícia %s nos feeds", pedido.noticia_id)
+            continue
+        # Editada de novo durante a distribuição: o pedido renovado fica para a próxima volta
+        DistribuicaoFeed.objects.filter(pk=pedido.pk, solicitada_em=pedido.solicitada_em).delete()
+        distribuidas += 1
+    return distribuidas
+
+
+def _sem_interesse_declarado(usuario_id):
+    return not _Interesses.objects.filter(
+        perfilusuario__usuario_id=usuario_id
+    ).exists()
+
+
+# ===================== SINAIS =====================
+
+@receiver(pre_save, sender=Noticia)
+def noticia_a_salvar(sender, instance, raw=False, update_fields=None, **kwargs):
+    # Só categoria e data decidem em que feeds (e em que posição) a notícia fica
+    instance._redistribuir = False
+    if raw or instance._state.adding:
+        return
+    if update_fields is not None and not {'categoria', 'categoria_id', 'data_publicacao'} & set(update_fields):
+        return
+    anterior = Noticia.objects.filter(pk=instance.pk).values_list('categoria_id', 'data_publicacao').first()
+    instance._redistribuir = anterior != (instance.categoria_id, instance.data_publicacao)
+
+
+@receiver(post_save, sender=Noticia)
+def noticia_salva(sender, instance, created, raw=False, **kwargs):
+    if raw:  # Ignora carga de fixtures
+        return
+    if created or instance._redistribuir:
+        solicitar_distribuicao(instance)  # Na transação do save: a notícia e o pedido entram juntos
+
+
+@receiver(post_save, sender=PerfilUsuario)
+def perfil_criado(sender, instance, created, raw=False, **kwargs):
+    # Com categorias iniciais (cadastro), o feed é montado quando elas entram
+    if created and not raw and not getattr(instance, '_categorias_iniciais', None):
+        reconstruir_feed(instance.usuario_id)
+
+
+@receiver(m2m_changed, sender=PerfilUsuario.categorias_de_interesse.through)
+def categorias_de_interesse_alteradas(sender, instance, action, reverse, pk_set, **kwargs):
+    if reverse and action == 'pre_clear':
+        # categoria.perfis_interessados.clear(): guarda quem será afetado
+        instance._perfis_antes_do_clear = list(instance.perfis_interessados.values_list('pk', flat=True))
+        return
+    if action not in ('post_add', 'post_remove', 'post_clear'):
+        return
+
+    if not reverse:  # perfil.categorias_de_interesse.set(...)
+        reconstruir_feed(instance.usuario_id)
+        return
+
+    # categoria.perfis_interessados.add(...): pk_set são perfis
+    if action == 'post_clear':
+        pk_set = getattr(instance, '_perfis_antes_do_clear', [])
+    for usuario_id in PerfilUsuario.objects.filter(pk__in=pk_set).values_list('usuario_id', flat=True):
+        reconstruir_feed(usuario_id)
+
+
+@receiver(post_save, sender=HistoricoInteresse)
+def historico_alterado(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    # O histórico só alimenta o feed de quem não declarou interesses
+    if _sem_interesse_declarado(instance.usuario_id):
+        reconstruir_feed(instance.usuario_id)
@@ -0,0 +1,41 @@
+# Echo/Echo_app/fragmentos.py
+
+"""
+Versões de conteúdo usadas como chave do cache de fragmentos.
+
+Os templates guardam o HTML dos cards e do corpo das notícias com
+`{% cache ... noticia.pk noticia.versao %}` (e `noticia.categoria.versao`
+quando o fragmento mostra a categoria). Como a versão faz parte da chave,
+invalidar é só incrementá-la: o fragmento antigo deixa de ser lido e expira
+sozinho, e os demais continuam válidos.
+
+- Salvar uma Noticia incrementa Noticia.versao.
+- Salvar uma Categoria incrementa Categoria.versao (afeta os cards dela).
+- Apagar uma Categoria incrementa a versão das notícias que a usavam, pois o
+  SET_NULL do Django é um UPDATE que não passa por save().
+"""
+
+from django.db.models import F
+from django.db.models.functions import Now
+from django.db.models.signals import pre_delete, pre_save
+from django.dispatch import receiver
+
+from .models import Categoria, Noticia
+
+
+def invalidar_noticias(**filtros):
+    """Incrementa a versão das notícias filtradas, direto no banco."""
+    return Noticia.objects.filter(**filtros).update(versao=F('versao') + 1, atualizado_em=Now())
+
+
+@receiver(pre_save, sender=Noticia)
+@receiver(pre_save, sender=Categoria)
+def incrementar_versao(sender, instance, raw=False, **kwargs):
+    if raw or instance._state.adding:
+        return
+    instance.versao = (instance.versao or 0) + 1
+
+
+@receiver(pre_delete, sender=Categoria)
+def categoria_removida(sender, instance, **kwargs):
+    invalidar_noticias(categoria=instance)
@@ -0,0 +1,159 @@
+# Echo/Echo_app/imagens.py
+
+"""
+Variantes responsivas das imagens enviadas (Noticia.imagem e
+PerfilUsuario.foto_perfil).
+
+Ao salvar uma imagem nova, geramos versões redimensionadas em WebP e JPEG
+nas larguras de LARGURAS, fora da thread da requisição (pool de workers).
+As larguras geradas ficam registradas no campo JSON `<campo>_variantes` do
+próprio modelo, para que o template monte o `srcset` sem consultar o disco.
+
+Imagens enviadas antes deste recurso são processadas sob demanda: a
+template tag `imagem_responsiva` agenda a geração na primeira vez que a
+imagem é exibida e, enquanto isso, usa o arquivo original.
+"""
+
+import logging
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+
+from django.core.files.base import ContentFile
+from django.db import close_old_connections, transaction
+from django.db.models import F
+from django.db.models.functions import Now
+from django.db.models.signals import post_save
+from django.dispatch import receiver
+from PIL import Image, ImageOps
+
+from .models import Noticia, PerfilUsuario
+
+logger = logging.getLogger(__name__)
+
+LARGURAS = (320, 640, 1024, 1600)  # Larguras (px) geradas para cada imagem
+FORMATOS = {  # Formato -> (extensão, opções do Pillow)
+    'webp': ('webp', {'quality': 80, 'method': 6}),
+    'jpeg': ('jpg', {'quality': 82, 'optimize': True, 'progressive': True}),
+}
+CAMPOS_COM_VARIANTES = {  # Modelo -> campos de imagem com variantes
+    Noticia: ('imagem',),
+    PerfilUsuario: ('foto_perfil',),
+}
+
+_executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix='variantes-imagem')
+_em_andamento = set()  # Evita agendar duas vezes a mesma imagem
+_falhas = set()  # (modelo, pk, campo, arquivo) que não deu para processar: não tenta de novo neste processo
+_trava = threading.Lock()
+
+
+def caminho_variante(nome, largura, formato):
+    """noticias/foto.jpg -> noticias/variantes/foto-640w.webp"""
+    pasta, arquivo = os.path.split(nome)
+    base = os.path.splitext(arquivo)[0]
+    extensao = FORMATOS[formato][0]
+    return os.path.join(pasta, 'variantes', f"{base}-{largura}w.{extensao}")
+
+
+def gerar_variantes(arquivo):
+    """
+    Gera as variantes de um FieldFile e retorna o dicionário gravado em
+    `<campo>_variantes`: {"origem": nome do original, "larguras": [...]}.
+    """
+    storage = arquivo.storage
+    with storage.open(arquivo.name, 'rb') as original:
+        imagem = ImageOps.exif_transpose(Image.open(original))  # Fotos de celular vêm rotacionadas via EXIF
+        imagem = imagem.convert('RGB')
+
+    # Nunca amplia: larguras maiores que o original são descartadas
+    larguras = [largura for largura in LARGURAS if largura < imagem.width] or [imagem.width]
+
+    for largura in larguras:
+        altura = round(imagem.height * largura / imagem.width)
+        redimensionada = imagem.resize((largura, altura), Image.LANCZOS)
+        for formato, (_, opcoes) in FORMATOS.items():
+            buffer = BytesIO()
+            redimensionada.save(buffer, format=formato.upper(), **opcoes)
+            caminho = caminho_variante(arquivo.name, largura, formato)
+            if storage.exists(caminho):
+                storage.delete(caminho)
+            storage.save(caminho, ContentFile(buffer.getvalue()))
+
+    return {'origem': arquivo.name, 'larguras': larguras}
+
+
+def variantes_atualizadas(instancia, campo):
+    """True se as variantes registradas correspondem ao arquivo atual do campo."""
+    arquivo = getattr(instancia, campo)
+    return bool(arquivo) and getattr(instancia, f"{campo}_variantes", {}).get('origem') == arquivo.name
+
+
+def _processar(modelo, pk, campo):
+    nome = None
+    try:
+        instancia = modelo.objects.filter(pk=pk).first()
+        if instancia is None or not getattr(instancia, campo) or variantes_atualizadas(instancia, campo):
+            return
+        nome = getattr(instancia, campo).name
+        variantes = gerar_variantes(getattr(instancia, campo))
+        # update() toca só as colunas necessárias e não dispara post_save
+        alteracoes = {f"{campo}_variantes": variantes}
+        if modelo is Noticia:  # O srcset mudou: invalida fragmentos em cache e o ETag
+            alteracoes.update(versao=F('versao') + 1, atualizado_em=Now())
+        modelo.objects.filter(pk=pk).update(**alteracoes)
+    except Exception:
+        logger.exception("Falha ao gerar variantes de %s.%s (pk=%s)", modelo.__name__, campo, pk)
+        if nome is not None:  # Imagem corrompida ou ilegível: o template segue com o original
+            with _trava:
+                _falhas.add((modelo, pk, campo, nome))
+    finally:
+        with _trava:
+            _em_andamento.discard((modelo, pk, campo))
+        close_old_connections()
+
+
+def agendar_variantes(instancia, campo):
+    """
+    Agenda a geração das variantes no pool de workers, após o commit (num
+    rollback, nada fica agendado). Um arquivo que já falhou neste processo
+    não é tentado de novo; um novo upload no campo, sim.
+    """
+    chave = (type(instancia), instancia.pk, campo)
+    falha = (*chave, getattr(instancia, campo).name)
+
+    def submeter():
+        with _trava:
+            if chave in _em_andamento or falha in _falhas:
+                return
+            _em_andamento.add(chave)
+        _executor.submit(_processar, *chave)
+
+    with _trava:
+        if chave in _em_andamento or falha in _falhas:
+            return
+    transaction.on_commit(submeter)
+
+
+def srcset(instancia, campo, formato):
+    """Valor do atributo srcset para o formato, ou '' se ainda não há variantes."""
+    if not variantes_atualizadas(instancia, campo):
+        return ''
+    arquivo = getattr(instancia, campo)
+    larguras = getattr(instancia, f"{campo}_variantes")['larguras']
+    return ", ".join(
+        f"{arquivo.storage.url(caminho_variante(arquivo.name, largura, formato))} {largura}w"
+        for largura in larguras
+    )
+
+
+# ===================== SINAIS =====================
+
+@receiver(post_save, sender=Noticia)
+@receiver(post_save, sender=PerfilUsuario)
+def imagem_salva(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    for campo in CAMPOS_COM_VARIANTES[sender]:
+        if getattr(instance, campo) and not variantes_atualizadas(instance, campo):
+            agendar_variantes(instance, campo)
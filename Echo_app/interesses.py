@@ -0,0 +1,329 @@
+# Echo/Echo_app/interesses.py
+
+"""
+Pontuação de interesse por categoria (HistoricoInteresse), com decaimento.
+
+Cada interação vale PESOS[tipo] e perde metade do valor a cada MEIA_VIDA.
+Para não reescrever todas as linhas conforme o tempo passa, a pontuação é
+guardada na escala de uma data fixa (EPOCA): uma interação no instante t
+soma PESOS[tipo] * exp(λ·(t − EPOCA)). O valor atual é a pontuação
+guardada vezes exp(−λ·(agora − EPOCA)), o mesmo fator para todas as
+linhas. Assim:
+- ordenar por `pontuacao` já é ordenar pelo interesse atual;
+- atualizar é só somar (ou subtrair, ao descurtir).
+
+As interações confirmadas entram num acumulador em memória, por (usuario,
+noticia). A cada INTERESSES_INTERVALO segundos, ou ao juntar TAMANHO_LOTE
+pares, o acumulador aplica tudo com um único INSERT ... ON CONFLICT DO
+UPDATE aditivo por lote. Com INTERESSES_INTERVALO = 0 aplica na hora.
+
+Esse upsert não dispara os sinais de HistoricoInteresse, então o
+descarregamento reconstrói ele mesmo o feed de quem segue o histórico e
+teve o top 3 de categorias alterado. Se o processo morrer, perdem-se no
+máximo alguns segundos de deltas; o comando `recalcular_interesses`
+refaz tudo a partir de InteracaoNoticia (mais `pontuacao_arquivada`, o que
+veio das interações arquivadas; ver Echo_app/retencao.py).
+"""
+
+import atexit
+import logging
+import math
+import threading
+from collections import defaultdict
+from datetime import datetime, timedelta, timezone as dt_timezone
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.db import close_old_connections, connection, transaction
+from django.db.models import F, Value, Window
+from django.db.models.functions import Greatest, RowNumber
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from django.utils import timezone
+
+from .feed import TOP_CATEGORIAS, reconstruir_feed
+from .models import HistoricoInteresse, InteracaoNoticia, Noticia, PerfilUsuario
+
+logger = logging.getLogger(__name__)
+
+User = get_user_model()
+
+PESOS = {
+    'CURTIDA': 1.0,
+    'SALVAMENTO': 3.0,  # Salvar para ler depois indica mais interesse que curtir
+}
+MEIA_VIDA = timedelta(days=30)
+EPOCA = datetime(2025, 1, 1, tzinfo=dt_timezone.utc)  # Com meia-vida de 30 dias, o float aguenta ~80 anos
+TAMANHO_LOTE = 1000  # Pares (usuario, categoria) por upsert
+
+_LAMBDA = math.log(2) / MEIA_VIDA.total_seconds()
+
+
+def peso_na_epoca(tipo, quando):
+    """Contribuição de uma interação, na escala da EPOCA."""
+    return PESOS[tipo] * math.exp(_LAMBDA * (quando - EPOCA).total_seconds())
+
+
+def pontuacao_atual(pontuacao, agora=None):
+    """Converte uma pontuação guardada (escala da EPOCA) para o valor de agora."""
+    agora = agora or timezone.now()
+    return pontuacao * math.exp(-_LAMBDA * (agora - EPOCA).total_seconds())
+
+
+# ===================== UPSERT EM LOTE =====================
+
+def _sql_upsert(linhas, campo='pontuacao'):
+    tabela = connection.ops.quote_name(HistoricoInteresse._meta.db_table)
+    maior = 'GREATEST' if connection.vendor == 'postgresql' else 'MAX'  # MAX(a, b) escalar no SQLite
+    if campo == 'pontuacao':
+        colunas, linha = campo, "(%s, %s, %s)"
+    else:  # Linha nova: a pontuação começa igual ao campo, como depois do `recalcular`
+        colunas, linha = f"{campo}, pontuacao", "(%s, %s, %s, %s)"
+    valores = ", ".join([linha] * linhas)
+    return (
+        f"INSERT INTO {tabela} (usuario_id, categoria_id, {colunas}) VALUES {valores} "
+        f"ON CONFLICT (usuario_id, categoria_id) DO UPDATE "
+        f"SET {campo} = {maior}({tabela}.{campo} + EXCLUDED.{campo}, 0)"
+    )
+
+
+def somar_pontuacoes(deltas, campo='pontuacao'):
+    """
+    Soma {(usuario_id, categoria_id): delta} às pontuações (ou a outro campo,
+    como `pontuacao_arquivada`), criando as linhas que faltam. Um INSERT ...
+    ON CONFLICT DO UPDATE por lote de TAMANHO_LOTE.
+    """
+    itens = [(usuario_id, categoria_id, delta) for (usuario_id, categoria_id), delta in deltas.items() if delta]
+    with transaction.atomic(), connection.cursor() as cursor:
+        for inicio in range(0, len(itens), TAMANHO_LOTE):
+            lote = itens[inicio:inicio + TAMANHO_LOTE]
+            if campo != 'pontuacao':
+                lote = [(*item, item[2]) for item in lote]
+            cursor.execute(_sql_upsert(len(lote), campo), [valor for item in lote for valor in item])
+        # Linha nova criada só por uma remoção (delta negativo): fica em zero
+        HistoricoInteresse.objects.filter(
+            usuario_id__in={usuario_id for usuario_id, _, _ in itens}, **{f'{campo}__lt': 0}
+        ).update(**{campo: 0})
+
+
+def _top_categorias(usuario_ids):
+    """{usuario_id: (categorias do top 3, da maior pontuação para a menor)} numa consulta."""
+    linhas = (
+        HistoricoInteresse.objects.filter(usuario_id__in=usuario_ids)
+        .annotate(posicao=Window(
+            RowNumber(), partition_by=F('usuario_id'), order_by=[F('pontuacao').desc(), F('categoria_id')]
+        ))  # Empates na ordem de feed.categorias_do_feed
+        .filter(posicao__lte=TOP_CATEGORIAS)
+        .order_by('usuario_id', 'posicao')
+        .values_list('usuario_id', 'categoria_id')
+    )
+    top = defaultdict(tuple)
+    for usuario_id, categoria_id in linhas:
+        top[usuario_id] += (categoria_id,)
+    return top
+
+
+def _guiados_pelo_historico(usuario_ids):
+    """Usuários, entre os dados, sem categorias de interesse declaradas."""
+    declarados = set(
+        PerfilUsuario.categorias_de_interesse.through.objects
+        .filter(perfilusuario__usuario_id__in=usuario_ids)
+        .values_list('perfilusuario__usuario_id', flat=True)
+    )
+    return [usuario_id for usuario_id in usuario_ids if usuario_id not in declarados]
+
+
+def aplicar_deltas(deltas_por_noticia):
+    """
+    Aplica {(usuario_id, noticia_id): delta}: resolve as categorias numa
+    consulta, soma as pontuações e reconstrói o feed de quem é guiado pelo
+    histórico e teve o top de categorias alterado.
+    """
+    categorias = dict(
+        Noticia.objects.filter(pk__in={noticia_id for _, noticia_id in deltas_por_noticia}, categoria__isnull=False)
+        .values_list('pk', 'categoria_id')
+    )
+    # Usuário apagado depois do clique (o CASCADE das interações também gera deltas)
+    usuarios = set(User.objects.filter(
+        pk__in={usuario_id for usuario_id, _ in deltas_por_noticia}
+    ).values_list('pk', flat=True))
+
+    deltas = defaultdict(float)
+    for (usuario_id, noticia_id), delta in deltas_por_noticia.items():
+        if noticia_id in categorias and usuario_id in usuarios:
+            deltas[usuario_id, categorias[noticia_id]] += delta
+    if not deltas:
+        return
+
+    with transaction.atomic():
+        usuario_ids = _guiados_pelo_historico(list({usuario_id for usuario_id, _ in deltas}))
+        antes = _top_categorias(usuario_ids) if usuario_ids else {}
+        somar_pontuacoes(deltas)
+        depois = _top_categorias(usuario_ids) if usuario_ids else {}
+        for usuario_id in usuario_ids:
+            if antes.get(usuario_id, ()) != depois.get(usuario_id, ()):
+                reconstruir_feed(usuario_id)
+
+
+# ===================== ACUMULADOR =====================
+
+class Acumulador:
+    """Junta os deltas das interações e aplica em lote (ver docstring do módulo)."""
+
+    def __init__(self):
+        self._deltas = defaultdict(float)
+        self._trava = threading.Lock()
+        self._timer = None
+
+    def adicionar(self, usuario_id, noticia_id, delta):
+        intervalo = getattr(settings, 'INTERESSES_INTERVALO', 5)
+        if intervalo <= 0:
+            aplicar_deltas({(usuario_id, noticia_id): delta})
+            return
+
+        with self._trava:
+            self._deltas[usuario_id, noticia_id] += delta
+            cheio = len(self._deltas) >= TAMANHO_LOTE
+            if not cheio and self._timer is None:
+                self._timer = threading.Timer(intervalo, self._descarregar_em_segundo_plano)
+                self._timer.daemon = True
+                self._timer.start()
+        if cheio:
+            self.descarregar()
+
+    def descarregar(self):
+        """Aplica agora tudo o que foi acumulado."""
+        with self._trava:
+            deltas, self._deltas = self._deltas, defaultdict(float)
+            if self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
+        if deltas:
+            aplicar_deltas(deltas)
+
+    def _descarregar_em_segundo_plano(self):
+        try:
+            self.descarregar()
+        except Exception:
+            logger.exception("Falha ao aplicar deltas de interesse; `recalcular_interesses` corrige")
+        finally:
+            close_old_connections()
+
+
+acumulador = Acumulador()
+atexit.register(acumulador.descarregar)  # Não perde os deltas num desligamento normal
+
+
+def _sql_somar_recalculo(linhas):
+    tabela = connection.ops.quote_name(HistoricoInteresse._meta.db_table)
+    valores = ", ".join(["(%s, %s, 0, %s)"] * linhas)
+    return (
+        f"INSERT INTO {tabela} (usuario_id, categoria_id, pontuacao, pontuacao_recalculo) VALUES {valores} "
+        f"ON CONFLICT (usuario_id, categoria_id) DO UPDATE "
+        f"SET pontuacao_recalculo = COALESCE({tabela}.pontuacao_recalculo, 0) + EXCLUDED.pontuacao_recalculo"
+    )
+
+
+def _faixas_do_historico(tamanho_lote):
+    """(primeiro, último) id de cada faixa de HistoricoInteresse, sem carregar a tabela."""
+    ultimo_id = 0
+    while True:
+        ids = list(
+            HistoricoInteresse.objects.filter(pk__gt=ultimo_id).order_by('pk').values_list('pk', flat=True)[:tamanho_lote]
+        )
+        if not ids:
+            return
+        ultimo_id = ids[-1]
+        yield ids[0], ultimo_id
+
+
+def _maior_interacao():
+    return InteracaoNoticia.objects.order_by('-pk').values_list('pk', flat=True).first() or 0
+
+
+def recalcular(tamanho_lote=10000):
+    """
+    Recalcula todas as pontuações a partir de InteracaoNoticia, somadas à
+    parte das interações já arquivadas. Retorna quantas interações leu.
+
+    Sem uma transação longa na tabela: cada lote faz o seu commit. O novo
+    valor é montado em `pontuacao_recalculo`, como a diferença a aplicar:
+    1. pontuacao_recalculo = pontuacao_arquivada − pontuacao, por faixas de id;
+    2. soma ali o peso das interações até a maior existente depois do passo 1;
+    3. troca: pontuacao += pontuacao_recalculo, por faixas de id.
+    O que o acumulador somar a `pontuacao` enquanto isso (interações novas,
+    remoções) continua valendo depois da troca.
+    """
+    for faixa in _faixas_do_historico(tamanho_lote):
+        HistoricoInteresse.objects.filter(pk__range=faixa).update(
+            pontuacao_recalculo=F('pontuacao_arquivada') - F('pontuacao')
+        )
+
+    limite = _maior_interacao()  # As posteriores já entram em `pontuacao` pelo acumulador
+    total = 0
+    ultimo_id = 0
+    while True:
+        interacoes = list(
+            InteracaoNoticia.objects.filter(pk__gt=ultimo_id, pk__lte=limite, noticia__categoria__isnull=False)
+            .order_by('pk')
+            .values_list('pk', 'usuario_id', 'noticia__categoria_id', 'tipo', 'data_interacao')[:tamanho_lote]
+        )
+        if not interacoes:
+            break
+        ultimo_id = interacoes[-1][0]
+        total += len(interacoes)
+
+        deltas = defaultdict(float)
+        for _, usuario_id, categoria_id, tipo, data in interacoes:
+            deltas[usuario_id, categoria_id] += peso_na_epoca(tipo, data)
+        itens = list(deltas.items())
+        with transaction.atomic(), connection.cursor() as cursor:
+            for inicio in range(0, len(itens), TAMANHO_LOTE):
+                lote = itens[inicio:inicio + TAMANHO_LOTE]
+                cursor.execute(_sql_somar_recalculo(len(lote)), [
+                    valor for (usuario_id, categoria_id), delta in lote for valor in (usuario_id, categoria_id, delta)
+                ])
+
+    for faixa in _faixas_do_historico(tamanho_lote):
+        HistoricoInteresse.objects.filter(pk__range=faixa, pontuacao_recalculo__isnull=False).update(
+            pontuacao=Greatest(F('pontuacao') + F('pontuacao_recalculo'), Value(0.0)), pontuacao_recalculo=None
+        )
+    return total
+
+
+def reconstruir_feeds_do_historico(tamanho_lote=1000):
+    """Reconstrói o feed de todos os usuários guiados pelo histórico. Retorna quantos."""
+    usuario_ids = (
+        HistoricoInteresse.objects.order_by('usuario_id').values_list('usuario_id', flat=True).distinct()
+    )
+    total = 0
+    lote = []
+    for usuario_id in usuario_ids.iterator(chunk_size=tamanho_lote):
+        lote.append(usuario_id)
+        if len(lote) == tamanho_lote:
+            total += _reconstruir_guiados(lote)
+            lote = []
+    return total + _reconstruir_guiados(lote)
+
+
+def _reconstruir_guiados(usuario_ids):
+    guiados = _guiados_pelo_historico(usuario_ids) if usuario_ids else []
+    for usuario_id in guiados:
+        reconstruir_feed(usuario_id)
+    return len(guiados)
+
+
+# ===================== SINAIS =====================
+
+@receiver(post_save, sender=InteracaoNoticia)
+def interacao_criada(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        delta = peso_na_epoca(instance.tipo, instance.data_interacao)
+        transaction.on_commit(lambda: acumulador.adicionar(instance.usuario_id, instance.noticia_id, delta))
+
+
+@receiver(post_delete, sender=InteracaoNoticia)
+def interacao_removida(sender, instance, **kwargs):
+    # Retira exatamente o que a interação tinha somado (mesmo instante de origem)
+    delta = -peso_na_epoca(instance.tipo, instance.data_interacao)
+    transaction.on_commit(lambda: acumulador.adicionar(instance.usuario_id, instance.noticia_id, delta))
@@ -0,0 +1,20 @@
+from django.core.management.base import BaseCommand
+
+from Echo_app.retencao import PAUSA, TAMANHO_LOTE, arquivar_interacoes, dias_arquivo_interacoes
+
+
+class Command(BaseCommand):
+    help = (
+        "Arquiva as curtidas e os salvamentos das notícias publicadas há mais de "
+        "INTERACOES_ARQUIVO_DIAS em ResumoInteracoes (totais por notícia, tipo e mês), "
+        "mantendo contadores e pontuações de interesse."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dias', type=int, default=None, help=f"Idade mínima da notícia, em dias (padrão: {dias_arquivo_interacoes()}).")
+        parser.add_argument('--lote', type=int, default=TAMANHO_LOTE, help=f"Interações por lote (padrão: {TAMANHO_LOTE}).")
+        parser.add_argument('--pausa', type=float, default=PAUSA, help=f"Segundos entre lotes (padrão: {PAUSA}).")
+
+    def handle(self, *args, **options):
+        arquivadas = arquivar_interacoes(dias=options['dias'], tamanho_lote=options['lote'], pausa=options['pausa'])
+        self.stdout.write(self.style.SUCCESS(f"{arquivadas} interação(ões) arquivada(s)."))
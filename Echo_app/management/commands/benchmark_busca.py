@@ -0,0 +1,93 @@
+import random
+import statistics
+import time
+
+from django.core.management.base import BaseCommand
+
+from Echo_app.busca import buscar
+from Echo_app.models import Categoria, Noticia
+
+PREFIXO = "[bench] "  # Marca as notícias sintéticas, para poder removê-las depois
+
+VOCABULARIO = (
+    "governo prefeitura recife pernambuco eleição câmara senado economia inflação juros "
+    "mercado emprego salário saúde hospital vacina escola educação universidade sport náutico "
+    "santa cruz futebol campeonato clássico gol torcida chuva trânsito metrô ônibus praia "
+    "carnaval frevo maracatu cultura música festival turismo polícia segurança operação "
+    "tecnologia internet startup porto digital energia solar água saneamento obra ponte"
+).split()
+
+
+def _texto(rnd, palavras):
+    return " ".join(rnd.choice(VOCABULARIO) for _ in range(palavras))
+
+
+def _percentil(valores, p):
+    valores = sorted(valores)
+    return valores[min(len(valores) - 1, int(len(valores) * p / 100))]
+
+
+class Command(BaseCommand):
+    help = "Mede a latência da busca textual (Echo_app.busca) num corpus sintético."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--noticias', type=int, default=300000, help="Tamanho do corpus sintético (padrão: 300000).")
+        parser.add_argument('--consultas', type=int, default=200, help="Quantas buscas medir (padrão: 200).")
+        parser.add_argument('--paginas', type=int, default=5, help="Páginas seguidas pelo cursor em cada busca (padrão: 5).")
+        parser.add_argument('--semente', type=int, default=42)
+        parser.add_argument('--limpar', action='store_true', help="Remove o corpus sintético ao final.")
+
+    def handle(self, *args, **options):
+        rnd = random.Random(options['semente'])
+        self._gerar_corpus(rnd, options['noticias'])
+
+        categorias = list(Categoria.objects.values_list('pk', flat=True)) or [None]
+        primeira, seguintes = [], []
+        for _ in range(options['consultas']):
+            termo = " ".join(rnd.sample(VOCABULARIO, rnd.choice((1, 2))))
+            categoria_id = rnd.choice(categorias) if rnd.random() < 0.3 else None
+
+            cursor = None
+            for pagina in range(options['paginas']):
+                inicio = time.perf_counter()
+                _, cursor = buscar(termo, categoria_id=categoria_id, cursor=cursor)
+                (primeira if pagina == 0 else seguintes).append((time.perf_counter() - inicio) * 1000)
+                if cursor is None:
+                    break
+
+        total = Noticia.objects.filter(titulo__startswith=PREFIXO).count()
+        self.stdout.write(f"Corpus sintético: {total} notícias")
+        for nome, tempos in (("1ª página", primeira), ("páginas seguintes", seguintes)):
+            if tempos:
+                self.stdout.write(
+                    f"{nome:>18}: n={len(tempos)} média={statistics.mean(tempos):.2f}ms "
+                    f"p50={_percentil(tempos, 50):.2f}ms p95={_percentil(tempos, 95):.2f}ms "
+                    f"p99={_percentil(tempos, 99):.2f}ms"
+                )
+
+        if options['limpar']:
+            Noticia.objects.filter(titulo__startswith=PREFIXO).delete()
+            self.stdout.write("Corpus sintético removido.")
+
+    def _gerar_corpus(self, rnd, alvo):
+        existentes = Noticia.objects.filter(titulo__startswith=PREFIXO).count()
+        faltam = alvo - existentes
+        if faltam <= 0:
+            return
+
+        categorias = list(Categoria.objects.all()) or [None]
+        self.stdout.write(f"Gerando {faltam} notícias sintéticas...")
+        lote = []
+        for _ in range(faltam):
+            # bulk_create não dispara sinais (feed, variantes); o índice de busca
+            # é mantido pelo banco (coluna gerada / triggers)
+            lote.append(Noticia(
+                titulo=PREFIXO + _texto(rnd, 8),
+                conteudo=_texto(rnd, rnd.randint(80, 400)),
+                categoria=rnd.choice(categorias),
+            ))
+            if len(lote) == 5000:
+                Noticia.objects.bulk_create(lote)
+                lote = []
+        if lote:
+            Noticia.objects.bulk_create(lote)
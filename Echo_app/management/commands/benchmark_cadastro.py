@@ -0,0 +1,88 @@
+import time
+import uuid
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.test.utils import override_settings
+
+from Echo_app.cadastro import CadastroDuplicado, cadastrar, usuarios_com_email, usuarios_com_username
+
+User = get_user_model()
+
+LOTE = 10000
+PREFIXO = 'bench_'
+
+
+def _percentil(valores, p):
+    valores = sorted(valores)
+    return valores[min(len(valores) - 1, int(len(valores) * p / 100))]
+
+
+class Command(BaseCommand):
+    help = (
+        "Mede o cadastro (Echo_app/cadastro.py) com uma tabela de usuários grande: completa "
+        "a tabela até --usuarios, cronometra --cadastros cadastros novos e repetidos e mostra "
+        "o plano da consulta de duplicidade. O hash de senha é trocado por um rápido para "
+        "medir só o banco."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--usuarios', type=int, default=2000000, help="Usuários existentes na tabela antes da medição (padrão: 2000000).")
+        parser.add_argument('--cadastros', type=int, default=2000, help="Cadastros medidos (padrão: 2000).")
+        parser.add_argument('--repetidos', type=float, default=0.2, help="Fração de cadastros com nome já usado (padrão: 0.2).")
+        parser.add_argument('--manter', action='store_true', help="Não apaga os usuários criados pela medição.")
+
+    def handle(self, *args, **options):
+        self._semear(options['usuarios'])
+
+        with override_settings(PASSWORD_HASHERS=['django.contrib.auth.hashers.MD5PasswordHasher']):
+            novos, repetidos = self._medir(options['cadastros'], options['repetidos'])
+
+        for nome, tempos in (('novos', novos), ('repetidos', repetidos)):
+            if tempos:
+                self.stdout.write(
+                    f"{nome:>9} n={len(tempos)} p50={_percentil(tempos, 50):.2f}ms "
+                    f"p95={_percentil(tempos, 95):.2f}ms p99={_percentil(tempos, 99):.2f}ms"
+                )
+        self.stdout.write("Plano da consulta de duplicidade (nome):")
+        self.stdout.write(usuarios_com_username('Bench_1').explain())
+        self.stdout.write("Plano da consulta de duplicidade (e-mail):")
+        self.stdout.write(usuarios_com_email('Bench_1@Echo.Test').explain())
+
+        if not options['manter']:
+            apagados, _ = User.objects.filter(username__startswith=f"{PREFIXO}cad_").delete()
+            self.stdout.write(f"{apagados} registro(s) da medição apagado(s).")
+
+    def _semear(self, total):
+        """Completa a tabela com usuários sintéticos (sem perfil: bulk_create não dispara sinais)."""
+        existentes = User.objects.count()
+        senha = make_password(None)  # Inutilizável, calculada uma vez
+        inicio = time.perf_counter()
+        for primeiro in range(existentes, total, LOTE):
+            User.objects.bulk_create([
+                User(username=f"{PREFIXO}{i}", email=f"{PREFIXO}{i}@echo.test", password=senha)
+                for i in range(primeiro, min(primeiro + LOTE, total))
+            ], ignore_conflicts=True)
+        if total > existentes:
+            with connection.cursor() as cursor:
+                cursor.execute("ANALYZE")  # Estatísticas do planejador com a tabela cheia
+            self.stdout.write(f"{total - existentes} usuário(s) criado(s) em {time.perf_counter() - inicio:.1f}s.")
+
+    def _medir(self, total, fracao_repetidos):
+        novos, repetidos = [], []
+        a_cada = round(1 / fracao_repetidos) if fracao_repetidos else 0
+        for i in range(total):
+            if a_cada and i % a_cada == 0:
+                username = f"{PREFIXO.upper()}{i}"  # Já existe, com outra caixa
+            else:
+                username = f"{PREFIXO}cad_{uuid.uuid4().hex[:12]}"
+            inicio = time.perf_counter()
+            try:
+                cadastrar(username, f"{username}@echo.test", 'senha-da-medicao')
+            except CadastroDuplicado:
+                repetidos.append((time.perf_counter() - inicio) * 1000)
+            else:
+                novos.append((time.perf_counter() - inicio) * 1000)
+        return novos, repetidos
@@ -0,0 +1,88 @@
+from collections import Counter
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.test import Client
+from django.test.utils import CaptureQueriesContext, override_settings
+from django.urls import reverse
+
+from Echo_app.models import Noticia
+from Echo_app.sessoes import cache_local
+
+User = get_user_model()
+
+BACKENDS = {
+    'django': 'django.contrib.sessions.backends.db',
+    'echo': 'Echo_app.sessoes',
+}
+USUARIO = 'bench_sessoes'
+SENHA = 'senha-da-medicao'
+
+
+class Command(BaseCommand):
+    help = (
+        "Conta as consultas em django_session (SELECT/INSERT/UPDATE/DELETE) de um login "
+        "seguido de --rodadas rodadas de navegação (dashboard, notícia, curtir duas vezes, "
+        "feed), com o backend de sessões do Django e com Echo_app.sessoes."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rodadas', type=int, default=20, help="Rodadas de navegação após o login (padrão: 20).")
+        parser.add_argument('--salvar-sempre', action='store_true', help="Mede com SESSION_SAVE_EVERY_REQUEST=True.")
+
+    def handle(self, *args, **options):
+        noticia = Noticia.objects.order_by('-data_publicacao').first()
+        nova_noticia = noticia is None
+        if nova_noticia:
+            noticia = Noticia.objects.create(titulo="Notícia da medição", conteudo="...")
+        usuario, criado = User.objects.get_or_create(username=USUARIO)
+        usuario.set_password(SENHA)
+        usuario.save()
+
+        try:
+            for nome, backend in BACKENDS.items():
+                with override_settings(
+                    SESSION_ENGINE=backend,
+                    SESSION_SAVE_EVERY_REQUEST=options['salvar_sempre'],
+                    ALLOWED_HOSTS=['testserver'],
+                ):
+                    login, navegacao = self._medir(noticia, options['rodadas'])
+                requisicoes = options['rodadas'] * 5
+                self.stdout.write(
+                    f"{nome:>6} login: {self._resumo(login)} | navegação ({requisicoes} requisições): "
+                    f"{self._resumo(navegacao)} = {sum(navegacao.values()) / requisicoes:.2f} por requisição"
+                )
+        finally:
+            if criado:
+                usuario.delete()
+            if nova_noticia:
+                noticia.delete()
+
+    def _medir(self, noticia, rodadas):
+        cache_local.limpar()
+        cliente = Client()
+        with CaptureQueriesContext(connection) as consultas:
+            cliente.post(reverse('entrar'), data={'username': USUARIO, 'password': SENHA})
+        login = self._contar(consultas)
+
+        navegacao = Counter()
+        curtir = reverse('noticia_curtir', args=[noticia.pk])
+        for _ in range(rodadas):
+            with CaptureQueriesContext(connection) as consultas:
+                cliente.get(reverse('dashboard'))
+                cliente.get(reverse('noticia_detalhe', args=[noticia.pk]))
+                cliente.post(curtir, HTTP_X_REQUESTED_WITH='XMLHttpRequest')
+                cliente.post(curtir, HTTP_X_REQUESTED_WITH='XMLHttpRequest')  # Desfaz a curtida
+                cliente.get(reverse('feed', args=['recomendadas']))
+            navegacao += self._contar(consultas)
+        cliente.get(reverse('sair'))
+        return login, navegacao
+
+    def _contar(self, consultas):
+        return Counter(
+            q['sql'].split()[0].upper() for q in consultas.captured_queries if 'django_session' in q['sql']
+        )
+
+    def _resumo(self, contagem):
+        return ' '.join(f"{tipo}={contagem[tipo]}" for tipo in ('SELECT', 'INSERT', 'UPDATE', 'DELETE'))
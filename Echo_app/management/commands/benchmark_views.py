@@ -0,0 +1,89 @@
+import statistics
+import time
+import urllib.error
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.test import Client
+from django.urls import reverse
+
+from Echo_app.models import Noticia
+
+
+def _percentil(valores, p):
+    valores = sorted(valores)
+    return valores[min(len(valores) - 1, int(len(valores) * p / 100))]
+
+
+class Command(BaseCommand):
+    help = (
+        "Mede latência e vazão do dashboard e da página de notícia num servidor já "
+        "em execução. Rode uma vez com ECHO_SERVIDOR=wsgi e outra com ECHO_SERVIDOR=asgi "
+        "(gunicorn.conf.py), com o mesmo número de workers, e compare."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--url', default='http://127.0.0.1:8000', help="Endereço do servidor (padrão: http://127.0.0.1:8000).")
+        parser.add_argument('--usuario', required=True, help="Username usado nas requisições autenticadas.")
+        parser.add_argument('--requisicoes', type=int, default=500, help="Requisições por página e nível de concorrência (padrão: 500).")
+        parser.add_argument('--concorrencia', type=int, nargs='+', default=[1, 8, 32], help="Clientes simultâneos (padrão: 1 8 32).")
+        parser.add_argument('--workers', type=int, default=1, help="Workers do servidor, para a concorrência por worker (padrão: 1).")
+        parser.add_argument('--rotulo', default='', help="Identifica a rodada na saída (ex.: wsgi, asgi).")
+
+    def handle(self, *args, **options):
+        usuario = get_user_model().objects.filter(username=options['usuario']).first()
+        if usuario is None:
+            raise CommandError(f"Usuário {options['usuario']!r} não existe.")
+        noticia_id = Noticia.objects.order_by('-data_publicacao').values_list('pk', flat=True).first()
+        if noticia_id is None:
+            raise CommandError("Não há notícias no banco.")
+
+        # Sessão criada direto no backend de sessões, o mesmo que o servidor usa
+        cliente = Client()
+        cliente.force_login(usuario)
+        cookie = f"{settings.SESSION_COOKIE_NAME}={cliente.cookies[settings.SESSION_COOKIE_NAME].value}"
+
+        paginas = {
+            'dashboard': reverse('dashboard'),
+            'noticia': reverse('noticia_detalhe', args=[noticia_id]),
+        }
+        rotulo = f"[{options['rotulo']}] " if options['rotulo'] else ''
+
+        for nome, caminho in paginas.items():
+            url = options['url'].rstrip('/') + caminho
+            for concorrencia in options['concorrencia']:
+                tempos, erros, duracao = self._medir(url, cookie, options['requisicoes'], concorrencia)
+                if not tempos:
+                    self.stdout.write(self.style.ERROR(f"{rotulo}{nome} c={concorrencia}: todas as {erros} requisições falharam"))
+                    continue
+                vazao = len(tempos) / duracao
+                # Lei de Little: requisições em andamento, em média, por worker
+                por_worker = vazao * statistics.mean(tempos) / 1000 / options['workers']
+                self.stdout.write(
+                    f"{rotulo}{nome:>9} c={concorrencia:<3} n={len(tempos)} erros={erros} "
+                    f"p50={_percentil(tempos, 50):.1f}ms p95={_percentil(tempos, 95):.1f}ms "
+                    f"p99={_percentil(tempos, 99):.1f}ms vazão={vazao:.1f} req/s "
+                    f"concorrência/worker={por_worker:.2f}"
+                )
+
+    def _medir(self, url, cookie, total, concorrencia):
+        def requisitar(_):
+            pedido = urllib.request.Request(url, headers={'Cookie': cookie})
+            inicio = time.perf_counter()
+            try:
+                with urllib.request.urlopen(pedido, timeout=30) as resposta:
+                    resposta.read()
+            except (urllib.error.URLError, OSError):
+                return None
+            return (time.perf_counter() - inicio) * 1000
+
+        inicio = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=concorrencia) as executor:
+            resultados = list(executor.map(requisitar, range(total)))
+        duracao = time.perf_counter() - inicio
+
+        tempos = [tempo for tempo in resultados if tempo is not None]
+        return tempos, len(resultados) - len(tempos), duracao
@@ -0,0 +1,55 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from Echo_app.similaridade import (
+    BLOCO, K, MINIMO_EM_COMUM, TAMANHO_LOTE, calcular_similares, interacoes_sinteticas, matriz_usuario_noticia,
+    vizinhas,
+)
+
+
+class Command(BaseCommand):
+    help = (
+        "Recalcula as notícias similares (filtragem colaborativa item-item) a partir de "
+        "InteracaoNoticia. Feito para rodar uma vez por noite (ver Echo_app/similaridade.py)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dias', type=int, default=30, help="Só notícias publicadas nos últimos N dias; 0 = todas (padrão: 30).")
+        parser.add_argument('--k', type=int, default=K, help=f"Vizinhas guardadas por notícia (padrão: {K}).")
+        parser.add_argument('--minimo-em-comum', type=int, default=MINIMO_EM_COMUM, help=f"Usuários em comum para um par contar (padrão: {MINIMO_EM_COMUM}).")
+        parser.add_argument('--lote', type=int, default=TAMANHO_LOTE, help=f"Interações lidas por consulta (padrão: {TAMANHO_LOTE}).")
+        parser.add_argument('--bloco', type=int, default=BLOCO, help=f"Notícias por bloco da multiplicação (padrão: {BLOCO}).")
+        parser.add_argument('--benchmark', type=int, metavar='N', help="Não toca no banco: mede matriz e similaridade com N interações sintéticas.")
+
+    def handle(self, *args, **options):
+        if options['benchmark']:
+            return self._benchmark(options)
+
+        resultado = calcular_similares(
+            dias=options['dias'], k=options['k'], minimo_em_comum=options['minimo_em_comum'],
+            tamanho_lote=options['lote'], bloco=options['bloco'],
+        )
+        tempos = ", ".join(f"{etapa}={segundos:.1f}s" for etapa, segundos in resultado['tempos'].items())
+        self.stdout.write(self.style.SUCCESS(
+            f"{resultado['interacoes']} interação(ões), {resultado['noticias']} notícia(s), "
+            f"{resultado['pares']} par(es) gravado(s). {tempos}"
+        ))
+
+    def _benchmark(self, options):
+        usuarios, noticias, pesos = interacoes_sinteticas(options['benchmark'])
+
+        inicio = time.perf_counter()
+        matriz, ids_noticias = matriz_usuario_noticia(usuarios, noticias, pesos)
+        tempo_matriz = time.perf_counter() - inicio
+
+        inicio = time.perf_counter()
+        pares = sum(len(similares) for _, similares, _ in vizinhas(
+            matriz, ids_noticias, options['k'], options['minimo_em_comum'], options['bloco']
+        ))
+        tempo_similaridade = time.perf_counter() - inicio
+
+        self.stdout.write(
+            f"{len(usuarios)} interações, {matriz.shape[0]} usuários, {matriz.shape[1]} notícias: "
+            f"matriz={tempo_matriz:.1f}s similaridade={tempo_similaridade:.1f}s pares={pares}"
+        )
@@ -0,0 +1,24 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+
+from Echo_app.retencao import MESES_A_FRENTE, criar_particoes
+
+
+class Command(BaseCommand):
+    help = (
+        "Cria as partições mensais dos próximos meses de InteracaoNoticia e Notificacao "
+        "(só PostgreSQL). Com --converter, refaz como particionadas as tabelas que ainda não são."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--meses', type=int, default=MESES_A_FRENTE, help=f"Meses à frente do atual (padrão: {MESES_A_FRENTE}).")
+        parser.add_argument('--converter', action='store_true', help="Converte as tabelas não particionadas (lock exclusivo durante a cópia).")
+
+    def handle(self, *args, **options):
+        if connection.vendor != 'postgresql':
+            raise CommandError("Particionamento por data só existe no PostgreSQL.")
+        criadas = criar_particoes(meses=options['meses'], converter=options['converter'])
+        if not criadas:
+            self.stdout.write(self.style.WARNING("Nenhuma tabela particionada: rode com --converter."))
+        for tabela, quantas in criadas.items():
+            self.stdout.write(self.style.SUCCESS(f"{tabela}: {quantas} partição(ões) criada(s)."))
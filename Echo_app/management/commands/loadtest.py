@@ -0,0 +1,298 @@
+import http.cookiejar
+import json
+import random
+import subprocess
+import threading
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+from collections import Counter, defaultdict
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, connections
+from django.test import Client
+from django.test.utils import override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from Echo_app.models import Noticia
+
+User = get_user_model()
+
+# Rota -> peso no sorteio de cada requisição dos usuários simulados
+MIX = {
+    'dashboard': 35,
+    'noticia_detalhe': 35,
+    'noticia_curtir': 10,
+    'noticia_salvar': 10,
+    'entrar': 10,
+}
+PREFIXO = 'carga_'
+SENHA = 'senha-do-teste-de-carga'
+NOTICIAS_SORTEADAS = 200  # As mais recentes, de onde saem as notícias abertas/curtidas
+
+
+def _percentil(valores, p):
+    valores = sorted(valores)
+    return valores[min(len(valores) - 1, int(len(valores) * p / 100))]
+
+
+class _UsuarioLocal:
+    """Usuário simulado no próprio processo, pelo client de testes do Django."""
+
+    def __init__(self, base):
+        self.cliente = Client(raise_request_exception=False)  # Erro na view vira resposta 500, contada como erro
+
+    def requisitar(self, metodo, caminho, dados=None, ajax=False):
+        extra = {'HTTP_X_REQUESTED_WITH': 'XMLHttpRequest'} if ajax else {}
+        resposta = getattr(self.cliente, metodo)(caminho, dados or {}, **extra)
+        return resposta.status_code, resposta.get('X-Consultas')
+
+    def encerrar(self):
+        connections.close_all()  # As conexões desta thread
+
+
+class _SemRedirecionar(urllib.request.HTTPRedirectHandler):
+    def redirect_request(self, *args, **kwargs):
+        return None  # O redirecionamento vira a resposta medida (HTTPError com 3xx)
+
+
+class _UsuarioHttp:
+    """Usuário simulado contra um servidor em execução, com cookies e CSRF como um navegador."""
+
+    def __init__(self, base):
+        self.base = base
+        self.cookies = http.cookiejar.CookieJar()
+        self.abridor = urllib.request.build_opener(urllib.request.HTTPCookieProcessor(self.cookies), _SemRedirecionar)
+
+    def _csrf(self):
+        return next((cookie.value for cookie in self.cookies if cookie.name == settings.CSRF_COOKIE_NAME), '')
+
+    def requisitar(self, metodo, caminho, dados=None, ajax=False):
+        url = self.base + caminho
+        cabecalhos = {'X-CSRFToken': self._csrf(), 'Referer': url}
+        if ajax:
+            cabecalhos['X-Requested-With'] = 'XMLHttpRequest'
+        corpo = urllib.parse.urlencode(dados or {}).encode() if metodo == 'post' else None
+        pedido = urllib.request.Request(url, data=corpo, headers=cabecalhos, method=metodo.upper())
+        try:
+            with self.abridor.open(pedido, timeout=30) as resposta:
+                resposta.read()
+                return resposta.status, resposta.headers.get('X-Consultas')
+        except urllib.error.HTTPError as erro:  # 4xx/5xx e os redirecionamentos não seguidos
+            return erro.code, erro.headers.get('X-Consultas')
+
+    def encerrar(self):
+        pass
+
+
+class Command(BaseCommand):
+    help = (
+        "Teste de carga: --usuarios usuários simulados, logados e simultâneos, fazem por "
+        "--duracao segundos uma mistura das rotas reais (MIX: dashboard, notícia, curtir, "
+        "salvar, entrar). Sem --url roda no próprio processo, pelo client de testes; com "
+        "--url, contra um servidor em execução (suba-o com ORCAMENTO_CABECALHO=1 para ter "
+        "as consultas por rota). Mostra vazão, p50/p95/p99 e consultas por rota em tabela "
+        "e em JSON, para comparar rodadas entre commits. Cria os usuários carga_N, com uma "
+        "senha fixa, no banco configurado: só com DEBUG ou --permitir-producao; --limpar "
+        "os apaga no fim."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--url', help="Servidor a testar (ex.: http://127.0.0.1:8000). Sem ela, roda no processo.")
+        parser.add_argument('--usuarios', type=int, default=20, help="Usuários simulados simultâneos (padrão: 20).")
+        parser.add_argument('--duracao', type=float, default=30, help="Segundos medidos (padrão: 30).")
+        parser.add_argument('--aquecimento', type=float, default=3, help="Segundos iniciais descartados (padrão: 3).")
+        parser.add_argument('--pausa', type=float, default=0, help="Pausa média entre requisições de um usuário, em ms (padrão: 0).")
+        parser.add_argument('--semente', type=int, default=1, help="Semente do sorteio das rotas e notícias (padrão: 1).")
+        parser.add_argument('--json', dest='arquivo_json', help="Grava o relatório JSON neste arquivo em vez de imprimi-lo.")
+        parser.add_argument(
+            '--permitir-producao', action='store_true',
+            help="Roda mesmo sem DEBUG: cria os usuários de carga, de senha conhecida, no banco configurado.",
+        )
+        parser.add_argument('--limpar', action='store_true', help=f"Apaga os usuários {PREFIXO}N (e o que eles criaram) no fim.")
+
+    def handle(self, *args, **options):
+        if not settings.DEBUG and not options['permitir_producao']:
+            raise CommandError(
+                f"Sem DEBUG, o teste de carga cria usuários {PREFIXO}N com senha conhecida no banco "
+                f"configurado. Use --permitir-producao se é isso mesmo."
+            )
+        if not options['url'] and connection.vendor == 'sqlite' and options['usuarios'] > 1:
+            raise CommandError(
+                "No processo, com SQLite, os usuários simultâneos disputam o lock de escrita do "
+                "arquivo (\"database is locked\"). Use --usuarios 1, PostgreSQL, ou --url com um servidor."
+            )
+        noticias = list(
+            Noticia.objects.order_by('-data_publicacao').values_list('pk', flat=True)[:NOTICIAS_SORTEADAS]
+        )
+        if not noticias:
+            raise CommandError("Não há notícias no banco.")
+        usernames = self._preparar_usuarios(options['usuarios'])
+
+        excecoes = Counter()
+        try:
+            if options['url']:
+                fabrica, base = _UsuarioHttp, options['url'].rstrip('/')
+                amostras, duracao = self._rodar(fabrica, base, usernames, noticias, options, excecoes)
+            else:
+                fabrica, base = _UsuarioLocal, ''
+                with override_settings(ORCAMENTO_CABECALHO=True, ALLOWED_HOSTS=[*settings.ALLOWED_HOSTS, 'testserver']):
+                    amostras, duracao = self._rodar(fabrica, base, usernames, noticias, options, excecoes)
+        finally:
+            if options['limpar']:
+                apagados = User.objects.filter(username__startswith=PREFIXO).delete()[1].get(User._meta.label, 0)
+                self.stdout.write(f"{apagados} usuário(s) de carga apagado(s).")
+
+        relatorio = self._relatorio(amostras, duracao, options, excecoes)
+        self._imprimir_tabela(relatorio)
+        texto = json.dumps(relatorio, indent=2, ensure_ascii=False)
+        if options['arquivo_json']:
+            with open(options['arquivo_json'], 'w', encoding='utf-8') as arquivo:
+                arquivo.write(texto + '\n')
+            self.stdout.write(f"Relatório JSON gravado em {options['arquivo_json']}.")
+        else:
+            self.stdout.write(texto)
+
+    def _preparar_usuarios(self, total):
+        """Garante `total` usuários de carga (com perfil, criado pelo sinal) com a mesma senha."""
+        usernames = [f"{PREFIXO}{i}" for i in range(total)]
+        existentes = set(User.objects.filter(username__in=usernames).values_list('username', flat=True))
+        senha = make_password(SENHA)  # Calculada uma vez para todos
+        for username in usernames:
+            if username not in existentes:
+                User(username=username, email=f"{username}@echo.test", password=senha).save()
+        if len(existentes) < total:
+            self.stdout.write(f"{total - len(existentes)} usuário(s) de carga criado(s).")
+        return usernames
+
+    def _rodar(self, fabrica, base, usernames, noticias, options, excecoes):
+        usuarios = self._entrar(fabrica, base, usernames)
+        inicio = time.perf_counter() + options['aquecimento']
+        fim = inicio + options['duracao']
+        amostras = []
+        trava = threading.Lock()
+
+        def simular(indice, username, usuario):
+            sorteio = random.Random(options['semente'] * 1000003 + indice)
+            locais = []
+            try:
+                while (agora := time.perf_counter()) < fim:
+                    rota = sorteio.choices(list(MIX), weights=list(MIX.values()))[0]
+                    metodo, caminho, dados, ajax = self._pedido(rota, sorteio, noticias, username)
+                    try:
+                        status, consultas = usuario.requisitar(metodo, caminho, dados, ajax)
+                    except Exception as erro:  # Conexão recusada, banco travado, erro na view...
+                        status, consultas = None, None
+                        self._registrar_excecao(excecoes, trava, rota, erro)  # Também no aquecimento
+                    if agora >= inicio:
+                        locais.append((rota, (time.perf_counter() - agora) * 1000, status, consultas))
+                    if options['pausa']:
+                        time.sleep(sorteio.expovariate(1000 / options['pausa']))
+            finally:
+                usuario.encerrar()
+                with trava:
+                    amostras.extend(locais)
+
+        threads = [
+            threading.Thread(target=simular, args=(i, username, usuario))
+            for i, (username, usuario) in enumerate(zip(usernames, usuarios))
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return amostras, max(time.perf_counter(), fim) - inicio
+
+    def _registrar_excecao(self, excecoes, trava, rota, erro):
+        """Conta a exceção por rota e tipo; a primeira de cada vai para o stderr."""
+        chave = f"{rota}: {type(erro).__name__}"
+        with trava:
+            excecoes[chave] += 1
+            primeira = excecoes[chave] == 1
+        if primeira:
+            self.stderr.write(f"{chave}: {erro}")
+
+    def _entrar(self, fabrica, base, usernames):
+        """Loga os usuários simulados um a um, fora da medição (pega o cookie de CSRF e entra)."""
+        usuarios = []
+        for username in usernames:
+            usuario = fabrica(base)
+            usuario.requisitar('get', reverse('entrar'))
+            status, _ = usuario.requisitar('post', reverse('entrar'), {'username': username, 'password': SENHA})
+            if status != 302:
+                raise CommandError(f"O login de {username} falhou (HTTP {status}).")
+            usuarios.append(usuario)
+        return usuarios
+
+    def _pedido(self, rota, sorteio, noticias, username):
+        """(método, caminho, dados, ajax) da próxima requisição da rota sorteada."""
+        if rota == 'dashboard':
+            return 'get', reverse('dashboard'), None, False
+        if rota == 'entrar':
+            return 'post', reverse('entrar'), {'username': username, 'password': SENHA}, False
+        noticia_id = noticias[min(int(sorteio.expovariate(0.05)), len(noticias) - 1)]  # Mais recentes, mais vistas
+        if rota == 'noticia_detalhe':
+            return 'get', reverse(rota, args=[noticia_id]), None, False
+        return 'post', reverse(rota, args=[noticia_id]), None, True  # Curtir/salvar: o botão faz AJAX
+
+    def _resumo(self, amostras, duracao):
+        tempos = [tempo for _, tempo, status, _ in amostras if status is not None and status < 400]
+        consultas = [int(c) for *_, c in amostras if c is not None]
+        resumo = {
+            'requisicoes': len(amostras),
+            'erros': len(amostras) - len(tempos),
+            'req_s': round(len(tempos) / duracao, 1),
+            'p50_ms': None, 'p95_ms': None, 'p99_ms': None,
+            'consultas_media': round(sum(consultas) / len(consultas), 1) if consultas else None,
+            'consultas_max': max(consultas) if consultas else None,
+        }
+        if tempos:
+            for p in (50, 95, 99):
+                resumo[f'p{p}_ms'] = round(_percentil(tempos, p), 1)
+        return resumo
+
+    def _relatorio(self, amostras, duracao, options, excecoes):
+        por_rota = defaultdict(list)
+        for amostra in amostras:
+            por_rota[amostra[0]].append(amostra)
+        return {
+            'commit': self._commit(),
+            'data': timezone.now().isoformat(timespec='seconds'),
+            'alvo': options['url'] or 'processo',
+            'usuarios': options['usuarios'],
+            'duracao_s': round(duracao, 1),
+            'pausa_ms': options['pausa'],
+            'mix': MIX,
+            'total': self._resumo(amostras, duracao),
+            'rotas': {rota: self._resumo(por_rota[rota], duracao) for rota in MIX if por_rota[rota]},
+            'excecoes': dict(excecoes),  # "rota: Tipo" -> quantas, aquecimento incluído
+        }
+
+    def _commit(self):
+        try:
+            return subprocess.run(
+                ['git', 'rev-parse', '--short', 'HEAD'], cwd=settings.BASE_DIR,
+                capture_output=True, text=True, check=True,
+            ).stdout.strip()
+        except (OSError, subprocess.CalledProcessError):
+            return None
+
+    def _imprimir_tabela(self, relatorio):
+        colunas = ('requisicoes', 'erros', 'req_s', 'p50_ms', 'p95_ms', 'p99_ms', 'consultas_media', 'consultas_max')
+        titulos = ('n', 'erros', 'req/s', 'p50 ms', 'p95 ms', 'p99 ms', 'consultas', 'máx')
+        self.stdout.write(
+            f"commit {relatorio['commit'] or '?'} | alvo {relatorio['alvo']} | {relatorio['usuarios']} usuários "
+            f"| {relatorio['duracao_s']}s medidos"
+        )
+        self.stdout.write(f"{'rota':<16}" + ''.join(f"{titulo:>10}" for titulo in titulos))
+        linhas = [*relatorio['rotas'].items(), ('total', relatorio['total'])]
+        for rota, resumo in linhas:
+            valores = ('-' if resumo[coluna] is None else resumo[coluna] for coluna in colunas)
+            self.stdout.write(f"{rota:<16}" + ''.join(f"{valor:>10}" for valor in valores))
+        for chave, quantas in relatorio['excecoes'].items():
+            self.stdout.write(self.style.WARNING(f"exceção {chave}: {quantas}x"))
@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from Echo_app.em_alta import podar
+
+
+class Command(BaseCommand):
+    help = (
+        "Apaga os baldes de AtividadeNoticia que já saíram da janela das notícias em alta "
+        "(24h). Agende junto com `reconciliar_contadores`."
+    )
+
+    def handle(self, *args, **options):
+        apagados = podar()
+        self.stdout.write(self.style.SUCCESS(f"{apagados} balde(s) de atividade apagado(s)."))
@@ -0,0 +1,19 @@
+from django.core.management.base import BaseCommand
+
+from Echo_app.retencao import PAUSA, TAMANHO_LOTE, dias_retencao_notificacoes, podar_notificacoes
+
+
+class Command(BaseCommand):
+    help = (
+        "Apaga em lotes as notificações lidas mais antigas que NOTIFICACOES_RETENCAO_DIAS. "
+        "As não lidas nunca são apagadas."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dias', type=int, default=None, help=f"Idade mínima, em dias (padrão: {dias_retencao_notificacoes()}).")
+        parser.add_argument('--lote', type=int, default=TAMANHO_LOTE, help=f"Notificações por DELETE (padrão: {TAMANHO_LOTE}).")
+        parser.add_argument('--pausa', type=float, default=PAUSA, help=f"Segundos entre lotes (padrão: {PAUSA}).")
+
+    def handle(self, *args, **options):
+        apagadas = podar_notificacoes(dias=options['dias'], tamanho_lote=options['lote'], pausa=options['pausa'])
+        self.stdout.write(self.style.SUCCESS(f"{apagadas} notificação(ões) lida(s) apagada(s)."))
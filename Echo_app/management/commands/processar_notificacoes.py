@@ -0,0 +1,35 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from Echo_app.feed import distribuir_pendentes
+from Echo_app.notificacoes import TAMANHO_LOTE, processar_pendentes
+
+
+class Command(BaseCommand):
+    help = (
+        "Worker da fila de notificações: transforma cada EnvioNotificacao em Notificacao "
+        "para os seguidores da categoria, e coloca as notícias publicadas ou recategorizadas "
+        "nos feeds (DistribuicaoFeed). Pode rodar em vários processos ao mesmo tempo."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--lote', type=int, default=TAMANHO_LOTE, help=f"Notificações por bulk_create (padrão: {TAMANHO_LOTE}).")
+        parser.add_argument('--intervalo', type=float, default=5, help="Segundos de espera quando a fila está vazia (padrão: 5).")
+        parser.add_argument('--uma-vez', action='store_true', help="Esvazia a fila e termina, em vez de ficar escutando.")
+
+    def handle(self, *args, **options):
+        while True:
+            processados = processar_pendentes(tamanho_lote=options['lote'])
+            if processados:
+                self.stdout.write(f"{processados} envio(s) concluído(s).")
+            distribuidas = distribuir_pendentes()
+            if distribuidas:
+                self.stdout.write(f"{distribuidas} notícia(s) distribuída(s) nos feeds.")
+            if options['uma_vez']:
+                break
+            close_old_connections()
+            time.sleep(options['intervalo'])
+
+        self.stdout.write(self.style.SUCCESS("Filas de notificações e de feeds vazias."))
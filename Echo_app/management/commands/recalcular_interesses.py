@@ -0,0 +1,19 @@
+from django.core.management.base import BaseCommand
+
+from Echo_app.interesses import recalcular, reconstruir_feeds_do_historico
+
+
+class Command(BaseCommand):
+    help = (
+        "Recalcula do zero as pontuações de HistoricoInteresse a partir de InteracaoNoticia "
+        "(com decaimento) e reconstrói os feeds guiados pelo histórico."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--lote', type=int, default=10000, help="Interações lidas por vez (padrão: 10000).")
+
+    def handle(self, *args, **options):
+        total = recalcular(tamanho_lote=options['lote'])
+        self.stdout.write(f"{total} interação(ões) processada(s).")
+        feeds = reconstruir_feeds_do_historico()
+        self.stdout.write(self.style.SUCCESS(f"Pontuações recalculadas; {feeds} feed(s) reconstruído(s)."))
@@ -0,0 +1,22 @@
+from django.core.management.base import BaseCommand
+
+from Echo_app.contadores import reconciliar_contadores
+from Echo_app.notificacoes import reconciliar_nao_lidas
+
+
+class Command(BaseCommand):
+    help = (
+        "Corrige em lote curtidas_count e salvamentos_count que divergem de InteracaoNoticia "
+        "e o contador de notificações não lidas dos perfis."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--lote', type=int, default=5000, help="Quantas notícias processar por UPDATE (padrão: 5000).")
+
+    def handle(self, *args, **options):
+        corrigidas = reconciliar_contadores(tamanho_lote=options['lote'])
+        for campo, total in corrigidas.items():
+            self.stdout.write(f"{campo}: {total} notícia(s) corrigida(s)")
+        total = reconciliar_nao_lidas(tamanho_lote=options['lote'])
+        self.stdout.write(f"notificacoes_nao_lidas: {total} perfil(is) corrigido(s)")
+        self.stdout.write(self.style.SUCCESS("Reconciliação concluída."))
@@ -0,0 +1,25 @@
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+
+from Echo_app.feed import reconstruir_feed
+
+User = get_user_model()
+
+
+class Command(BaseCommand):
+    help = "Recalcula do zero o feed de recomendações materializado (FeedRecomendacao) dos usuários."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--usuario', type=int, action='append', help="Recalcula apenas o(s) usuário(s) com este id.")
+
+    def handle(self, *args, **options):
+        usuarios = User.objects.order_by('pk').values_list('pk', flat=True)
+        if options['usuario']:
+            usuarios = usuarios.filter(pk__in=options['usuario'])
+
+        total = 0
+        for usuario_id in usuarios.iterator(chunk_size=1000):
+            reconstruir_feed(usuario_id)
+            total += 1
+
+        self.stdout.write(self.style.SUCCESS(f"{total} feed(s) reconstruído(s)."))
@@ -0,0 +1,364 @@
+import csv
+import io
+from contextlib import contextmanager
+import math
+import time
+
+import numpy as np
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.core.management.color import no_style
+from django.db import connection, transaction
+from django.utils import timezone
+
+from Echo_app.interesses import EPOCA, MEIA_VIDA, PESOS
+from Echo_app.models import Categoria, HistoricoInteresse, InteracaoNoticia, Noticia, Notificacao, PerfilUsuario
+from Echo_app.notificacoes import manchete_da_noticia
+
+User = get_user_model()
+
+PREFIXO_USUARIO = 'seed_'
+PREFIXO_NOTICIA = '[seed] '
+BLOCO = 10000  # Usuários gerados juntos; fixo, para os dados não dependerem de --lote
+FRACAO_NAS_CATEGORIAS = 0.6  # Interações em notícias das categorias de interesse do usuário
+FRACAO_SALVAMENTOS = 0.25
+ATRASO_INTERACAO = 12 * 3600  # Segundos, em média, entre a publicação e a interação
+ATRASO_NOTIFICACAO = 10 * 60  # Segundos, em média, entre a publicação e a notificação
+PARAGRAFOS = 64  # Textos distintos sorteados para o conteúdo das notícias
+
+VOCABULARIO = (
+    "governo prefeitura recife pernambuco eleição câmara senado economia inflação juros "
+    "mercado emprego salário saúde hospital vacina escola educação universidade sport náutico "
+    "santa cruz futebol campeonato clássico gol torcida chuva trânsito metrô ônibus praia "
+    "carnaval frevo maracatu cultura música festival turismo polícia segurança operação "
+    "tecnologia internet startup porto digital energia solar água saneamento obra ponte"
+).split()
+
+_MICRO = 10 ** 6
+_LAMBDA = math.log(2) / MEIA_VIDA.total_seconds()  # O mesmo decaimento de Echo_app/interesses.py
+_PESOS_TIPO = np.array([PESOS['CURTIDA'], PESOS['SALVAMENTO']])
+_TIPOS = ['CURTIDA', 'SALVAMENTO']
+
+
+def _unicos(*colunas, tamanhos):
+    """Índices da primeira ocorrência de cada combinação de valores (chave composta em int64)."""
+    chave = np.zeros(len(colunas[0]), dtype=np.int64)
+    for coluna, tamanho in zip(colunas, tamanhos):
+        chave = chave * tamanho + coluna
+    return np.sort(np.unique(chave, return_index=True)[1])
+
+
+class Command(BaseCommand):
+    help = (
+        "Gera dados sintéticos em escala de produção: usuários com perfil e categorias de "
+        "interesse, notícias com popularidade Zipf, interações, histórico de interesse e "
+        "notificações. Determinístico pela --semente (as datas são relativas ao momento da "
+        "geração). Grava com COPY no PostgreSQL e INSERT em lote (executemany) nos demais "
+        "bancos. Feed, vizinhas e ranking em alta são derivados: rode depois "
+        "`reconstruir_feeds` e `calcular_similares`."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--usuarios', type=int, default=100000, help="Usuários (padrão: 100000).")
+        parser.add_argument('--noticias', type=int, help="Notícias (padrão: usuários / 10).")
+        parser.add_argument('--interacoes', type=int, help="Interações, aproximadamente (padrão: 50 por usuário).")
+        parser.add_argument('--notificacoes', type=float, default=20, help="Notificações por usuário, em média (padrão: 20).")
+        parser.add_argument('--dias', type=int, default=180, help="Período coberto pelas publicações (padrão: 180).")
+        parser.add_argument('--zipf', type=float, default=1.1, help="Expoente da popularidade das notícias, > 1 (padrão: 1.1).")
+        parser.add_argument('--senha', help="Senha dos usuários gerados (padrão: inutilizável).")
+        parser.add_argument('--lote', type=int, default=50000, help="Linhas por INSERT em lote / COPY (padrão: 50000).")
+        parser.add_argument('--semente', type=int, default=42)
+
+    def handle(self, *args, **options):
+        if options['zipf'] <= 1:
+            raise CommandError("--zipf precisa ser maior que 1.")
+        if User.objects.filter(username__startswith=PREFIXO_USUARIO).exists():
+            raise CommandError("Este banco já tem dados do seed_scale; gere num banco novo (ou rode `flush`).")
+
+        self.options = options
+        self.lote = options['lote']
+        self.agora = int(timezone.now().timestamp() * _MICRO)
+        total_usuarios = options['usuarios']
+        total_noticias = options['noticias'] or max(total_usuarios // 10, 1)
+        self.media_interacoes = (options['interacoes'] or total_usuarios * 50) / max(total_usuarios, 1)
+        self.linhas = {}
+        self.manchetes = {}  # Índice da notícia -> manchete, montada uma vez
+        inicio = time.perf_counter()
+
+        self.categorias = self._categorias()
+        primeiro_usuario = (User.objects.order_by('-pk').values_list('pk', flat=True).first() or 0) + 1
+        primeiro_perfil = (PerfilUsuario.objects.order_by('-pk').values_list('pk', flat=True).first() or 0) + 1
+        primeira_noticia = (Noticia.objects.order_by('-pk').values_list('pk', flat=True).first() or 0) + 1
+
+        noticias = self._gerar_noticias(total_noticias)
+        blocos = range(0, total_usuarios, BLOCO)
+
+        # 1ª passada (só numpy): os contadores das notícias, que são gravadas antes das interações
+        curtidas = np.zeros(total_noticias, dtype=np.int64)
+        salvamentos = np.zeros(total_noticias, dtype=np.int64)
+        for primeiro in blocos:
+            _, _, interacoes = self._gerar_bloco(primeiro, min(BLOCO, total_usuarios - primeiro), noticias, notificacoes=False)
+            _, noticia, tipo, _ = interacoes
+            curtidas += np.bincount(noticia[tipo == 0], minlength=total_noticias)
+            salvamentos += np.bincount(noticia[tipo == 1], minlength=total_noticias)
+
+        self._gravar_noticias(noticias, primeira_noticia, curtidas, salvamentos)
+
+        senha = make_password(options['senha'])  # Calculada uma vez para todos
+        with self._sem_indices(InteracaoNoticia, HistoricoInteresse, Notificacao):
+            for primeiro in blocos:
+                quantos = min(BLOCO, total_usuarios - primeiro)
+                ordem, k, interacoes, notificacoes = self._gerar_bloco(primeiro, quantos, noticias)
+                self._gravar_bloco(
+                    primeiro, quantos, primeiro_usuario + primeiro, primeiro_perfil + primeiro, primeira_noticia,
+                    senha, noticias, ordem, k, interacoes, notificacoes,
+                )
+                self.stdout.write(f"  {primeiro + quantos}/{total_usuarios} usuários", ending='\r')
+            self.stdout.write('')
+
+        self._finalizar()
+        duracao = time.perf_counter() - inicio
+        total = sum(linhas for linhas, _ in self.linhas.values())
+        for tabela, (linhas, segundos) in self.linhas.items():
+            self.stdout.write(f"{tabela:>46}: {linhas:>11} linhas em {segundos:7.1f}s ({linhas / max(segundos, 1e-9):,.0f}/s)")
+        self.stdout.write(f"{total} linhas em {duracao:.1f}s ({total / duracao:,.0f} linhas/s no total).")
+        self.stdout.write("Derivados: rode `reconstruir_feeds` e `calcular_similares`.")
+
+    # ===================== GERAÇÃO =====================
+
+    def _categorias(self):
+        if not Categoria.objects.exists():
+            call_command('loaddata', 'categorias', verbosity=0)
+        return list(Categoria.objects.order_by('pk'))
+
+    def _gerar_noticias(self, total):
+        gerador = np.random.default_rng([self.options['semente'], 0])
+        quantas_categorias = len(self.categorias)
+        # Algumas categorias publicam bem mais que outras
+        pesos = 1 / np.arange(1, quantas_categorias + 1) ** 0.8
+        categoria = gerador.choice(quantas_categorias, size=total, p=pesos / pesos.sum())
+        # Ids crescentes com a data, como na produção
+        idade = np.sort(gerador.random(total))[::-1] * self.options['dias'] * 86400 * _MICRO
+        data = self.agora - idade.astype(np.int64)
+        por_popularidade = gerador.permutation(total)  # Posição no ranking Zipf -> notícia
+        # Dentro de cada categoria, também da mais popular para a menos
+        por_categoria = por_popularidade[np.argsort(categoria[por_popularidade], kind='stable')]
+        tamanho_categoria = np.bincount(categoria, minlength=quantas_categorias)
+        return {
+            'total': total,
+            'categoria': categoria,
+            'data': data,
+            'por_popularidade': por_popularidade,
+            'por_categoria': por_categoria,
+            'tamanho_categoria': tamanho_categoria,
+            'inicio_categoria': np.concatenate([[0], np.cumsum(tamanho_categoria)[:-1]]),
+            'titulo': gerador.integers(0, len(VOCABULARIO), size=(total, 6)),
+            'paragrafo': gerador.integers(0, PARAGRAFOS, size=total),
+            'paragrafos': [
+                " ".join(VOCABULARIO[i] for i in gerador.integers(0, len(VOCABULARIO), size=gerador.integers(60, 200)))
+                for _ in range(PARAGRAFOS)
+            ],
+        }
+
+    def _gerar_bloco(self, primeiro, quantos, noticias, notificacoes=True):
+        """Categorias de interesse, interações e notificações dos usuários [primeiro, primeiro + quantos)."""
+        gerador = np.random.default_rng([self.options['semente'], 1, primeiro])
+        total_noticias = noticias['total']
+
+        # Categorias de interesse: 1 a 4, sorteadas sem repetição pelas mais publicadas (Gumbel top-k)
+        quantas_categorias = len(self.categorias)
+        chaves = np.log(noticias['tamanho_categoria'] + 1) + gerador.gumbel(size=(quantos, quantas_categorias))
+        ordem = np.argsort(-chaves, axis=1)
+        k = np.minimum(1 + gerador.binomial(3, 0.4, size=quantos), quantas_categorias)
+
+        # Atividade com cauda longa: poucos usuários interagem muito
+        atividade = gerador.lognormal(0, 1, size=quantos) / math.exp(0.5)
+        usuario = np.repeat(np.arange(quantos), gerador.poisson(self.media_interacoes * atividade))
+        total = len(usuario)
+        posicao = gerador.zipf(self.options['zipf'], size=total) - 1
+        noticia = noticias['por_popularidade'][posicao % total_noticias]
+        categoria = ordem[usuario, (gerador.random(total) * k[usuario]).astype(np.int64)]
+        tamanho = noticias['tamanho_categoria'][categoria]
+        nas_categorias = (gerador.random(total) < FRACAO_NAS_CATEGORIAS) & (tamanho > 0)
+        noticia[nas_categorias] = noticias['por_categoria'][
+            noticias['inicio_categoria'][categoria[nas_categorias]] + posicao[nas_categorias] % tamanho[nas_categorias]
+        ]
+        tipo = (gerador.random(total) < FRACAO_SALVAMENTOS).astype(np.int64)
+        atraso = gerador.exponential(ATRASO_INTERACAO * _MICRO, size=total).astype(np.int64)
+        data = np.minimum(noticias['data'][noticia] + atraso, self.agora)
+        unicas = _unicos(usuario, noticia, tipo, tamanhos=(quantos, total_noticias, 2))
+        interacoes = (usuario[unicas], noticia[unicas], tipo[unicas], data[unicas])
+        if not notificacoes:
+            return ordem, k, interacoes
+
+        # Notificações: notícias das categorias seguidas, a maioria das antigas já lida
+        usuario = np.repeat(np.arange(quantos), gerador.poisson(self.options['notificacoes'], size=quantos))
+        total = len(usuario)
+        categoria = ordem[usuario, (gerador.random(total) * k[usuario]).astype(np.int64)]
+        tamanho = noticias['tamanho_categoria'][categoria]
+        sorteio = gerador.random(total)
+        atraso = gerador.exponential(ATRASO_NOTIFICACAO * _MICRO, size=total).astype(np.int64)
+        leitura = gerador.random(total)
+        validas = tamanho > 0
+        noticia = np.zeros(total, dtype=np.int64)
+        noticia[validas] = noticias['por_categoria'][
+            noticias['inicio_categoria'][categoria[validas]] + (sorteio[validas] * tamanho[validas]).astype(np.int64)
+        ]
+        data = np.minimum(noticias['data'][noticia] + atraso, self.agora)
+        lida = leitura < np.where(self.agora - data > 2 * 86400 * _MICRO, 0.9, 0.3)
+        unicas = _unicos(usuario, noticia, tamanhos=(quantos, total_noticias))
+        unicas = unicas[validas[unicas]]
+        return ordem, k, interacoes, (usuario[unicas], noticia[unicas], data[unicas], lida[unicas])
+
+    # ===================== GRAVAÇÃO =====================
+
+    def _indices(self, cursor, tabela):
+        """(nome, SQL de criação) dos índices da tabela que não sustentam uma constraint."""
+        if connection.vendor == 'postgresql':
+            cursor.execute(
+                "SELECT i.indexname, i.indexdef FROM pg_indexes i "
+                "WHERE i.tablename = %s AND NOT EXISTS ("
+                "  SELECT 1 FROM pg_constraint c WHERE c.conindid = (quote_ident(i.schemaname) || '.' || quote_ident(i.indexname))::regclass"
+                ")",
+                [tabela],
+            )
+        else:
+            # sql NULL: índices automáticos (chave primária, UNIQUE de coluna)
+            cursor.execute("SELECT name, sql FROM sqlite_master WHERE type = 'index' AND tbl_name = %s AND sql IS NOT NULL", [tabela])
+        return cursor.fetchall()
+
+    @contextmanager
+    def _sem_indices(self, *modelos):
+        """
+        Carga sem os índices secundários das tabelas grandes, recriados no fim
+        de uma vez (ordenar tudo uma vez sai bem mais barato que inserir linha
+        a linha em árvores aleatórias). Os dados gerados já não têm duplicatas.
+        """
+        with connection.cursor() as cursor:
+            indices = [indice for modelo in modelos for indice in self._indices(cursor, modelo._meta.db_table)]
+            for nome, _ in indices:
+                cursor.execute(f"DROP INDEX {connection.ops.quote_name(nome)}")
+        try:
+            yield
+        finally:
+            inicio = time.perf_counter()
+            with connection.cursor() as cursor:
+                for _, sql in indices:
+                    cursor.execute(sql)
+            self.stdout.write(f"{len(indices)} índices recriados em {time.perf_counter() - inicio:.1f}s.")
+
+    def _datas(self, microssegundos):
+        textos = np.datetime_as_string(np.asarray(microssegundos).astype('datetime64[us]'), unit='us').tolist()
+        if connection.vendor == 'postgresql':
+            return [texto + '+00:00' for texto in textos]
+        return [texto.replace('T', ' ') for texto in textos]  # O formato que o Django grava no SQLite
+
+    def _gravar(self, modelo, campos, colunas):
+        """Grava as colunas (listas do mesmo tamanho) em `modelo`, em lotes de --lote linhas."""
+        inicio = time.perf_counter()
+        tabela = connection.ops.quote_name(modelo._meta.db_table)
+        nomes = ", ".join(connection.ops.quote_name(modelo._meta.get_field(campo).column) for campo in campos)
+        linhas = list(zip(*colunas))
+        with connection.cursor() as cursor:
+            for primeira in range(0, len(linhas), self.lote):
+                lote = linhas[primeira:primeira + self.lote]
+                if connection.vendor == 'postgresql':
+                    buffer = io.StringIO()
+                    # Strings entre aspas: "" é texto vazio e o campo vazio sem aspas, NULL
+                    csv.writer(buffer, quoting=csv.QUOTE_NONNUMERIC).writerows(lote)
+                    buffer.seek(0)
+                    cursor.copy_expert(f"COPY {tabela} ({nomes}) FROM STDIN WITH (FORMAT csv)", buffer)
+                else:
+                    marcadores = ", ".join(["%s"] * len(campos))
+                    cursor.executemany(f"INSERT INTO {tabela} ({nomes}) VALUES ({marcadores})", lote)
+        anteriores, segundos = self.linhas.get(modelo._meta.db_table, (0, 0.0))
+        self.linhas[modelo._meta.db_table] = (anteriores + len(linhas), segundos + time.perf_counter() - inicio)
+
+    @transaction.atomic
+    def _gravar_noticias(self, noticias, primeira_noticia, curtidas, salvamentos):
+        total = noticias['total']
+        datas = self._datas(noticias['data'])
+        self.titulos = titulos = [
+            PREFIXO_NOTICIA + " ".join(VOCABULARIO[i] for i in palavras).capitalize()
+            for palavras in noticias['titulo'].tolist()
+        ]
+        paragrafos = noticias['paragrafos']
+        self._gravar(Noticia, (
+            'id', 'titulo', 'imagem', 'imagem_variantes', 'conteudo', 'data_publicacao', 'autor',
+            'curtidas_count', 'salvamentos_count', 'categoria', 'versao', 'atualizado_em',
+        ), (
+            range(primeira_noticia, primeira_noticia + total), titulos, [''] * total, ['{}'] * total,
+            [paragrafos[i] for i in noticias['paragrafo'].tolist()], datas, [None] * total,
+            curtidas.tolist(), salvamentos.tolist(), [self.categorias[i].pk for i in noticias['categoria'].tolist()],
+            [1] * total, datas,
+        ))
+
+    @transaction.atomic
+    def _gravar_bloco(self, primeiro, quantos, primeiro_usuario, primeiro_perfil, primeira_noticia,
+                      senha, noticias, ordem, k, interacoes, notificacoes):
+        usuarios = range(primeiro_usuario, primeiro_usuario + quantos)
+        nomes = [f"{PREFIXO_USUARIO}{primeiro + i}" for i in range(quantos)]
+        entrada = self._datas(np.full(quantos, self.agora - self.options['dias'] * 86400 * _MICRO))
+        self._gravar(User, (
+            'id', 'password', 'last_login', 'is_superuser', 'username', 'first_name', 'last_name',
+            'email', 'is_staff', 'is_active', 'date_joined',
+        ), (
+            usuarios, [senha] * quantos, [None] * quantos, [False] * quantos, nomes, [''] * quantos,
+            [''] * quantos, [f"{nome}@echo.test" for nome in nomes], [False] * quantos, [True] * quantos, entrada,
+        ))
+
+        usuario_n, noticia_n, data_n, lida_n = notificacoes
+        nao_lidas = np.bincount(usuario_n[~lida_n], minlength=quantos)
+        perfis = range(primeiro_perfil, primeiro_perfil + quantos)
+        self._gravar(PerfilUsuario, (
+            'id', 'usuario', 'biografia', 'foto_perfil', 'foto_perfil_variantes', 'data_criacao', 'notificacoes_nao_lidas',
+            'versao_interacoes',
+        ), (
+            perfis, usuarios, [None] * quantos, [''] * quantos, ['{}'] * quantos, entrada, nao_lidas.tolist(), [0] * quantos,
+        ))
+
+        perfil_c, posicao_c = np.nonzero(np.arange(ordem.shape[1]) < k[:, None])
+        self._gravar(PerfilUsuario.categorias_de_interesse.through, ('perfilusuario', 'categoria'), (
+            (perfil_c + primeiro_perfil).tolist(),
+            [self.categorias[i].pk for i in ordem[perfil_c, posicao_c].tolist()],
+        ))
+
+        usuario_i, noticia_i, tipo_i, data_i = interacoes
+        self._gravar(InteracaoNoticia, ('usuario', 'noticia', 'tipo', 'data_interacao'), (
+            (usuario_i + primeiro_usuario).tolist(), (noticia_i + primeira_noticia).tolist(),
+            [_TIPOS[t] for t in tipo_i.tolist()], self._datas(data_i),
+        ))
+
+        # Histórico: a soma das interações por categoria, já com o decaimento (escala da EPOCA)
+        quantas_categorias = len(self.categorias)
+        par = usuario_i * quantas_categorias + noticias['categoria'][noticia_i]
+        pesos = _PESOS_TIPO[tipo_i] * np.exp(_LAMBDA * ((data_i - EPOCA.timestamp() * _MICRO) / _MICRO))
+        pares, posicoes = np.unique(par, return_inverse=True)
+        pontuacao = np.bincount(posicoes, weights=pesos)
+        self._gravar(HistoricoInteresse, ('usuario', 'categoria', 'pontuacao'), (
+            (pares // quantas_categorias + primeiro_usuario).tolist(),
+            [self.categorias[i].pk for i in (pares % quantas_categorias).tolist()],
+            pontuacao.tolist(),
+        ))
+
+        self._gravar(Notificacao, ('usuario', 'manchete', 'noticia', 'data_criacao', 'lida'), (
+            (usuario_n + primeiro_usuario).tolist(), [self._manchete(n, noticias) for n in noticia_n.tolist()],
+            (noticia_n + primeira_noticia).tolist(), self._datas(data_n), lida_n.tolist(),
+        ))
+
+    def _manchete(self, indice, noticias):
+        manchete = self.manchetes.get(indice)
+        if manchete is None:
+            categoria = self.categorias[noticias['categoria'][indice]]
+            manchete = self.manchetes[indice] = manchete_da_noticia(Noticia(titulo=self.titulos[indice]), categoria)
+        return manchete
+
+    def _finalizar(self):
+        with connection.cursor() as cursor:
+            if connection.vendor == 'postgresql':
+                # Ids gravados explicitamente: as sequências continuam depois deles
+                for sql in connection.ops.sequence_reset_sql(no_style(), [User, PerfilUsuario, Noticia]):
+                    cursor.execute(sql)
+            cursor.execute("ANALYZE")  # Estatísticas do planejador com as tabelas cheias
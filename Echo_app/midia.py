@@ -0,0 +1,262 @@
+# Echo/Echo_app/midia.py
+
+"""
+Arquivos enviados (MEDIA_ROOT): Noticia.imagem, PerfilUsuario.foto_perfil
+e as variantes de Echo_app/imagens.py.
+
+Nomes com hash: ArmazenamentoMidia grava cada upload como `foto.<hash>.jpg`,
+com o hash do conteúdo. O que está num nome nunca muda, então a resposta
+vai com cache de um ano (`immutable`). As variantes herdam o hash no nome
+(`foto.<hash>-640w.webp`). Arquivos antigos, sem hash, ficam em cache por
+MIDIA_MAX_AGE segundos.
+
+MidiaMiddleware atende MEDIA_URL logo depois do SecurityMiddleware, sem
+sessão, CSRF nem consultas ao banco, e roda nos dois modos: no ASGI não
+obriga a pilha inteira a passar para síncrona. ETag forte (mtime + tamanho), 304 nos
+GETs condicionais e, conforme MIDIA_ENVIO:
+
+- 'python': o próprio processo, com Range (206/416). Com o gunicorn, o
+  arquivo (ou a faixa) vai por sendfile(), sem passar pelo Python;
+- 'x-accel': só os cabeçalhos, com X-Accel-Redirect para MIDIA_ACCEL_PREFIXO.
+  O nginx envia os bytes e responde o Range:
+
+      location /_midia/ { internal; alias /caminho/do/MEDIA_ROOT/; }
+
+- 'x-sendfile': X-Sendfile com o caminho absoluto (Apache com mod_xsendfile).
+
+Os estáticos, como o tonho_dancando.mp4, são do WhiteNoise, que já responde
+Range e serve com cache immutable os nomes com hash do manifest.
+"""
+
+import hashlib
+import mimetypes
+import os
+import re
+import stat
+from urllib.parse import quote
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured, MiddlewareNotUsed, SuspiciousFileOperation
+from django.core.files.storage import FileSystemStorage
+from django.core.files.uploadedfile import UploadedFile
+from django.http import FileResponse, Http404, HttpResponse
+from django.utils._os import safe_join
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import http_date, parse_http_date_safe, quote_etag
+from django.views.decorators.http import require_safe
+
+HASH_NO_NOME = re.compile(r'\.([0-9a-f]{12})(?=[-.])')  # foto.<hash>.jpg, foto.<hash>-640w.webp
+UM_ANO = 365 * 24 * 3600
+MODOS_ENVIO = ('python', 'x-accel', 'x-sendfile')
+
+
+def modo_envio():
+    return getattr(settings, 'MIDIA_ENVIO', 'python')
+
+
+# ===================== NOMES COM HASH =====================
+
+class ArmazenamentoMidia(FileSystemStorage):
+    """
+    FileSystemStorage que põe o hash do conteúdo no nome dos uploads. Só os
+    arquivos enviados (UploadedFile): os que o próprio código grava com nome
+    calculado, como as variantes, ficam com o nome pedido.
+    """
+
+    def save(self, name, content, max_length=None):
+        if name is None:
+            name = content.name
+        if isinstance(content, UploadedFile) and not HASH_NO_NOME.search(os.path.basename(name)):
+            name = self.nome_com_hash(name, content, max_length)
+            if self.exists(name):
+                return name  # Mesmo conteúdo já gravado
+        return super().save(name, content, max_length=max_length)
+
+    def nome_com_hash(self, name, content, max_length=None):
+        """noticias/foto.jpg -> noticias/foto.<12 primeiros do sha256>.jpg"""
+        resumo = hashlib.sha256()
+        for bloco in content.chunks():
+            resumo.update(bloco)
+        pasta, arquivo = os.path.split(name)
+        base, extensao = os.path.splitext(arquivo)
+        sufixo = f".{resumo.hexdigest()[:12]}{extensao}"
+        if max_length:  # Encurta a base, nunca o hash
+            base = base[:max(1, max_length - len(sufixo) - len(pasta) - 1)]
+        return os.path.join(pasta, base + sufixo)
+
+
+# ===================== SERVIR =====================
+
+class _Trecho:
+    """Corpo de um 206: até `restante` bytes de um arquivo já posicionado no início da faixa."""
+
+    def __init__(self, arquivo, restante):
+        self.arquivo = arquivo
+        self.restante = restante
+
+    def read(self, tamanho=-1):
+        if tamanho < 0 or tamanho > self.restante:
+            tamanho = self.restante
+        dados = self.arquivo.read(tamanho)
+        self.restante -= len(dados)
+        return dados
+
+    def fileno(self):
+        # O gunicorn usa sendfile() a partir da posição atual, pelo Content-Length
+        return self.arquivo.fileno()
+
+    def close(self):
+        self.arquivo.close()
+
+
+def _arquivo(caminho):
+    try:
+        absoluto = safe_join(settings.MEDIA_ROOT, caminho)
+    except SuspiciousFileOperation:
+        raise Http404
+    try:
+        estado = os.stat(absoluto)
+    except OSError:
+        raise Http404
+    if not stat.S_ISREG(estado.st_mode):
+        raise Http404
+    return absoluto, estado
+
+
+def _faixa(cabecalho, tamanho):
+    """
+    (início, fim) de um `Range: bytes=...` com uma faixa só; início >= tamanho
+    se não há como atendê-la (416). None para ignorar o cabeçalho e responder
+    o arquivo inteiro, inclusive com várias faixas (permitido pela RFC 9110).
+    """
+    unidade, _, faixas = cabecalho.partition('=')
+    if unidade.strip().lower() != 'bytes' or ',' in faixas:
+        return None
+    inicio, hifen, fim = faixas.strip().partition('-')
+    if not hifen:
+        return None
+    try:
+        if inicio:
+            inicio, fim = int(inicio), int(fim) if fim else tamanho - 1
+        else:  # bytes=-500: os últimos 500
+            sufixo = int(fim)
+            inicio, fim = (max(0, tamanho - sufixo) if sufixo else tamanho), tamanho - 1
+    except ValueError:
+        return None
+    if inicio < 0 or (fim < inicio and inicio < tamanho):
+        return None
+    return inicio, min(fim, tamanho - 1)
+
+
+def _if_range_confere(request, etag, modificado):
+    valor = request.META.get('HTTP_IF_RANGE')
+    if valor is None:
+        return True
+    if valor.startswith('"'):
+        return valor == etag  # Comparação forte: ETag fraco (W/) nunca confere
+    return parse_http_date_safe(valor) == modificado
+
+
+def _resposta(request, caminho, absoluto, estado, etag, modificado):
+    tipo = mimetypes.guess_type(absoluto)[0] or 'application/octet-stream'
+    modo = modo_envio()
+    if modo != 'python':
+        resposta = HttpResponse(content_type=tipo)  # O servidor web envia o corpo
+        if modo == 'x-accel':
+            resposta['X-Accel-Redirect'] = settings.MIDIA_ACCEL_PREFIXO + quote(caminho)
+        else:
+            resposta['X-Sendfile'] = absoluto
+        return resposta
+
+    tamanho = estado.st_size
+    faixa = None
+    if 'HTTP_RANGE' in request.META and _if_range_confere(request, etag, modificado):
+        faixa = _faixa(request.META['HTTP_RANGE'], tamanho)
+    if faixa and faixa[0] >= tamanho:
+        resposta = HttpResponse(status=416)
+        resposta['Content-Range'] = f"bytes */{tamanho}"
+        return resposta
+
+    inicio, fim = faixa or (0, tamanho - 1)
+    if request.method == 'HEAD':
+        resposta = HttpResponse(content_type=tipo, status=206 if faixa else 200)
+    else:
+        arquivo = open(absoluto, 'rb')
+        if faixa:
+            arquivo.seek(inicio)
+            resposta = FileResponse(_Trecho(arquivo, fim - inicio + 1), status=206, content_type=tipo)
+        else:
+            resposta = FileResponse(arquivo, content_type=tipo)
+    if faixa:
+        resposta['Content-Range'] = f"bytes {inicio}-{fim}/{tamanho}"
+    resposta['Content-Length'] = fim - inicio + 1
+    resposta['Accept-Ranges'] = 'bytes'
+    return resposta
+
+
+@require_safe
+def servir_midia(request, caminho):
+    absoluto, estado = _arquivo(caminho)
+    etag = quote_etag(f"{estado.st_mtime_ns:x}-{estado.st_size:x}")
+    modificado = int(estado.st_mtime)
+
+    resposta = get_conditional_response(request, etag=etag, last_modified=modificado)
+    if resposta is None:
+        resposta = _resposta(request, caminho, absoluto, estado, etag, modificado)
+    if resposta.status_code < 400:
+        resposta['ETag'] = etag
+        resposta['Last-Modified'] = http_date(modificado)
+        if HASH_NO_NOME.search(os.path.basename(caminho)):
+            patch_cache_control(resposta, public=True, max_age=UM_ANO, immutable=True)
+        else:
+            patch_cache_control(resposta, public=True, max_age=getattr(settings, 'MIDIA_MAX_AGE', 3600))
+    return resposta
+
+
+class MidiaMiddleware:
+    """
+    Atende MEDIA_URL antes do resto da pilha. O que não existe segue para as
+    URLs (404 normal). Síncrono e assíncrono: no ASGI, o stat e a abertura do
+    arquivo vão para uma thread e o resto da pilha segue no loop.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.prefixo = settings.MEDIA_URL
+        if not self.prefixo.startswith('/'):
+            raise MiddlewareNotUsed  # Mídia em outro domínio (CDN)
+        if modo_envio() not in MODOS_ENVIO:
+            raise ImproperlyConfigured(f"MIDIA_ENVIO deve ser um de {MODOS_ENVIO}, não {modo_envio()!r}.")
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def _caminho(self, request):
+        """Caminho dentro de MEDIA_ROOT, ou None quando a requisição não é de mídia."""
+        if request.method in ('GET', 'HEAD') and request.path_info.startswith(self.prefixo):
+            return request.path_info[len(self.prefixo):]
+        return None
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+
+        caminho = self._caminho(request)
+        if caminho is not None:
+            try:
+                return servir_midia(request, caminho)
+            except Http404:
+                pass
+        return self.get_response(request)
+
+    async def __acall__(self, request):
+        caminho = self._caminho(request)
+        if caminho is not None:
+            try:
+                return await sync_to_async(servir_midia, thread_sensitive=False)(request, caminho)  # Sem banco
+            except Http404:
+                pass
+        return await self.get_response(request)
@@ -0,0 +1,55 @@
+# Generated by Django 5.2.6 on 2026-10-18 20:14
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+def preencher_feeds(apps, schema_editor):
+    # Materializa o feed dos usuários que já existem (mesma regra de Echo_app.feed)
+    User = apps.get_model(*settings.AUTH_USER_MODEL.split('.'))
+    Noticia = apps.get_model('Echo_app', 'Noticia')
+    PerfilUsuario = apps.get_model('Echo_app', 'PerfilUsuario')
+    HistoricoInteresse = apps.get_model('Echo_app', 'HistoricoInteresse')
+    FeedRecomendacao = apps.get_model('Echo_app', 'FeedRecomendacao')
+    Interesse = PerfilUsuario.categorias_de_interesse.through
+
+    for usuario_id in User.objects.values_list('pk', flat=True).iterator():
+        categorias = list(Interesse.objects.filter(perfilusuario__usuario_id=usuario_id).values_list('categoria_id', flat=True))
+        if not categorias:
+            categorias = list(HistoricoInteresse.objects.filter(usuario_id=usuario_id).order_by('-pontuacao').values_list('categoria_id', flat=True)[:3])
+
+        noticias = Noticia.objects.all()
+        if categorias:
+            noticias = noticias.filter(categoria_id__in=categorias)
+        FeedRecomendacao.objects.bulk_create([
+            FeedRecomendacao(usuario_id=usuario_id, noticia_id=pk, data_publicacao=data)
+            for pk, data in noticias.order_by('-data_publicacao').values_list('pk', 'data_publicacao')[:50]
+        ])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('Echo_app', '0004_noticia_imagem'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='FeedRecomendacao',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('data_publicacao', models.DateTimeField(verbose_name='Data de Publicação')),
+                ('noticia', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='entradas_feed', to='Echo_app.noticia', verbose_name='Notícia')),
+                ('usuario', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='feed_recomendacoes', to=settings.AUTH_USER_MODEL, verbose_name='Usuário')),
+            ],
+            options={
+                'verbose_name': 'Entrada de Feed',
+                'verbose_name_plural': 'Entradas de Feed',
+                'indexes': [models.Index(fields=['usuario', '-data_publicacao'], name='feed_usuario_data_idx')],
+                'unique_together': {('usuario', 'noticia')},
+            },
+        ),
+        migrations.RunPython(preencher_feeds, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,35 @@
+# Generated by Django 5.2.6 on 2026-10-18 20:15
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('Echo_app', '0005_feedrecomendacao'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='historicointeresse',
+            index=models.Index(fields=['usuario', '-pontuacao'], name='historico_usuario_pont_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='noticia',
+            index=models.Index(fields=['-data_publicacao'], name='noticia_data_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='noticia',
+            index=models.Index(fields=['categoria', '-data_publicacao'], name='noticia_cat_data_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='notificacao',
+            index=models.Index(fields=['usuario', '-data_criacao', 'lida'], name='notif_usuario_data_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='notificacao',
+            index=models.Index(condition=models.Q(('lida', False)), fields=['usuario', '-data_criacao'], name='notif_nao_lidas_idx'),
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.2.6 on 2026-10-18 20:18
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('Echo_app', '0006_indices_consultas_quentes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='noticia',
+            name='imagem_variantes',
+            field=models.JSONField(blank=True, default=dict, editable=False, verbose_name='Variantes da Imagem'),
+        ),
+        migrations.AddField(
+            model_name='perfilusuario',
+            name='foto_perfil_variantes',
+            field=models.JSONField(blank=True, default=dict, editable=False, verbose_name='Variantes da Foto de Perfil'),
+        ),
+    ]
@@ -0,0 +1,50 @@
+# Índice de busca textual de Noticia (titulo + conteudo) no PostgreSQL.
+#
+# Coluna gerada `busca` (tsvector com o dicionário 'portuguese' e peso maior
+# para o título) e índice GIN. Por ser coluna gerada, o próprio banco a mantém
+# atualizada a cada INSERT/UPDATE. A coluna não faz parte do modelo Django;
+# as consultas ficam em Echo_app/busca.py.
+#
+# No SQLite (dev e testes) o índice é uma tabela FTS5 criada por
+# Echo_app.busca no sinal post_migrate, pois o SQLite recria a tabela de
+# Noticia em algumas migrações e isso apagaria os triggers de sincronização.
+
+from django.db import migrations
+
+CRIAR = [
+    """
+    ALTER TABLE "Echo_app_noticia" ADD COLUMN "busca" tsvector
+    GENERATED ALWAYS AS (
+        setweight(to_tsvector('portuguese', coalesce("titulo", '')), 'A') ||
+        setweight(to_tsvector('portuguese', coalesce("conteudo", '')), 'B')
+    ) STORED
+    """,
+    'CREATE INDEX "noticia_busca_gin_idx" ON "Echo_app_noticia" USING GIN ("busca")',
+]
+REMOVER = [
+    'DROP INDEX IF EXISTS "noticia_busca_gin_idx"',
+    'ALTER TABLE "Echo_app_noticia" DROP COLUMN IF EXISTS "busca"',
+]
+
+
+def criar_indice(apps, schema_editor):
+    if schema_editor.connection.vendor == 'postgresql':
+        for sql in CRIAR:
+            schema_editor.execute(sql)
+
+
+def remover_indice(apps, schema_editor):
+    if schema_editor.connection.vendor == 'postgresql':
+        for sql in REMOVER:
+            schema_editor.execute(sql)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('Echo_app', '0007_variantes_imagem'),
+    ]
+
+    operations = [
+        migrations.RunPython(criar_indice, remover_indice),
+    ]
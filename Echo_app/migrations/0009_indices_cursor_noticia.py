@@ -0,0 +1,31 @@
+# Generated by Django 5.2.6 on 2026-10-18 20:21
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('Echo_app', '0008_busca_textual'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='noticia',
+            name='noticia_data_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='noticia',
+            name='noticia_cat_data_idx',
+        ),
+        migrations.AddIndex(
+            model_name='noticia',
+            index=models.Index(fields=['-data_publicacao', '-id'], name='noticia_data_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='noticia',
+            index=models.Index(fields=['categoria', '-data_publicacao', '-id'], name='noticia_cat_data_idx'),
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.2.6 on 2026-10-18 20:23
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('Echo_app', '0009_indices_cursor_noticia'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='categoria',
+            name='versao',
+            field=models.PositiveIntegerField(default=1, editable=False, verbose_name='Versão'),
+        ),
+        migrations.AddField(
+            model_name='noticia',
+            name='versao',
+            field=models.PositiveIntegerField(default=1, editable=False, verbose_name='Versão do Conteúdo'),
+        ),
+    ]
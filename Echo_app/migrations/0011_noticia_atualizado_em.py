@@ -0,0 +1,18 @@
+# Generated by Django 5.2.6 on 2026-10-18 20:24
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('Echo_app', '0010_versao_fragmentos'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='noticia',
+            name='atualizado_em',
+            field=models.DateTimeField(auto_now=True, verbose_name='Atualizado em'),
+        ),
+    ]
@@ -0,0 +1,52 @@
+# Generated by Django 5.2.6 on 2026-10-18 20:29
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('Echo_app', '0011_noticia_atualizado_em'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='EnvioNotificacao',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('status', models.CharField(choices=[('PENDENTE', 'Pendente'), ('PROCESSANDO', 'Processando'), ('CONCLUIDO', 'Concluído')], default='PENDENTE', max_length=12, verbose_name='Status')),
+                ('ultimo_perfil_id', models.BigIntegerField(default=0, verbose_name='Último perfil notificado')),
+                ('total_enviadas', models.PositiveIntegerField(default=0, verbose_name='Notificações enviadas')),
+                ('tentativas', models.PositiveIntegerField(default=0, verbose_name='Tentativas')),
+                ('reservado_ate', models.DateTimeField(blank=True, null=True, verbose_name='Reservado até')),
+                ('data_criacao', models.DateTimeField(auto_now_add=True, verbose_name='Data de Criação')),
+                ('data_conclusao', models.DateTimeField(blank=True, null=True, verbose_name='Data de Conclusão')),
+            ],
+            options={
+                'verbose_name': 'Envio de Notificações',
+                'verbose_name_plural': 'Envios de Notificações',
+                'ordering': ['data_criacao'],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='notificacao',
+            constraint=models.UniqueConstraint(condition=models.Q(('noticia__isnull', False)), fields=('usuario', 'noticia'), name='notif_usuario_noticia_unica'),
+        ),
+        migrations.AddField(
+            model_name='envionotificacao',
+            name='categoria',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='envios_notificacao', to='Echo_app.categoria', verbose_name='Categoria'),
+        ),
+        migrations.AddField(
+            model_name='envionotificacao',
+            name='noticia',
+            field=models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='envio_notificacao', to='Echo_app.noticia', verbose_name='Notícia'),
+        ),
+        migrations.AddIndex(
+            model_name='envionotificacao',
+            index=models.Index(condition=models.Q(('status', 'CONCLUIDO'), _negated=True), fields=['data_criacao'], name='envio_notif_fila_idx'),
+        ),
+    ]
@@ -0,0 +1,34 @@
+# Generated by Django 5.2.6 on 2026-10-18 20:30
+
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce
+
+
+def preencher_contadores(apps, schema_editor):
+    # Conta uma vez as não lidas que já existem (mesma regra de Echo_app.notificacoes)
+    PerfilUsuario = apps.get_model('Echo_app', 'PerfilUsuario')
+    Notificacao = apps.get_model('Echo_app', 'Notificacao')
+    PerfilUsuario.objects.update(notificacoes_nao_lidas=Coalesce(
+        Subquery(
+            Notificacao.objects.filter(usuario_id=OuterRef('usuario_id'), lida=False)
+            .order_by().values('usuario_id').annotate(total=Count('pk')).values('total')
+        ),
+        Value(0),
+    ))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('Echo_app', '0012_fila_envio_notificacoes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='perfilusuario',
+            name='notificacoes_nao_lidas',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='Notificações não lidas'),
+        ),
+        migrations.RunPython(preencher_contadores, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,32 @@
+# Generated by Django 5.2.6 on 2026-10-18 20:35
+
+import math
+from datetime import datetime, timezone
+
+from django.db import migrations, models
+from django.db.models import F
+
+
+def para_escala_da_epoca(apps, schema_editor):
+    # Pontuações já existentes valem "agora": leva para a escala da época de
+    # Echo_app.interesses (EPOCA = 2025-01-01 UTC, meia-vida de 30 dias)
+    HistoricoInteresse = apps.get_model('Echo_app', 'HistoricoInteresse')
+    decorrido = (datetime.now(timezone.utc) - datetime(2025, 1, 1, tzinfo=timezone.utc)).total_seconds()
+    fator = math.exp(math.log(2) / (30 * 86400) * decorrido)
+    HistoricoInteresse.objects.update(pontuacao=F('pontuacao') * fator)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('Echo_app', '0013_perfilusuario_notificacoes_nao_lidas'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='historicointeresse',
+            name='pontuacao',
+            field=models.FloatField(default=0, verbose_name='Pontuação de Interesse'),
+        ),
+        migrations.RunPython(para_escala_da_epoca, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,45 @@
+# Generated by Django 5.2.6 on 2026-10-18 20:40
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('Echo_app', '0014_pontuacao_interesse_com_decaimento'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='NoticiaSimilar',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('pontuacao', models.FloatField(verbose_name='Similaridade')),
+            ],
+            options={
+                'verbose_name': 'Notícia Similar',
+                'verbose_name_plural': 'Notícias Similares',
+            },
+        ),
+        migrations.AddIndex(
+            model_name='interacaonoticia',
+            index=models.Index(fields=['usuario', '-data_interacao'], name='interacao_usuario_data_idx'),
+        ),
+        migrations.AddField(
+            model_name='noticiasimilar',
+            name='noticia',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='similares', to='Echo_app.noticia', verbose_name='Notícia'),
+        ),
+        migrations.AddField(
+            model_name='noticiasimilar',
+            name='similar',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='Echo_app.noticia', verbose_name='Notícia Similar'),
+        ),
+        migrations.AddIndex(
+            model_name='noticiasimilar',
+            index=models.Index(fields=['noticia', '-pontuacao', 'similar'], name='similar_noticia_idx'),
+        ),
+    ]
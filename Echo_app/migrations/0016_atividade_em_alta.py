@@ -0,0 +1,29 @@
+# Generated by Django 5.2.6 on 2026-10-18 20:45
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('Echo_app', '0015_similaridade_item_item'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AtividadeNoticia',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('inicio', models.DateTimeField(verbose_name='Início do Balde')),
+                ('pontos', models.FloatField(default=0, verbose_name='Pontos')),
+                ('noticia', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='atividade', to='Echo_app.noticia', verbose_name='Notícia')),
+            ],
+            options={
+                'verbose_name': 'Atividade de Notícia',
+                'verbose_name_plural': 'Atividades de Notícias',
+                'indexes': [models.Index(fields=['inicio', 'noticia', 'pontos'], name='atividade_inicio_idx')],
+                'constraints': [models.UniqueConstraint(fields=('noticia', 'inicio'), name='atividade_noticia_balde_unica')],
+            },
+        ),
+    ]
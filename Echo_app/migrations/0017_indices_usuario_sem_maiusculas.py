@@ -0,0 +1,54 @@
+# Generated by Django 5.2.6 on 2026-10-18 21:05
+
+from django.db import migrations
+from django.db.models import Count
+from django.db.models.functions import Lower
+
+# Índices únicos funcionais em auth_user (ver Echo_app/cadastro.py). O
+# modelo User é do Django, então os índices são criados em SQL.
+INDICES = [
+    ('usuario_username_lower_unico', 'username', ''),
+    ('usuario_email_lower_unico', 'email', " WHERE email <> ''"),  # Usuários sem e-mail não conflitam
+]
+
+
+def _conferir_duplicados(User, campo):
+    repetidos = list(
+        User.objects.exclude(**{campo: ''}).annotate(valor=Lower(campo)).values('valor')
+        .annotate(total=Count('pk')).filter(total__gt=1).values_list('valor', flat=True)[:10]
+    )
+    if repetidos:
+        raise RuntimeError(
+            f"auth_user tem valores de {campo} repetidos sem diferenciar maiúsculas "
+            f"(ex.: {', '.join(repetidos)}). Resolva-os antes de aplicar esta migração."
+        )
+
+
+def criar_indices(apps, schema_editor):
+    User = apps.get_model('auth', 'User')
+    tabela = schema_editor.quote_name(User._meta.db_table)
+    # No PostgreSQL, CONCURRENTLY não bloqueia os cadastros durante a criação
+    concorrente = 'CONCURRENTLY ' if schema_editor.connection.vendor == 'postgresql' else ''
+    for nome, campo, condicao in INDICES:
+        _conferir_duplicados(User, campo)
+        schema_editor.execute(f"CREATE UNIQUE INDEX {concorrente}{nome} ON {tabela} (LOWER({campo})){condicao}")
+
+
+def remover_indices(apps, schema_editor):
+    concorrente = 'CONCURRENTLY ' if schema_editor.connection.vendor == 'postgresql' else ''
+    for nome, _, _ in INDICES:
+        schema_editor.execute(f"DROP INDEX {concorrente}IF EXISTS {nome}")
+
+
+class Migration(migrations.Migration):
+
+    atomic = False  # CREATE INDEX CONCURRENTLY não roda dentro de transação
+
+    dependencies = [
+        ('Echo_app', '0016_atividade_em_alta'),
+        ('auth', '0012_alter_user_first_name_max_length'),
+    ]
+
+    operations = [
+        migrations.RunPython(criar_indices, remover_indices),
+    ]
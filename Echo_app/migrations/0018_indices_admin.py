@@ -0,0 +1,41 @@
+# Generated by Django 5.2.6 on 2026-10-18 23:40
+
+from django.db import migrations, models
+
+# Índices por data das changelists do admin (Echo_app/admin.py), nas duas
+# maiores tabelas. No PostgreSQL são criados com CONCURRENTLY, sem bloquear
+# as curtidas e o envio de notificações durante a criação.
+INDICES = [
+    ('interacaonoticia', models.Index(fields=['-data_interacao', '-id'], name='interacao_data_idx')),
+    ('notificacao', models.Index(fields=['-data_criacao', '-id'], name='notif_data_idx')),
+]
+
+
+def _concorrente(schema_editor):
+    return {'concurrently': True} if schema_editor.connection.vendor == 'postgresql' else {}
+
+
+def criar_indices(apps, schema_editor):
+    for modelo, indice in INDICES:
+        schema_editor.add_index(apps.get_model('Echo_app', modelo), indice, **_concorrente(schema_editor))
+
+
+def remover_indices(apps, schema_editor):
+    for modelo, indice in INDICES:
+        schema_editor.remove_index(apps.get_model('Echo_app', modelo), indice, **_concorrente(schema_editor))
+
+
+class Migration(migrations.Migration):
+
+    atomic = False  # CREATE INDEX CONCURRENTLY não roda dentro de transação
+
+    dependencies = [
+        ('Echo_app', '0017_indices_usuario_sem_maiusculas'),
+    ]
+
+    operations = [
+        migrations.SeparateDatabaseAndState(
+            database_operations=[migrations.RunPython(criar_indices, remover_indices)],
+            state_operations=[migrations.AddIndex(model_name=modelo, index=indice) for modelo, indice in INDICES],
+        ),
+    ]
@@ -0,0 +1,33 @@
+# Generated by Django 5.2.6 on 2026-10-18 21:23
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('Echo_app', '0018_indices_admin'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='historicointeresse',
+            name='pontuacao_arquivada',
+            field=models.FloatField(db_default=0, default=0, verbose_name='Pontuação Arquivada'),
+        ),
+        migrations.CreateModel(
+            name='ResumoInteracoes',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('tipo', models.CharField(choices=[('CURTIDA', 'Curtida'), ('SALVAMENTO', 'Salvamento')], max_length=10, verbose_name='Tipo de Interação')),
+                ('total', models.PositiveIntegerField(default=0, verbose_name='Total Arquivado')),
+                ('noticia', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='resumo_interacoes', to='Echo_app.noticia', verbose_name='Notícia')),
+            ],
+            options={
+                'verbose_name': 'Resumo de Interações Arquivadas',
+                'verbose_name_plural': 'Resumos de Interações Arquivadas',
+                'constraints': [models.UniqueConstraint(fields=('noticia', 'tipo'), name='resumo_noticia_tipo_unico')],
+            },
+        ),
+    ]
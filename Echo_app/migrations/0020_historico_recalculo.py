@@ -0,0 +1,18 @@
+# Generated by Django 5.2.6 on 2026-10-18 21:31
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('Echo_app', '0019_retencao_e_arquivo'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='historicointeresse',
+            name='pontuacao_recalculo',
+            field=models.FloatField(blank=True, editable=False, null=True, verbose_name='Recálculo em Andamento'),
+        ),
+    ]
@@ -0,0 +1,32 @@
+# Generated by Django 5.2.6 on 2026-10-18 21:41
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('Echo_app', '0020_historico_recalculo'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CurtidaArquivada',
+            fields=[
+                ('pk', models.CompositePrimaryKey('usuario', 'noticia', blank=True, editable=False, primary_key=True, serialize=False)),
+                ('data_interacao', models.DateTimeField(verbose_name='Data da Curtida')),
+                ('noticia', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='Echo_app.noticia', verbose_name='Notícia')),
+                ('usuario', models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='+', to=settings.AUTH_USER_MODEL, verbose_name='Usuário')),
+            ],
+            options={
+                'verbose_name': 'Curtida Arquivada',
+                'verbose_name_plural': 'Curtidas Arquivadas',
+            },
+        ),
+        migrations.DeleteModel(
+            name='ResumoInteracoes',
+        ),
+    ]
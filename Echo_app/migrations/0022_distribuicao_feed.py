@@ -0,0 +1,30 @@
+# Generated by Django 5.2.6 on 2026-10-18 21:45
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('Echo_app', '0021_curtidas_arquivadas'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DistribuicaoFeed',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('solicitada_em', models.DateTimeField(default=django.utils.timezone.now, verbose_name='Solicitada em')),
+                ('reservado_ate', models.DateTimeField(blank=True, null=True, verbose_name='Reservado até')),
+                ('tentativas', models.PositiveIntegerField(default=0, verbose_name='Tentativas')),
+                ('noticia', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='Echo_app.noticia', verbose_name='Notícia')),
+            ],
+            options={
+                'verbose_name': 'Distribuição de Feed',
+                'verbose_name_plural': 'Distribuições de Feed',
+                'ordering': ['solicitada_em'],
+            },
+        ),
+    ]
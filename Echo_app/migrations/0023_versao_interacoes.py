@@ -0,0 +1,18 @@
+# Generated by Django 5.2.6 on 2026-10-18 21:55
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('Echo_app', '0022_distribuicao_feed'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='perfilusuario',
+            name='versao_interacoes',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='Versão das interações'),
+        ),
+    ]
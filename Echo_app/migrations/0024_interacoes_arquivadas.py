@@ -0,0 +1,82 @@
+# Generated by Django 5.2.6 on 2026-10-18 22:03
+
+import django.db.models.deletion
+from django.conf import settings
+from collections import Counter
+
+from django.db import migrations, models
+from django.utils import timezone
+
+
+def copiar_curtidas_arquivadas(apps, schema_editor):
+    # As curtidas já arquivadas entram nas duas tabelas novas (mesma regra de Echo_app.retencao)
+    CurtidaArquivada = apps.get_model('Echo_app', 'CurtidaArquivada')
+    InteracaoArquivada = apps.get_model('Echo_app', 'InteracaoArquivada')
+    ResumoInteracoes = apps.get_model('Echo_app', 'ResumoInteracoes')
+    totais = Counter()
+    lote = []
+    for usuario_id, noticia_id, categoria_id, data in (
+        CurtidaArquivada.objects.values_list('usuario_id', 'noticia_id', 'noticia__categoria_id', 'data_interacao').iterator()
+    ):
+        lote.append(InteracaoArquivada(usuario_id=usuario_id, noticia_id=noticia_id, tipo='CURTIDA', data_interacao=data))
+        totais[noticia_id, categoria_id, timezone.localtime(data).date().replace(day=1)] += 1
+        if len(lote) == 1000:
+            InteracaoArquivada.objects.bulk_create(lote)
+            lote = []
+    InteracaoArquivada.objects.bulk_create(lote)
+    ResumoInteracoes.objects.bulk_create([
+        ResumoInteracoes(noticia_id=noticia_id, categoria_id=categoria_id, tipo='CURTIDA', mes=mes, total=total)
+        for (noticia_id, categoria_id, mes), total in totais.items()
+    ], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('Echo_app', '0023_versao_interacoes'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='InteracaoArquivada',
+            fields=[
+                ('pk', models.CompositePrimaryKey('usuario', 'noticia', 'tipo', blank=True, editable=False, primary_key=True, serialize=False)),
+                ('tipo', models.CharField(choices=[('CURTIDA', 'Curtida'), ('SALVAMENTO', 'Salvamento')], max_length=10, verbose_name='Tipo de Interação')),
+                ('data_interacao', models.DateTimeField(verbose_name='Data da Interação')),
+                ('noticia', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='Echo_app.noticia', verbose_name='Notícia')),
+                ('usuario', models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='+', to=settings.AUTH_USER_MODEL, verbose_name='Usuário')),
+            ],
+            options={
+                'verbose_name': 'Interação Arquivada',
+                'verbose_name_plural': 'Interações Arquivadas',
+            },
+        ),
+        migrations.CreateModel(
+            name='ResumoInteracoes',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('tipo', models.CharField(choices=[('CURTIDA', 'Curtida'), ('SALVAMENTO', 'Salvamento')], max_length=10, verbose_name='Tipo de Interação')),
+                ('mes', models.DateField(verbose_name='Mês')),
+                ('total', models.PositiveIntegerField(default=0, verbose_name='Total Arquivado')),
+                ('categoria', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='Echo_app.categoria', verbose_name='Categoria')),
+                ('noticia', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='resumo_interacoes', to='Echo_app.noticia', verbose_name='Notícia')),
+            ],
+            options={
+                'verbose_name': 'Resumo de Interações Arquivadas',
+                'verbose_name_plural': 'Resumos de Interações Arquivadas',
+            },
+        ),
+        migrations.AddIndex(
+            model_name='resumointeracoes',
+            index=models.Index(fields=['categoria', 'mes', 'tipo'], name='resumo_categoria_mes_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='resumointeracoes',
+            constraint=models.UniqueConstraint(fields=('noticia', 'tipo', 'mes'), name='resumo_noticia_tipo_mes_unico'),
+        ),
+        migrations.RunPython(copiar_curtidas_arquivadas, migrations.RunPython.noop),
+        migrations.DeleteModel(
+            name='CurtidaArquivada',
+        ),
+    ]
@@ -20,6 +20,7 @@ class Noticia(models.Model):  # Modelo que representa uma notícia
         verbose_name="Imagem da Notícia"
     )
     # --- FIM DO CAMPO ADICIONADO ---
+    imagem_variantes = models.JSONField(default=dict, blank=True, editable=False, verbose_name="Variantes da Imagem")  # Ver Echo_app/imagens.py
     
     conteudo = models.TextField(verbose_name="Conteúdo Completo")
     data_publicacao = models.DateTimeField(default=timezone.now, verbose_name="Data de Publicação")
@@ -27,43 +28,57 @@ class Noticia(models.Model):  # Modelo que representa uma notícia
     curtidas_count = models.PositiveIntegerField(default=0, verbose_name="Total de Curtidas")
     salvamentos_count = models.PositiveIntegerField(default=0, verbose_name="Total de Salvamentos")
     categoria = models.ForeignKey('Categoria', on_delete=models.SET_NULL, null=True, blank=True, related_name='noticias', verbose_name="Categoria")
+    versao = models.PositiveIntegerField(default=1, editable=False, verbose_name="Versão do Conteúdo")  # Chave do cache de fragmentos (ver Echo_app/fragmentos.py)
+    atualizado_em = models.DateTimeField(auto_now=True, verbose_name="Atualizado em")  # Last-Modified/ETag; também atualizado junto com os contadores
 
     class Meta:
         verbose_name = "Notícia"
         verbose_name_plural = "Notícias"
         ordering = ['-data_publicacao']
+        indexes = [
+            models.Index(fields=['-data_publicacao', '-id'], name='noticia_data_idx'),  # Últimas notícias (cursor)
+            models.Index(fields=['categoria', '-data_publicacao', '-id'], name='noticia_cat_data_idx'),  # Últimas de uma categoria (cursor)
+        ]
+
+    SEMENTES = 20  # Últimas interações usadas para buscar notícias parecidas
+    VIZINHAS = 3  # Notícias da filtragem colaborativa misturadas às recomendadas
 
     def __str__(self):
         return self.titulo
 
+    def imagem_srcset(self, formato='jpeg'):
+        from .imagens import srcset  # Import local: imagens.py depende deste módulo
+        return srcset(self, 'imagem', formato)
+
     @staticmethod
     def recomendar_para(usuario):
-        # ... (seu método recomendar_para continua igual) ...
         if not usuario.is_authenticated:
             return Noticia.objects.all()
 
-        # Tenta buscar o perfil para preferências de categoria
-        try:
-            perfil = usuario.perfil # Usando related_name='perfil' de PerfilUsuario
-            if perfil.categorias_de_interesse.exists():
-                return Noticia.objects.filter(categoria__in=perfil.categorias_de_interesse.all()).order_by('-data_publicacao')[:10] # Limita a 10 por exemplo
-        except AttributeError: # Caso o related_name não seja 'perfil' ou não exista PerfilUsuario
-            pass
-        except PerfilUsuario.DoesNotExist: # Caso o perfil ainda não exista
-             pass
-
-        # Fallback para histórico (se existir)
-        # Note: HistoricoInteresse não está no código fornecido, assumindo que existe
-        try:
-            historico = usuario.historico_interesse.order_by('-pontuacao')
-            if historico.exists():
-                top_categorias = [h.categoria for h in historico[:3]]
-                return Noticia.objects.filter(categoria__in=top_categorias).order_by('-data_publicacao')[:10]
-        except AttributeError: # Se o related_name historico_interesse não existir
-            pass
-
-        # Fallback final: retorna as últimas notícias
-        return Noticia.objects.all().order_by('-data_publicacao')[:10] # Retorna as 10 mais recentes
+        # Uma única consulta, só por índices: as 10 primeiras do feed
+        # materializado (ver Echo_app/feed.py) mais as VIZINHAS notícias mais
+        # parecidas com as últimas SEMENTES em que o usuário interagiu
+        # (filtragem colaborativa, ver Echo_app/similaridade.py)
+        feed = FeedRecomendacao.objects.filter(usuario=usuario).order_by('-data_publicacao').values('noticia_id')[:10]  # Limita a 10 por exemplo
+        interacoes = InteracaoNoticia.objects.filter(usuario=usuario)
+        sementes = interacoes.order_by('-data_interacao').values('noticia_id')[:Noticia.SEMENTES]
+        vizinhas = (
+            NoticiaSimilar.objects.filter(noticia_id__in=sementes)
+            .exclude(similar_id__in=interacoes.values('noticia_id'))  # Já lidas pelo usuário
+            .values('similar_id')
+            .annotate(afinidade=models.Sum('pontuacao'))
+            .order_by('-afinidade')
+            .values('similar_id')[:Noticia.VIZINHAS]
+        )
+        return Noticia.objects.select_related('categoria').filter(
+            models.Q(pk__in=feed) | models.Q(pk__in=vizinhas)
+        ).order_by('-data_publicacao')
+
+    @staticmethod
+    def em_alta(quantidade):
+        # As `quantidade` primeiras do ranking de notícias em alta, compartilhado por todos os usuários
+        from .em_alta import noticias_em_alta  # Import local: em_alta.py depende deste módulo
+        return noticias_em_alta(quantidade)
 
 
 class InteracaoNoticia(models.Model):  # Modelo de interações (curtir/salvar)
@@ -82,6 +97,10 @@ class InteracaoNoticia(models.Model):  # Modelo de interações (curtir/salvar)
         verbose_name = "Interação de Notícia"
         verbose_name_plural = "Interações de Notícias"
         unique_together = ('usuario', 'noticia', 'tipo')  # Evita duplicatas
+        indexes = [
+            models.Index(fields=['usuario', '-data_interacao'], name='interacao_usuario_data_idx'),  # Últimas interações (sementes das recomendações)
+            models.Index(fields=['-data_interacao', '-id'], name='interacao_data_idx'),  # Changelist do admin (ordem e filtro de data)
+        ]
 
     def __str__(self):
         return f"{self.usuario.username} - {self.get_tipo_display()} - {self.noticia.titulo}"  # Texto representativo
@@ -99,6 +118,7 @@ class InteracaoNoticia(models.Model):  # Modelo de interações (curtir/salvar)
 
 class Categoria(models.Model):  # Categoria de notícias
     nome = models.CharField(max_length=50, unique=True, verbose_name="Categoria")  # Nome único
+    versao = models.PositiveIntegerField(default=1, editable=False, verbose_name="Versão")  # Chave do cache de fragmentos
 
     class Meta:
         verbose_name = "Categoria"
@@ -124,15 +144,25 @@ class HistoricoInteresse(models.Model):  # Histórico de interesse do usuário
 
     usuario = models.ForeignKey(User, on_delete=models.CASCADE, related_name="historico_interesse", verbose_name="Usuário")  # Usuário dono
     categoria = models.ForeignKey(Categoria, on_delete=models.CASCADE, related_name="interesses", verbose_name="Categoria")  # Categoria
-    pontuacao = models.PositiveIntegerField(default=0, verbose_name="Pontuação de Interesse")  # Pontuação de interesse
+    pontuacao = models.FloatField(default=0, verbose_name="Pontuação de Interesse")  # Pontuação com decaimento, na escala da época (ver Echo_app/interesses.py)
+    pontuacao_arquivada = models.FloatField(default=0, db_default=0, verbose_name="Pontuação Arquivada")  # Parte da pontuação vinda de interações arquivadas (ver Echo_app/retencao.py); db_default para os INSERTs em SQL puro
+    pontuacao_recalculo = models.FloatField(null=True, blank=True, editable=False, verbose_name="Recálculo em Andamento")  # Diferença montada por `recalcular_interesses` antes da troca (ver Echo_app/interesses.py)
 
     class Meta:
         verbose_name = "Histórico de Interesse"
         verbose_name_plural = "Históricos de Interesse"
         unique_together = ('usuario', 'categoria')  # Evita duplicação
+        indexes = [
+            models.Index(fields=['usuario', '-pontuacao'], name='historico_usuario_pont_idx'),  # Top categorias do usuário
+        ]
 
     def __str__(self):
-        return f"{self.usuario.username} gosta de {self.categoria.nome}: {self.pontuacao} pontos"  # Representação
+        return f"{self.usuario.username} gosta de {self.categoria.nome}: {self.pontuacao_atual:.1f} pontos"  # Representação
+
+    @property
+    def pontuacao_atual(self):
+        from .interesses import pontuacao_atual  # Import local: interesses.py depende deste módulo
+        return pontuacao_atual(self.pontuacao)
 
 
 # ===================== CLASSES OLIVEIRA =====================
@@ -174,6 +204,22 @@ class Notificacao(models.Model):  # Notificação enviada ao usuário
         verbose_name = "Notificação"
         verbose_name_plural = "Notificações"
         ordering = ['-data_criacao', 'lida']  # Ordena por data e leitura
+        indexes = [
+            models.Index(fields=['usuario', '-data_criacao', 'lida'], name='notif_usuario_data_idx'),  # Lista do usuário
+            models.Index(fields=['-data_criacao', '-id'], name='notif_data_idx'),  # Changelist do admin (ordem e filtro de data)
+            models.Index(
+                fields=['usuario', '-data_criacao'],
+                condition=models.Q(lida=False),
+                name='notif_nao_lidas_idx',
+            ),  # Apenas não lidas (índice parcial, bem menor)
+        ]
+        constraints = [
+            models.UniqueConstraint(
+                fields=['usuario', 'noticia'],
+                condition=models.Q(noticia__isnull=False),
+                name='notif_usuario_noticia_unica',
+            ),  # Reprocessar um envio (Echo_app/notificacoes.py) não duplica notificações
+        ]
 
     def __str__(self):
         status = "[LIDA]" if self.lida else "[NOVA]"  # Status da notificação
@@ -181,8 +227,9 @@ class Notificacao(models.Model):  # Notificação enviada ao usuário
 
     def marcar_como_lida(self):
         if not self.lida:
+            from .notificacoes import marcar_lidas  # Import local: notificacoes.py depende deste módulo
+            marcar_lidas(self.usuario_id, [self.pk])  # UPDATE só de `lida`, acertando o contador do perfil
             self.lida = True  # Marca como lida
-            self.save()  # Salva alteração
 
 
 # ===================== CLASSE RAUL =====================
@@ -205,10 +252,26 @@ class PerfilUsuario(models.Model):  # Perfil do usuário
         null=True,
         verbose_name="Foto de Perfil"
     )  # Foto do perfil
+    foto_perfil_variantes = models.JSONField(
+        default=dict,
+        blank=True,
+        editable=False,
+        verbose_name="Variantes da Foto de Perfil"
+    )  # Larguras geradas (ver Echo_app/imagens.py)
     data_criacao = models.DateTimeField(
         auto_now_add=True,
         verbose_name="Data de Criação"
     )  # Data de criação automática
+    notificacoes_nao_lidas = models.PositiveIntegerField(
+        default=0,
+        editable=False,
+        verbose_name="Notificações não lidas"
+    )  # Contador desnormalizado do sino (ver Echo_app/notificacoes.py)
+    versao_interacoes = models.PositiveIntegerField(
+        default=0,
+        editable=False,
+        verbose_name="Versão das interações"
+    )  # Muda a cada curtida/salvamento: faz parte da chave do cache (ver Echo_app/estado_interacoes.py)
 
     # --- CAMPO ADICIONADO PARA CORRIGIR O ERRO ---
     categorias_de_interesse = models.ManyToManyField(
@@ -227,8 +290,159 @@ class PerfilUsuario(models.Model):  # Perfil do usuário
     def __str__(self):
         return f"Perfil de {self.usuario.username}"  # Representação textual
 
+    def foto_perfil_srcset(self, formato='jpeg'):
+        from .imagens import srcset  # Import local: imagens.py depende deste módulo
+        return srcset(self, 'foto_perfil', formato)
+
 
 @receiver(post_save, sender=User)  # Cria perfil automaticamente ao criar usuário
-def criar_perfil_automaticamente(sender, instance, created, **kwargs):
-    if created:
-        PerfilUsuario.objects.create(usuario=instance)  # Cria perfil
\ No newline at end of file
+def criar_perfil_automaticamente(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        perfil = PerfilUsuario(usuario=instance)
+        perfil._categorias_iniciais = getattr(instance, '_categorias_iniciais', None)  # Ver Echo_app/cadastro.py
+        perfil.save()  # Cria perfil
+        if perfil._categorias_iniciais:
+            perfil.categorias_de_interesse.add(*perfil._categorias_iniciais)  # O sinal do m2m monta o feed
+        instance.perfil = perfil  # Quem acabou de criar o usuário não precisa buscar o perfil
+
+
+# ===================== FEED MATERIALIZADO =====================
+
+class FeedRecomendacao(models.Model):  # Entrada pré-calculada do feed de recomendações de um usuário
+    usuario = models.ForeignKey(User, on_delete=models.CASCADE, related_name="feed_recomendacoes", verbose_name="Usuário")  # Dono do feed
+    noticia = models.ForeignKey(Noticia, on_delete=models.CASCADE, related_name="entradas_feed", verbose_name="Notícia")  # Notícia recomendada
+    data_publicacao = models.DateTimeField(verbose_name="Data de Publicação")  # Cópia de Noticia.data_publicacao usada na ordenação
+
+    class Meta:
+        verbose_name = "Entrada de Feed"
+        verbose_name_plural = "Entradas de Feed"
+        unique_together = ('usuario', 'noticia')  # Uma notícia aparece uma vez por feed
+        indexes = [
+            models.Index(fields=['usuario', '-data_publicacao'], name='feed_usuario_data_idx'),  # Leitura do feed
+        ]
+
+    def __str__(self):
+        return f"Feed de {self.usuario_id}: {self.noticia_id}"
+
+
+class DistribuicaoFeed(models.Model):  # Notícia esperando entrar nos feeds materializados, na fila do worker (ver Echo_app/feed.py)
+    noticia = models.OneToOneField(Noticia, on_delete=models.CASCADE, related_name="+", verbose_name="Notícia")  # Um pedido em aberto por notícia
+    solicitada_em = models.DateTimeField(default=timezone.now, verbose_name="Solicitada em")  # Uma nova edição renova o pedido
+    reservado_ate = models.DateTimeField(null=True, blank=True, verbose_name="Reservado até")  # Worker que parar perde a reserva
+    tentativas = models.PositiveIntegerField(default=0, verbose_name="Tentativas")  # Quantas vezes foi reservado
+
+    class Meta:
+        verbose_name = "Distribuição de Feed"
+        verbose_name_plural = "Distribuições de Feed"
+        ordering = ['solicitada_em']
+
+    def __str__(self):
+        return f"Distribuir {self.noticia_id} ({self.tentativas} tentativas)"
+
+
+class NoticiaSimilar(models.Model):  # Vizinha de uma notícia na filtragem colaborativa, calculada offline (ver Echo_app/similaridade.py)
+    noticia = models.ForeignKey(Noticia, on_delete=models.CASCADE, related_name="similares", verbose_name="Notícia")  # Notícia de origem
+    similar = models.ForeignKey(Noticia, on_delete=models.CASCADE, related_name="+", verbose_name="Notícia Similar")  # Uma das K mais parecidas
+    pontuacao = models.FloatField(verbose_name="Similaridade")  # Cosseno entre os vetores de interação das duas notícias
+
+    class Meta:
+        verbose_name = "Notícia Similar"
+        verbose_name_plural = "Notícias Similares"
+        indexes = [
+            # Cobre a leitura de recomendar_para: vizinhas das sementes, somando a similaridade
+            models.Index(fields=['noticia', '-pontuacao', 'similar'], name='similar_noticia_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.noticia_id} ~ {self.similar_id}: {self.pontuacao:.3f}"
+
+
+class AtividadeNoticia(models.Model):  # Curtidas/salvamentos de uma notícia num balde de tempo (ver Echo_app/em_alta.py)
+    noticia = models.ForeignKey(Noticia, on_delete=models.CASCADE, related_name="atividade", verbose_name="Notícia")  # Notícia
+    inicio = models.DateTimeField(verbose_name="Início do Balde")  # Início do intervalo de BALDE minutos
+    pontos = models.FloatField(default=0, verbose_name="Pontos")  # Soma dos pesos das interações no intervalo
+
+    class Meta:
+        verbose_name = "Atividade de Notícia"
+        verbose_name_plural = "Atividades de Notícias"
+        constraints = [
+            models.UniqueConstraint(fields=['noticia', 'inicio'], name='atividade_noticia_balde_unica'),  # Alvo do upsert
+        ]
+        indexes = [
+            models.Index(fields=['inicio', 'noticia', 'pontos'], name='atividade_inicio_idx'),  # Ranking das últimas 24h (cobre a agregação)
+        ]
+
+    def __str__(self):
+        return f"{self.noticia_id} @ {self.inicio:%d/%m %H:%M}: {self.pontos:g}"
+
+
+class InteracaoArquivada(models.Model):  # Curtida ou salvamento de uma notícia antiga, tirado de InteracaoNoticia pelo arquivo (ver Echo_app/retencao.py)
+    pk = models.CompositePrimaryKey('usuario', 'noticia', 'tipo')  # Sem coluna id: a própria chave responde "este usuário curtiu/salvou?"
+    usuario = models.ForeignKey(User, on_delete=models.CASCADE, db_index=False, related_name="+", verbose_name="Usuário")  # Coberto pela chave
+    noticia = models.ForeignKey(Noticia, on_delete=models.CASCADE, related_name="+", verbose_name="Notícia")  # Apagar a notícia (CASCADE)
+    tipo = models.CharField(max_length=10, choices=InteracaoNoticia.TIPO_INTERACAO_CHOICES, verbose_name="Tipo de Interação")
+    data_interacao = models.DateTimeField(verbose_name="Data da Interação")  # Para desfazer: o peso de interesse e o mês no resumo
+
+    class Meta:
+        verbose_name = "Interação Arquivada"
+        verbose_name_plural = "Interações Arquivadas"
+
+    def __str__(self):
+        return f"{self.usuario_id} - {self.tipo} - {self.noticia_id}"
+
+
+class ResumoInteracoes(models.Model):  # Totais das interações arquivadas, por notícia, tipo e mês (ver Echo_app/retencao.py)
+    noticia = models.ForeignKey(Noticia, on_delete=models.CASCADE, related_name="resumo_interacoes", verbose_name="Notícia")  # Notícia
+    categoria = models.ForeignKey(
+        Categoria, on_delete=models.SET_NULL, null=True, blank=True, related_name="+", verbose_name="Categoria"
+    )  # A da notícia quando foi arquivada: totais por categoria e mês
+    tipo = models.CharField(max_length=10, choices=InteracaoNoticia.TIPO_INTERACAO_CHOICES, verbose_name="Tipo de Interação")  # Curtida ou salvamento
+    mes = models.DateField(verbose_name="Mês")  # Primeiro dia do mês das interações
+    total = models.PositiveIntegerField(default=0, verbose_name="Total Arquivado")  # Interações apagadas de InteracaoNoticia
+
+    class Meta:
+        verbose_name = "Resumo de Interações Arquivadas"
+        verbose_name_plural = "Resumos de Interações Arquivadas"
+        constraints = [
+            models.UniqueConstraint(fields=['noticia', 'tipo', 'mes'], name='resumo_noticia_tipo_mes_unico'),  # Alvo do upsert; contadores
+        ]
+        indexes = [
+            models.Index(fields=['categoria', 'mes', 'tipo'], name='resumo_categoria_mes_idx'),  # Totais por categoria e mês (admin)
+        ]
+
+    def __str__(self):
+        return f"{self.noticia_id} {self.tipo} {self.mes:%m/%Y}: {self.total}"
+
+
+class EnvioNotificacao(models.Model):  # Tarefa da fila de envio de notificações de uma notícia publicada
+
+    STATUS_CHOICES = [
+        ('PENDENTE', 'Pendente'),  # Aguardando um worker
+        ('PROCESSANDO', 'Processando'),  # Reservado por um worker até `reservado_ate`
+        ('CONCLUIDO', 'Concluído'),  # Todos os seguidores notificados
+    ]
+
+    noticia = models.OneToOneField(Noticia, on_delete=models.CASCADE, related_name="envio_notificacao", verbose_name="Notícia")  # Notícia publicada
+    categoria = models.ForeignKey(Categoria, on_delete=models.CASCADE, related_name="envios_notificacao", verbose_name="Categoria")  # Seguidores desta categoria são notificados
+    status = models.CharField(max_length=12, choices=STATUS_CHOICES, default='PENDENTE', verbose_name="Status")
+    ultimo_perfil_id = models.BigIntegerField(default=0, verbose_name="Último perfil notificado")  # Cursor: o worker retoma daqui após uma falha
+    total_enviadas = models.PositiveIntegerField(default=0, verbose_name="Notificações enviadas")
+    tentativas = models.PositiveIntegerField(default=0, verbose_name="Tentativas")  # Quantas vezes foi reservado
+    reservado_ate = models.DateTimeField(null=True, blank=True, verbose_name="Reservado até")  # Worker que parar de renovar perde a reserva
+    data_criacao = models.DateTimeField(auto_now_add=True, verbose_name="Data de Criação")
+    data_conclusao = models.DateTimeField(null=True, blank=True, verbose_name="Data de Conclusão")
+
+    class Meta:
+        verbose_name = "Envio de Notificações"
+        verbose_name_plural = "Envios de Notificações"
+        ordering = ['data_criacao']
+        indexes = [
+            models.Index(
+                fields=['data_criacao'],
+                condition=~models.Q(status='CONCLUIDO'),
+                name='envio_notif_fila_idx',
+            ),  # Só a fila em aberto
+        ]
+
+    def __str__(self):
+        return f"[{self.status}] {self.noticia} ({self.total_enviadas} enviadas)"
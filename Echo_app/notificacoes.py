@@ -0,0 +1,248 @@
+# Echo/Echo_app/notificacoes.py
+
+"""
+Envio (fan-out) de notificações quando uma Noticia é publicada.
+
+Publicar uma notícia numa categoria notifica todos os perfis que a seguem
+(Categoria.perfis_interessados), que podem ser centenas de milhares. Para
+não prender o save do editor, o sinal apenas enfileira um EnvioNotificacao
+na mesma transação da notícia (um INSERT). O comando
+`processar_notificacoes` consome a fila:
+
+- reserva o envio por RESERVA (SELECT ... FOR UPDATE SKIP LOCKED no
+  PostgreSQL), renovando a cada lote; se o worker morrer, outro retoma
+  quando a reserva expirar;
+- percorre os seguidores por faixas de id (keyset em perfilusuario_id) e
+  grava cada lote com bulk_create, na mesma transação que avança o cursor
+  `ultimo_perfil_id`;
+- a restrição única (usuario, noticia) de Notificacao e o ignore_conflicts
+  tornam o reprocessamento de um lote inofensivo.
+
+Contador de não lidas: PerfilUsuario.notificacoes_nao_lidas é mantido na
+mesma transação que cria ou marca as notificações, para que o sino do
+cabeçalho leia um inteiro em vez de fazer COUNT. Notificações criadas ou
+apagadas uma a uma (admin) acertam o contador pelos sinais; divergências
+são corrigidas por `reconciliar_nao_lidas`.
+"""
+
+import logging
+from datetime import timedelta
+
+from django.db import transaction
+from django.db.models import Count, F, OuterRef, Q, Subquery, Value
+from django.db.models.functions import Coalesce, Greatest
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from django.utils import timezone
+
+from .eventos import evento_nao_lidas, evento_notificacao, hub, publicar_apos_commit
+from .models import EnvioNotificacao, Noticia, Notificacao, PerfilUsuario
+
+logger = logging.getLogger(__name__)
+
+TAMANHO_LOTE = 1000  # Notificações por bulk_create (e por transação)
+RESERVA = timedelta(minutes=5)  # Por quanto tempo um worker segura um envio sem renovar
+
+_Seguidores = PerfilUsuario.categorias_de_interesse.through
+
+
+def _somar_nao_lidas(delta, **filtros):
+    """Soma `delta` ao contador dos perfis filtrados, sem ficar negativo."""
+    PerfilUsuario.objects.filter(**filtros).update(
+        notificacoes_nao_lidas=Greatest(F('notificacoes_nao_lidas') + delta, Value(0))
+    )
+
+
+def nao_lidas(usuario_id):
+    """Número de notificações não lidas do usuário (lido do contador do perfil)."""
+    return PerfilUsuario.objects.filter(usuario_id=usuario_id).values_list(
+        'notificacoes_nao_lidas', flat=True
+    ).first() or 0
+
+
+def marcar_lidas(usuario_id, ids=None):
+    """
+    Marca como lidas, num único UPDATE, as notificações `ids` do usuário
+    (todas, se ids for None). Retorna quantas deixaram de estar não lidas.
+    """
+    with transaction.atomic():
+        notificacoes = Notificacao.objects.filter(usuario_id=usuario_id, lida=False)
+        if ids is not None:
+            notificacoes = notificacoes.filter(pk__in=ids)
+        marcadas = notificacoes.update(lida=True)
+        if marcadas:
+            _somar_nao_lidas(-marcadas, usuario_id=usuario_id)
+            _avisar_nao_lidas(usuario_id)
+    return marcadas
+
+
+def marcar_lidas_em_lote(notificacoes, lida=True):
+    """
+    Marca como lidas (ou não lidas) as notificações do queryset, de qualquer
+    usuário (ações do admin). Um UPDATE nos contadores dos destinatários, com
+    o delta de cada um, e outro nas notificações. Retorna quantas mudaram.
+    """
+    alvo = notificacoes.filter(lida=not lida).order_by()
+    delta = Subquery(
+        alvo.filter(usuario_id=OuterRef('usuario_id')).values('usuario_id').annotate(total=Count('pk')).values('total')
+    )
+    with transaction.atomic():
+        PerfilUsuario.objects.filter(usuario_id__in=alvo.values('usuario_id')).update(
+            notificacoes_nao_lidas=Greatest(F('notificacoes_nao_lidas') + (-1 if lida else 1) * delta, Value(0))
+        )
+        return alvo.update(lida=lida)
+
+
+def _avisar_nao_lidas(usuario_id):
+    # Só consulta o contador se o usuário tem o stream de eventos aberto neste
+    # processo; nos demais, o vigia de Echo_app/eventos.py percebe a mudança
+    if hub.tem_inscritos(usuario_id):
+        publicar_apos_commit(usuario_id, evento_nao_lidas(nao_lidas(usuario_id)))
+
+
+def reconciliar_nao_lidas(tamanho_lote=5000):
+    """Recalcula o contador de não lidas dos perfis, por faixas de id. Retorna quantos corrigiu."""
+    real = Coalesce(
+        Subquery(
+            Notificacao.objects.filter(usuario_id=OuterRef('usuario_id'), lida=False)
+            .order_by().values('usuario_id').annotate(total=Count('pk')).values('total')
+        ),
+        Value(0),
+    )
+    corrigidos = 0
+    ultimo_id = 0
+    while True:
+        ids = list(
+            PerfilUsuario.objects.filter(pk__gt=ultimo_id).order_by('pk').values_list('pk', flat=True)[:tamanho_lote]
+        )
+        if not ids:
+            break
+        ultimo_id = ids[-1]
+        divergentes = PerfilUsuario.objects.filter(pk__in=ids).annotate(real=real).exclude(notificacoes_nao_lidas=F('real'))
+        corrigidos += PerfilUsuario.objects.filter(pk__in=divergentes.values('pk')).update(notificacoes_nao_lidas=real)
+    return corrigidos
+
+
+def manchete_da_noticia(noticia, categoria):
+    return f"Nova notícia em {categoria.nome}: {noticia.titulo}"[:255]
+
+
+def enfileirar(noticia):
+    """Cria o envio da notícia (no máximo um por notícia)."""
+    if noticia.categoria_id is None:
+        return None
+    envio, _ = EnvioNotificacao.objects.get_or_create(
+        noticia=noticia, defaults={'categoria_id': noticia.categoria_id}
+    )
+    return envio
+
+
+def reservar_proximo():
+    """
+    Reserva o envio em aberto mais antigo (pendente, ou com a reserva de um
+    worker que parou expirada). Retorna None se a fila estiver vazia.
+    """
+    agora = timezone.now()
+    with transaction.atomic():
+        envio = (
+            EnvioNotificacao.objects
+            .select_for_update(skip_locked=True)
+            .filter(Q(status='PENDENTE') | Q(status='PROCESSANDO', reservado_ate__lt=agora))
+            .order_by('data_criacao')
+            .first()
+        )
+        if envio is None:
+            return None
+        envio.status = 'PROCESSANDO'
+        envio.reservado_ate = agora + RESERVA
+        envio.tentativas += 1
+        envio.save(update_fields=['status', 'reservado_ate', 'tentativas'])
+    return envio
+
+
+def processar(envio, tamanho_lote=TAMANHO_LOTE):
+    """Notifica os seguidores restantes do envio, lote a lote. Retorna quantas foram criadas."""
+    noticia = Noticia.objects.select_related('categoria').get(pk=envio.noticia_id)
+    manchete = manchete_da_noticia(noticia, noticia.categoria or envio.categoria)
+    criadas = 0
+
+    while True:
+        seguidores = list(
+            _Seguidores.objects
+            .filter(categoria_id=envio.categoria_id, perfilusuario_id__gt=envio.ultimo_perfil_id)
+            .order_by('perfilusuario_id')
+            .values_list('perfilusuario_id', 'perfilusuario__usuario_id')[:tamanho_lote]
+        )
+        if not seguidores:
+            break
+
+        with transaction.atomic():
+            # Lote já gravado antes de uma falha: não notifica nem conta de novo
+            ja_notificados = set(Notificacao.objects.filter(
+                noticia_id=noticia.pk, usuario_id__in=[usuario_id for _, usuario_id in seguidores]
+            ).values_list('usuario_id', flat=True))
+            novas = [(perfil_id, usuario_id) for perfil_id, usuario_id in seguidores if usuario_id not in ja_notificados]
+
+            Notificacao.objects.bulk_create(
+                [Notificacao(usuario_id=usuario_id, noticia_id=noticia.pk, manchete=manchete) for _, usuario_id in novas],
+                ignore_conflicts=True,
+            )
+            _somar_nao_lidas(1, pk__in=[perfil_id for perfil_id, _ in novas])
+            envio.ultimo_perfil_id = seguidores[-1][0]
+            envio.reservado_ate = timezone.now() + RESERVA  # Renova a reserva
+            EnvioNotificacao.objects.filter(pk=envio.pk).update(
+                ultimo_perfil_id=envio.ultimo_perfil_id,
+                reservado_ate=envio.reservado_ate,
+                total_enviadas=F('total_enviadas') + len(novas),
+            )
+        criadas += len(novas)
+
+    EnvioNotificacao.objects.filter(pk=envio.pk).update(
+        status='CONCLUIDO', reservado_ate=None, data_conclusao=timezone.now()
+    )
+    return criadas
+
+
+def processar_pendentes(tamanho_lote=TAMANHO_LOTE, maximo=None):
+    """Consome a fila até esvaziá-la (ou até `maximo` envios). Retorna quantos envios processou."""
+    processados = 0
+    while maximo is None or processados < maximo:
+        envio = reservar_proximo()
+        if envio is None:
+            break
+        try:
+            criadas = processar(envio, tamanho_lote)
+        except Noticia.DoesNotExist:  # Notícia apagada: o CASCADE já removeu o envio
+            continue
+        except Exception:
+            # A reserva expira e o envio volta para a fila, a partir do último lote gravado
+            logger.exception("Falha no envio de notificações %s (noticia=%s)", envio.pk, envio.noticia_id)
+            continue
+        logger.info("Envio %s concluído: %d notificações", envio.pk, criadas)
+        processados += 1
+    return processados
+
+
+# ===================== SINAIS =====================
+
+@receiver(post_save, sender=Noticia)
+def noticia_publicada(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        enfileirar(instance)  # Na transação do save: a notícia e o envio entram juntos
+
+
+@receiver(post_save, sender=Notificacao)
+def notificacao_criada(sender, instance, created, raw=False, **kwargs):
+    if created and not raw and not instance.lida:
+        _somar_nao_lidas(1, usuario_id=instance.usuario_id)
+        if hub.tem_inscritos(instance.usuario_id):
+            publicar_apos_commit(instance.usuario_id, evento_notificacao(
+                {campo: getattr(instance, campo) for campo in ('id', 'manchete', 'noticia_id', 'data_criacao')}
+            ))
+            _avisar_nao_lidas(instance.usuario_id)
+
+
+@receiver(post_delete, sender=Notificacao)
+def notificacao_apagada(sender, instance, **kwargs):
+    if not instance.lida:
+        _somar_nao_lidas(-1, usuario_id=instance.usuario_id)
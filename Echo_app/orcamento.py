@@ -0,0 +1,223 @@
+# Echo/Echo_app/orcamento.py
+
+"""
+Orçamento de consultas por view.
+
+- `ContadorConsultas` conta as consultas SQL e o tempo gasto no banco dentro
+  de um bloco `with`, agrupando por "formato" da SQL (a consulta sem os
+  valores) para detectar N+1: o mesmo formato repetido várias vezes.
+- `@orcamento_consultas(n)` declara quantas consultas uma view pode fazer.
+- `OrcamentoConsultasMiddleware` mede cada requisição. Em produção registra
+  no log os piores casos; com ORCAMENTO_CONSULTAS_ESTRITO = True (testes)
+  levanta OrcamentoExcedido e derruba a requisição. Atende views síncronas
+  e assíncronas (ASGI). Com ORCAMENTO_CABECALHO = True, cada resposta leva
+  o total de consultas no cabeçalho X-Consultas (lido por `loadtest`).
+"""
+
+import logging
+import re
+import threading
+import time
+from collections import Counter
+from contextlib import ExitStack, nullcontext
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.db import connections
+
+logger = logging.getLogger(__name__)
+
+# Repetições do mesmo formato de SQL a partir das quais consideramos N+1
+LIMITE_REPETICOES = 3
+
+_LISTA_PARAMETROS = re.compile(r'\((?:%s|\?)(?:,\s*(?:%s|\?))*\)')
+
+# Controle de transação se repete naturalmente e não indica N+1
+_CONTROLE_TRANSACAO = re.compile(r'^\s*(BEGIN|COMMIT|ROLLBACK|SAVEPOINT|RELEASE SAVEPOINT|ROLLBACK TO SAVEPOINT)\b', re.IGNORECASE)
+
+
+# Contador da requisição em andamento, visto também pelas threads auxiliares
+# de `Echo_app.concorrencia` (o contexto é copiado para elas)
+_contador_ativo = ContextVar('contador_consultas', default=None)
+
+
+class OrcamentoExcedido(AssertionError):
+    """A view fez mais consultas que o orçamento ou repetiu consultas (N+1)."""
+
+
+def formato_sql(sql):
+    """Normaliza a SQL para que consultas iguais com listas IN de tamanhos diferentes coincidam."""
+    return _LISTA_PARAMETROS.sub('(...)', sql)
+
+
+class ContadorConsultas:
+    """
+    Conta consultas e tempo de banco em todos os bancos configurados.
+
+    As conexões são por thread: o `with` mede a thread atual, e outras
+    threads entram na contagem com `medir_nesta_thread()`.
+    """
+
+    def __init__(self, using=None):
+        self.aliases = [using] if using else list(connections)
+        self.total = 0
+        self.tempo = 0.0  # Segundos
+        self.formatos = Counter()
+        self._trava = threading.Lock()
+
+    def __enter__(self):
+        self._anterior = _contador_ativo.get()
+        _contador_ativo.set(self)
+        self._pilha = self.anexar()
+        return self
+
+    def __exit__(self, *exc_info):
+        self._pilha.close()
+        _contador_ativo.set(self._anterior)
+
+    def anexar(self):
+        """Passa a contar as consultas das conexões da thread atual."""
+        pilha = ExitStack()
+        for alias in self.aliases:
+            pilha.enter_context(connections[alias].execute_wrapper(self))
+        return pilha
+
+    def __call__(self, execute, sql, params, many, context):
+        inicio = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            with self._trava:
+                self.tempo += time.perf_counter() - inicio
+                self.total += 1
+                self.formatos[formato_sql(sql)] += 1
+
+    def repetidas(self, limite=LIMITE_REPETICOES):
+        """Formatos de SQL executados `limite` vezes ou mais, do mais repetido ao menos."""
+        return [
+            (sql, vezes) for sql, vezes in self.formatos.most_common()
+            if vezes >= limite and not _CONTROLE_TRANSACAO.match(sql)
+        ]
+
+
+def medir_nesta_thread():
+    """Inclui as consultas desta thread no contador da requisição, se houver."""
+    contador = _contador_ativo.get()
+    return contador.anexar() if contador is not None else nullcontext()
+
+
+def orcamento_consultas(maximo):
+    """
+    Declara o número máximo de consultas de uma view.
+
+    Funciona em views de função e em class-based views (aplicado na classe).
+    """
+    def decorador(view):
+        view.orcamento_consultas = maximo
+        return view
+    return decorador
+
+
+def orcamento_da_view(view_func):
+    """Lê o orçamento declarado em uma view (já resolvida pelo URLconf)."""
+    orcamento = getattr(view_func, 'orcamento_consultas', None)
+    if orcamento is None and hasattr(view_func, 'view_class'):  # DetailView.as_view()
+        orcamento = getattr(view_func.view_class, 'orcamento_consultas', None)
+    return orcamento
+
+
+def verificar(nome_view, contador, orcamento):
+    """Retorna a lista de problemas encontrados (vazia se estiver tudo certo)."""
+    problemas = []
+    if orcamento is not None and contador.total > orcamento:
+        problemas.append(f"{nome_view} fez {contador.total} consultas (orçamento: {orcamento})")
+    for sql, vezes in contador.repetidas():
+        problemas.append(f"{nome_view} repetiu {vezes}x a consulta (N+1): {sql}")
+    return problemas
+
+
+class OrcamentoConsultasMiddleware:
+    """Mede as consultas de cada requisição e confere o orçamento da view."""
+
+    sync_capable = True
+    async_capable = True
+
+    # Quantas das piores requisições cada processo guarda para o log
+    TOTAL_PIORES = 10
+
+    piores = []  # [(total de consultas, tempo, view)], compartilhado pelo processo
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+
+        with ContadorConsultas() as contador:
+            response = self.get_response(request)
+        return self._conferir(request, response, contador)
+
+    async def __acall__(self, request):
+        # As consultas do ORM rodam na thread síncrona da requisição, não no
+        # loop: o contador é instalado (e removido) nas conexões de lá
+        contador = ContadorConsultas()
+        await sync_to_async(contador.__enter__)()
+        try:
+            response = await self.get_response(request)
+        finally:
+            await sync_to_async(contador.__exit__)(None, None, None)
+        return self._conferir(request, response, contador)
+
+    def _conferir(self, request, response, contador):
+        match = getattr(request, 'resolver_match', None)
+        if match is None:
+            return response
+
+        nome_view = match.view_name or match._func_path
+        if getattr(settings, 'ORCAMENTO_CABECALHO', False):
+            response['X-Consultas'] = str(contador.total)
+        problemas = verificar(nome_view, contador, orcamento_da_view(match.func))
+
+        if problemas and getattr(settings, 'ORCAMENTO_CONSULTAS_ESTRITO', False):
+            raise OrcamentoExcedido("\n".join(problemas))
+
+        for problema in problemas:
+            logger.warning("%s (%.1f ms no banco)", problema, contador.tempo * 1000)
+        self._registrar_pior(nome_view, contador)
+
+        return response
+
+    def _registrar_pior(self, nome_view, contador):
+        piores = type(self).piores
+        if len(piores) >= self.TOTAL_PIORES and contador.total <= piores[-1][0]:
+            return
+        piores.append((contador.total, contador.tempo, nome_view))
+        piores.sort(reverse=True)
+        del piores[self.TOTAL_PIORES:]
+        logger.info(
+            "Novo entre os %d piores: %s com %d consultas (%.1f ms no banco)",
+            self.TOTAL_PIORES, nome_view, contador.total, contador.tempo * 1000,
+        )
+
+
+class OrcamentoConsultasTestMixin:
+    """
+    Mixin para TestCase: `assertDentroDoOrcamento` faz a requisição com o
+    client e falha se a view estourar o orçamento declarado ou fizer N+1.
+    """
+
+    def assertDentroDoOrcamento(self, metodo, url, **kwargs):
+        with ContadorConsultas() as contador:
+            response = getattr(self.client, metodo)(url, **kwargs)
+
+        match = response.resolver_match
+        orcamento = orcamento_da_view(match.func)
+        self.assertIsNotNone(orcamento, f"{match.view_name} não declara @orcamento_consultas")
+
+        problemas = verificar(match.view_name, contador, orcamento)
+        self.assertEqual(problemas, [], "\n".join(problemas))
+        return response
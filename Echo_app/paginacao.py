@@ -0,0 +1,76 @@
+# Echo/Echo_app/paginacao.py
+
+"""
+Paginação por cursor (keyset) sobre (data_publicacao, id).
+
+Em vez de OFFSET, cada página continua a partir da última notícia vista:
+WHERE (data_publicacao, id) < (cursor) ORDER BY data_publicacao DESC, id DESC.
+Com o índice (-data_publicacao, -id) a página 1000 custa o mesmo que a 1ª.
+
+Outras listas ordenadas por data usam o mesmo mecanismo passando `campo`
+(ex.: notificações, por data_criacao).
+"""
+
+import base64
+from datetime import datetime
+
+from django.db.models import Q
+
+from .feed import categorias_do_feed
+from .models import Noticia
+
+NOTICIAS_POR_PAGINA = 10
+LIMITE_MAXIMO = 50
+
+
+def codificar_cursor(objeto, campo='data_publicacao'):
+    valor = f"{getattr(objeto, campo).isoformat()}|{objeto.pk}"
+    return base64.urlsafe_b64encode(valor.encode()).decode()
+
+
+def decodificar_cursor(cursor):
+    """Retorna (data, pk) ou None se o cursor for inválido."""
+    try:
+        data, pk = base64.urlsafe_b64decode(cursor.encode()).decode().split('|')
+        return datetime.fromisoformat(data), int(pk)
+    except (ValueError, UnicodeDecodeError):
+        return None
+
+
+def consulta_da_pagina(queryset, cursor=None, limite=NOTICIAS_POR_PAGINA, campo='data_publicacao'):
+    """Queryset da página (com um item a mais, para saber se há próxima)."""
+    posicao = decodificar_cursor(cursor) if cursor else None
+    if posicao is not None:
+        data, pk = posicao
+        queryset = queryset.filter(Q(**{f'{campo}__lt': data}) | Q(**{campo: data, 'pk__lt': pk}))
+    return queryset.order_by(f'-{campo}', '-pk')[:limite + 1]
+
+
+def pagina(queryset, cursor=None, limite=NOTICIAS_POR_PAGINA, campo='data_publicacao'):
+    """
+    Retorna (itens, proximo_cursor) a partir do cursor; proximo_cursor é
+    None na última página.
+    """
+    limite = max(1, min(limite, LIMITE_MAXIMO))
+
+    itens = list(consulta_da_pagina(queryset, cursor, limite, campo))
+    proximo_cursor = None
+    if len(itens) > limite:
+        itens = itens[:limite]
+        proximo_cursor = codificar_cursor(itens[-1], campo)
+    return itens, proximo_cursor
+
+
+def fonte_recomendadas(usuario):
+    """Todas as notícias das categorias que alimentam o feed do usuário."""
+    categorias = categorias_do_feed(usuario.pk)
+    noticias = Noticia.objects.select_related('categoria')
+    return noticias if categorias is None else noticias.filter(categoria_id__in=categorias)
+
+
+def fonte_urgentes():
+    return Noticia.objects.select_related('categoria')
+
+
+def fonte_categoria(categoria_id):
+    return Noticia.objects.select_related('categoria').filter(categoria_id=categoria_id)
@@ -0,0 +1,239 @@
+# Echo/Echo_app/replicas.py
+
+"""
+Leituras em réplicas do banco (DATABASE_ROUTERS).
+
+Só as views marcadas com `@le_da_replica` (dashboard, página da notícia,
+feeds) leem das réplicas listadas em BANCOS_REPLICAS; todo o resto, e
+toda escrita, vai para o primário (`default`). Sem réplicas configuradas o
+roteador não muda nada.
+
+Ler o que acabou de escrever: numa requisição que escreveu (POST, ou
+qualquer escrita pelo ORM), as leituras seguintes ficam no primário, e a
+resposta leva o cookie REPLICAS_COOKIE. Enquanto ele valer
+(REPLICAS_JANELA_PRIMARIO segundos), as requisições desse navegador também
+leem do primário, em qualquer processo. Assim quem curtiu não vê o contador
+antigo ao voltar para a notícia.
+
+Saúde: cada processo confere uma réplica antes de usá-la, no máximo a cada
+REPLICAS_VERIFICACAO segundos. Uma réplica fora do ar, ou (PostgreSQL)
+atrasada mais que a janela do primário, fica de fora até a próxima
+verificação; sem nenhuma saudável, as leituras vão para o primário. Uma
+requisição lê sempre da mesma réplica.
+
+Em dev, REPLICAS_LOCAIS=1 liga a réplica SQLite somente leitura sobre o
+mesmo arquivo (Echoproject/settings.py), para exercitar o roteamento.
+"""
+
+import logging
+import random
+import threading
+import time
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, DatabaseError, connections
+
+logger = logging.getLogger(__name__)
+
+
+def bancos_replicas():
+    return getattr(settings, 'BANCOS_REPLICAS', [])
+
+
+def janela_primario():
+    return getattr(settings, 'REPLICAS_JANELA_PRIMARIO', 5)
+
+
+def cookie_primario():
+    return getattr(settings, 'REPLICAS_COOKIE', 'echo_primario')
+
+
+# ===================== MARCAÇÃO DAS VIEWS =====================
+
+def le_da_replica(view):
+    """Permite que a view leia das réplicas. Funciona em views de função e em class-based views."""
+    view.le_da_replica = True
+    return view
+
+
+def view_le_da_replica(view_func):
+    if getattr(view_func, 'le_da_replica', False):
+        return True
+    return getattr(getattr(view_func, 'view_class', None), 'le_da_replica', False)  # View.as_view()
+
+
+# ===================== ESTADO DA REQUISIÇÃO =====================
+
+class EstadoRequisicao:
+    """
+    O que o roteador precisa saber da requisição em andamento. É mutável de
+    propósito: as threads de `Echo_app.concorrencia` recebem uma cópia do
+    contexto, mas o mesmo objeto.
+    """
+
+    def __init__(self, primario=False):
+        self.primario = primario  # Cookie de leitura no primário ainda valendo
+        self.view_na_replica = False
+        self.escreveu = False
+        self.replica = None  # Escolhida na primeira leitura
+
+    @property
+    def le_da_replica(self):
+        return self.view_na_replica and not (self.primario or self.escreveu)
+
+
+_estado = ContextVar('estado_replicas', default=None)
+
+
+# ===================== SAÚDE =====================
+
+class _Saude:
+    """Resultado da última verificação de cada réplica, por processo."""
+
+    def __init__(self):
+        self._trava = threading.Lock()
+        self._verificadas = {}  # alias -> (próxima verificação, saudável)
+
+    def saudavel(self, alias):
+        agora = time.monotonic()
+        with self._trava:
+            proxima, saudavel = self._verificadas.get(alias, (0, True))
+            if proxima > agora:
+                return saudavel
+            # Marca antes de verificar: as outras threads seguem com o resultado anterior
+            self._verificadas[alias] = (agora + getattr(settings, 'REPLICAS_VERIFICACAO', 10), saudavel)
+        saudavel = self._verificar(alias)
+        with self._trava:
+            self._verificadas[alias] = (self._verificadas[alias][0], saudavel)
+        return saudavel
+
+    def marcar(self, alias, saudavel, segundos=None):
+        proxima = time.monotonic() + (getattr(settings, 'REPLICAS_VERIFICACAO', 10) if segundos is None else segundos)
+        with self._trava:
+            self._verificadas[alias] = (proxima, saudavel)
+
+    def limpar(self):
+        with self._trava:
+            self._verificadas.clear()
+
+    def _verificar(self, alias):
+        conexao = connections[alias]
+        try:
+            with conexao.cursor() as cursor:
+                if conexao.vendor == 'postgresql':
+                    # Atraso da réplica; 0 se já aplicou tudo que recebeu (primário ocioso)
+                    cursor.execute(
+                        "SELECT CASE WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0 "
+                        "ELSE COALESCE(EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()), 0) END"
+                    )
+                    atraso = float(cursor.fetchone()[0])
+                    if atraso > janela_primario():
+                        logger.warning("Réplica %s atrasada %.1fs; lendo do primário.", alias, atraso)
+                        return False
+                else:
+                    cursor.execute("SELECT 1")
+        except DatabaseError:
+            logger.warning("Réplica %s indisponível; lendo do primário.", alias, exc_info=True)
+            conexao.close()
+            return False
+        return True
+
+
+saude = _Saude()
+
+
+def escolher_replica():
+    """Uma réplica saudável, ao acaso, ou None."""
+    replicas = list(bancos_replicas())
+    random.shuffle(replicas)
+    return next((alias for alias in replicas if saude.saudavel(alias)), None)
+
+
+# ===================== ROTEADOR =====================
+
+class RoteadorReplicas:
+
+    def db_for_read(self, model, **hints):
+        estado = _estado.get()
+        if estado is None or not estado.le_da_replica:
+            return None
+        if connections[DEFAULT_DB_ALIAS].in_atomic_block:
+            return None  # Dentro de uma transação, lê o que ela escreveu
+        if estado.replica is None:
+            estado.replica = escolher_replica() or DEFAULT_DB_ALIAS
+        return estado.replica
+
+    def db_for_write(self, model, **hints):
+        estado = _estado.get()
+        if estado is not None:
+            estado.escreveu = True
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        bancos = {DEFAULT_DB_ALIAS, *bancos_replicas()}
+        if obj1._state.db in bancos and obj2._state.db in bancos:
+            return True  # Mesmos dados
+        return None
+
+    def allow_migrate(self, db, app_label, **hints):
+        if db in bancos_replicas():
+            return False  # Recebem o esquema pela replicação
+        return None
+
+
+# ===================== MIDDLEWARE =====================
+
+class ReplicasMiddleware:
+    """Prepara o estado do roteador por requisição e grava o cookie de leitura no primário."""
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+
+        estado = self._estado(request)
+        token = _estado.set(estado)
+        try:
+            response = self.get_response(request)
+        finally:
+            _estado.reset(token)
+        return self._marcar(request, response, estado)
+
+    async def __acall__(self, request):
+        estado = self._estado(request)
+        token = _estado.set(estado)
+        try:
+            response = await self.get_response(request)
+        finally:
+            _estado.reset(token)
+        return self._marcar(request, response, estado)
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        estado = _estado.get()
+        if estado is not None:
+            estado.view_na_replica = bool(bancos_replicas()) and view_le_da_replica(view_func)
+
+    def _estado(self, request):
+        try:
+            ate = float(request.COOKIES.get(cookie_primario(), 0))
+        except ValueError:
+            ate = 0
+        return EstadoRequisicao(primario=ate > time.time())
+
+    def _marcar(self, request, response, estado):
+        if bancos_replicas() and (estado.escreveu or request.method not in ('GET', 'HEAD', 'OPTIONS', 'TRACE')):
+            janela = janela_primario()
+            response.set_cookie(
+                cookie_primario(), f"{time.time() + janela:.3f}", max_age=janela,
+                httponly=True, samesite='Lax', secure=request.is_secure(),
+            )
+        return response
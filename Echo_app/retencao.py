@@ -0,0 +1,310 @@
+# Echo/Echo_app/retencao.py
+
+"""
+Ciclo de vida dos dados das tabelas que só crescem: Notificacao e
+InteracaoNoticia. Mantém os índices quentes (não lidas do usuário,
+interações recentes) do tamanho do que de fato é consultado.
+
+Retenção (`podar_notificacoes`): notificações LIDAS com mais de
+NOTIFICACOES_RETENCAO_DIAS dias são apagadas em lotes pequenos, cada um na
+sua transação, com uma pausa entre eles. Nenhum lock fica preso por mais
+que um lote e a replicação acompanha. As não lidas nunca são apagadas, e
+por isso o contador de não lidas dos perfis não muda.
+
+Arquivo (`arquivar_interacoes`): as curtidas e os salvamentos das notícias
+publicadas há mais de INTERACOES_ARQUIVO_DIAS dias saem de InteracaoNoticia.
+Os totais vão para ResumoInteracoes, uma linha por (notícia, tipo, mês),
+com a categoria da notícia: é o que `reconciliar_contadores` soma às vivas
+e o que o admin agrega por categoria e mês. O peso delas (já na escala da
+EPOCA) vai para HistoricoInteresse.pontuacao_arquivada, de onde
+`recalcular_interesses` parte, então contadores e recomendações não mudam.
+
+Quem interagiu fica em InteracaoArquivada, só (usuario, noticia, tipo,
+data), sem id nem os índices da tabela viva: a interação arquivada continua
+no estado do usuário (Echo_app/estado_interacoes.py), e alternar de novo
+passa por `desarquivar_interacao`, que a desfaz (e desconta do resumo), em
+vez de somar uma segunda.
+
+Os DELETEs do arquivo são por pk e não disparam os sinais de post_delete.
+É o que se quer aqui: nada a descontar de contador, ranking em alta nem
+pontuação.
+
+Particionamento (`criar_particoes`, só PostgreSQL, com PARTICIONAR_TABELAS):
+InteracaoNoticia e Notificacao particionadas por mês da data de criação.
+`--converter` refaz cada tabela como particionada, uma vez; depois o
+comando roda todo mês e cria as partições dos próximos meses. Toda
+restrição única de uma tabela particionada precisa incluir a chave de
+partição, então a chave primária vira (id, data) e as únicas viram
+(usuario, noticia, tipo, data) e (usuario, noticia, data). Elas deixam de
+impedir duplicatas sozinhas: `alternar_interacao` serializa os toggles com
+um advisory lock (Echo_app/contadores.py) e o envio de notificações já
+confere quem foi notificado antes de inserir (Echo_app/notificacoes.py).
+"""
+
+import time
+from collections import defaultdict
+from datetime import datetime, timedelta, timezone as dt_timezone
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import F, Value
+from django.db.models.functions import Greatest
+from django.utils import timezone
+
+from .estado_interacoes import invalidar_estado
+from .interesses import acumulador, peso_na_epoca, somar_pontuacoes
+from .models import InteracaoArquivada, InteracaoNoticia, Notificacao, ResumoInteracoes
+
+TAMANHO_LOTE = 1000  # Linhas por DELETE (e por transação)
+PAUSA = 0.05  # Segundos entre lotes
+
+
+def dias_retencao_notificacoes():
+    return getattr(settings, 'NOTIFICACOES_RETENCAO_DIAS', 90)
+
+
+def dias_arquivo_interacoes():
+    return getattr(settings, 'INTERACOES_ARQUIVO_DIAS', 365)
+
+
+def _apagar(modelo, ids):
+    """DELETE direto por pk, sem o Collector do ORM (e sem sinais)."""
+    tabela = connection.ops.quote_name(modelo._meta.db_table)
+    with connection.cursor() as cursor:
+        cursor.execute(f"DELETE FROM {tabela} WHERE id IN ({', '.join(['%s'] * len(ids))})", ids)
+
+
+# ===================== RETENÇÃO =====================
+
+def podar_notificacoes(dias=None, tamanho_lote=TAMANHO_LOTE, pausa=PAUSA, agora=None):
+    """Apaga as notificações lidas com mais de `dias` dias, em lotes. Retorna quantas apagou."""
+    corte = (agora or timezone.now()) - timedelta(days=dias_retencao_notificacoes() if dias is None else dias)
+    apagadas = 0
+    while True:
+        with transaction.atomic():
+            ids = list(
+                Notificacao.objects.filter(lida=True, data_criacao__lt=corte)
+                .order_by('data_criacao', 'id')  # notif_data_idx
+                .values_list('pk', flat=True)[:tamanho_lote]
+            )
+            if not ids:
+                break
+            _apagar(Notificacao, ids)
+        apagadas += len(ids)
+        if len(ids) < tamanho_lote:
+            break
+        time.sleep(pausa)
+    return apagadas
+
+
+# ===================== ARQUIVO =====================
+
+def mes_da_interacao(data):
+    """Primeiro dia do mês (no fuso do projeto) da interação: a linha dela em ResumoInteracoes."""
+    return timezone.localtime(data).date().replace(day=1)
+
+
+def _sql_resumo(linhas):
+    tabela = connection.ops.quote_name(ResumoInteracoes._meta.db_table)
+    return (
+        f"INSERT INTO {tabela} (noticia_id, categoria_id, tipo, mes, total) "
+        f"VALUES {', '.join(['(%s, %s, %s, %s, %s)'] * linhas)} "
+        f"ON CONFLICT (noticia_id, tipo, mes) DO UPDATE "
+        f"SET total = {tabela}.total + EXCLUDED.total, categoria_id = EXCLUDED.categoria_id"
+    )
+
+
+def _somar_resumo(totais):
+    """Soma {(noticia_id, categoria_id, tipo, mes): total} a ResumoInteracoes, num upsert."""
+    valores = [
+        valor
+        for (noticia_id, categoria_id, tipo, mes), total in totais.items()
+        for valor in (noticia_id, categoria_id, tipo, connection.ops.adapt_datefield_value(mes), total)
+    ]
+    with connection.cursor() as cursor:
+        cursor.execute(_sql_resumo(len(totais)), valores)
+
+
+def _arquivar_lote(ids):
+    with transaction.atomic():
+        # Relidas com lock: uma interação desfeita depois da leitura não é arquivada
+        interacoes = list(
+            InteracaoNoticia.objects.select_for_update(of=('self',))
+            .filter(pk__in=ids)
+            .values_list('pk', 'usuario_id', 'noticia_id', 'noticia__categoria_id', 'tipo', 'data_interacao')
+        )
+        if not interacoes:
+            return 0
+
+        pesos = defaultdict(float)
+        totais = defaultdict(int)
+        for _, usuario_id, noticia_id, categoria_id, tipo, data in interacoes:
+            if categoria_id is not None:
+                pesos[usuario_id, categoria_id] += peso_na_epoca(tipo, data)
+            totais[noticia_id, categoria_id, tipo, mes_da_interacao(data)] += 1
+
+        InteracaoArquivada.objects.bulk_create([
+            InteracaoArquivada(usuario_id=usuario_id, noticia_id=noticia_id, tipo=tipo, data_interacao=data)
+            for _, usuario_id, noticia_id, _, tipo, data in interacoes
+        ])
+        _somar_resumo(totais)
+        somar_pontuacoes(pesos, campo='pontuacao_arquivada')
+        _apagar(InteracaoNoticia, [interacao[0] for interacao in interacoes])
+        invalidar_estado(*{interacao[1] for interacao in interacoes})
+    return len(interacoes)
+
+
+def arquivar_interacoes(dias=None, tamanho_lote=TAMANHO_LOTE, pausa=PAUSA, agora=None):
+    """
+    Arquiva as curtidas e os salvamentos das notícias publicadas há mais de
+    `dias` dias, por faixas de id: cada lote grava as interações arquivadas,
+    o resumo e a pontuação arquivada e apaga as interações na mesma
+    transação. Retorna quantas arquivou.
+    """
+    corte = (agora or timezone.now()) - timedelta(days=dias_arquivo_interacoes() if dias is None else dias)
+    arquivadas = 0
+    ultimo_id = 0
+    while True:
+        ids = list(
+            InteracaoNoticia.objects.filter(pk__gt=ultimo_id, noticia__data_publicacao__lt=corte)
+            .order_by('pk')
+            .values_list('pk', flat=True)[:tamanho_lote]
+        )
+        if not ids:
+            break
+        ultimo_id = ids[-1]
+        arquivadas += _arquivar_lote(ids)
+        if len(ids) < tamanho_lote:
+            break
+        time.sleep(pausa)
+    return arquivadas
+
+
+def desarquivar_interacao(usuario_id, noticia_id, tipo):
+    """
+    Desfaz a interação arquivada do usuário na notícia, se houver: apaga a
+    linha, desconta do resumo do mês e desconta o peso dela da pontuação.
+    Retorna se havia interação. O contador da notícia fica com quem chama
+    (contadores.alternar_interacao).
+    """
+    interacao = InteracaoArquivada.objects.filter(usuario_id=usuario_id, noticia_id=noticia_id, tipo=tipo)
+    encontrada = interacao.values_list('data_interacao', 'noticia__categoria_id').first()
+    if encontrada is None or not interacao.delete()[0]:  # Sem interação, ou outra requisição desfez antes
+        return False
+
+    data, categoria_id = encontrada
+    ResumoInteracoes.objects.filter(noticia_id=noticia_id, tipo=tipo, mes=mes_da_interacao(data)).update(
+        total=Greatest(F('total') - 1, Value(0))
+    )
+    delta = -peso_na_epoca(tipo, data)
+    if categoria_id is not None:
+        somar_pontuacoes({(usuario_id, categoria_id): delta}, campo='pontuacao_arquivada')
+    # `pontuacao` também tinha o peso: sai pelo mesmo caminho de uma interação desfeita
+    transaction.on_commit(lambda: acumulador.adicionar(usuario_id, noticia_id, delta))
+    return True
+
+
+# ===================== PARTICIONAMENTO =====================
+
+# Modelo -> (chave de partição, colunas da restrição única sem a chave, condição da única)
+TABELAS_PARTICIONADAS = {
+    InteracaoNoticia: ('data_interacao', ['usuario_id', 'noticia_id', 'tipo'], None),
+    Notificacao: ('data_criacao', ['usuario_id', 'noticia_id'], 'noticia_id IS NOT NULL'),
+}
+MESES_A_FRENTE = 3  # Partições criadas além do mês atual
+
+
+def particionamento_ativo():
+    return connection.vendor == 'postgresql' and getattr(settings, 'PARTICIONAR_TABELAS', False)
+
+
+def _inicio_do_mes(ano, mes):
+    return datetime(ano + (mes - 1) // 12, (mes - 1) % 12 + 1, 1, tzinfo=dt_timezone.utc)
+
+
+def faixas_mensais(inicio, fim):
+    """[(sufixo, de, até)] dos meses (em UTC) de `inicio` até `fim`, inclusive."""
+    faixas = []
+    ano, mes = inicio.year, inicio.month
+    while (ano, mes) <= (fim.year, fim.month):
+        faixas.append((f"p{ano}{mes:02d}", _inicio_do_mes(ano, mes), _inicio_do_mes(ano, mes + 1)))
+        ano, mes = (ano + 1, 1) if mes == 12 else (ano, mes + 1)
+    return faixas
+
+
+def _particionada(cursor, tabela):
+    cursor.execute(
+        "SELECT 1 FROM pg_partitioned_table WHERE partrelid = to_regclass(%s)", [tabela]
+    )
+    return cursor.fetchone() is not None
+
+
+def _criar_particoes_da_tabela(cursor, tabela, inicio, fim):
+    criadas = 0
+    for sufixo, de, ate in faixas_mensais(inicio, fim):
+        particao = connection.ops.quote_name(f"{tabela}_{sufixo}")
+        cursor.execute("SELECT to_regclass(%s) IS NULL", [f"{tabela}_{sufixo}"])
+        if cursor.fetchone()[0]:
+            cursor.execute(
+                f"CREATE TABLE {particao} PARTITION OF {connection.ops.quote_name(tabela)} "
+                f"FOR VALUES FROM ('{de.isoformat()}') TO ('{ate.isoformat()}')"
+            )
+            criadas += 1
+    return criadas
+
+
+def _converter(modelo, agora, meses):
+    """Refaz a tabela do modelo como particionada por mês, copiando as linhas (com lock exclusivo)."""
+    coluna, unicos, condicao = TABELAS_PARTICIONADAS[modelo]
+    tabela = modelo._meta.db_table
+    antiga = f"{tabela}_antiga"
+    q = connection.ops.quote_name
+    with transaction.atomic(), connection.schema_editor(atomic=False) as editor, connection.cursor() as cursor:
+        cursor.execute(f"LOCK TABLE {q(tabela)} IN ACCESS EXCLUSIVE MODE")
+        cursor.execute(f"SELECT MIN({q(coluna)}), COALESCE(MAX(id), 0) FROM {q(tabela)}")
+        primeira, maior_id = cursor.fetchone()
+        cursor.execute(f"ALTER TABLE {q(tabela)} RENAME TO {q(antiga)}")
+
+        sequencia = f"{tabela}_particionada_id_seq"
+        cursor.execute(f"CREATE TABLE {q(tabela)} (LIKE {q(antiga)} INCLUDING DEFAULTS) PARTITION BY RANGE ({q(coluna)})")
+        cursor.execute(f"CREATE SEQUENCE {q(sequencia)} OWNED BY {q(tabela)}.id START WITH {maior_id + 1}")
+        cursor.execute(f"ALTER TABLE {q(tabela)} ALTER COLUMN id SET DEFAULT nextval('{sequencia}')")
+        cursor.execute(f"ALTER TABLE {q(tabela)} ADD PRIMARY KEY (id, {q(coluna)})")
+        cursor.execute(
+            f"CREATE UNIQUE INDEX {q(f'{tabela}_unica_particao')} ON {q(tabela)} "
+            f"({', '.join(q(campo) for campo in [*unicos, coluna])})"
+            + (f" WHERE {condicao}" if condicao else "")
+        )
+        _criar_particoes_da_tabela(cursor, tabela, primeira or agora, agora + timedelta(days=31 * meses))
+        cursor.execute(f"CREATE TABLE {q(f'{tabela}_padrao')} PARTITION OF {q(tabela)} DEFAULT")  # Fora das faixas: não falha o INSERT
+
+        cursor.execute(f"INSERT INTO {q(tabela)} SELECT * FROM {q(antiga)}")
+        cursor.execute(f"DROP TABLE {q(antiga)}")  # Leva os índices e FKs antigos: os nomes ficam livres
+
+        for sql in editor._model_indexes_sql(modelo):
+            editor.execute(sql)
+        for campo in modelo._meta.local_fields:
+            if campo.remote_field and campo.db_constraint:
+                editor.execute(editor._create_fk_sql(modelo, campo, "_fk_%(to_table)s_%(to_column)s"))
+
+
+def criar_particoes(meses=MESES_A_FRENTE, converter=False, agora=None):
+    """
+    Cria as partições mensais que faltam até `meses` meses à frente, em
+    InteracaoNoticia e Notificacao. Com `converter`, refaz como
+    particionadas as tabelas que ainda não são. Retorna {tabela: partições
+    criadas}; tabelas não particionadas ficam de fora.
+    """
+    agora = agora or timezone.now()
+    criadas = {}
+    for modelo in TABELAS_PARTICIONADAS:
+        tabela = modelo._meta.db_table
+        with connection.cursor() as cursor:
+            particionada = _particionada(cursor, tabela)
+        if not particionada and converter:
+            _converter(modelo, agora, meses)
+            particionada = True
+        if particionada:
+            with transaction.atomic(), connection.cursor() as cursor:
+                criadas[tabela] = _criar_particoes_da_tabela(cursor, tabela, agora, agora + timedelta(days=31 * meses))
+    return criadas
@@ -0,0 +1,227 @@
+# Echo/Echo_app/sessoes.py
+
+"""
+Backend de sessões (SESSION_ENGINE = 'Echo_app.sessoes').
+
+É o backend de banco do Django (django_session), com menos I/O:
+
+- cache de leitura local, por processo, só para sessões ANÔNIMAS: a
+  sessão lida do banco fica em memória por SESSOES_CACHE_SEGUNDOS, então
+  rajadas de requisições de um visitante não fazem um SELECT cada. Sessões
+  com usuário logado são sempre lidas do banco: o cache de um processo não
+  vê o logout, o flush() ou o cycle_key() feitos em outro, e a sessão
+  antiga continuaria valendo aqui. Uma sessão anônima servida do cache e
+  modificada é relida do banco antes de gravar, e as mudanças desta
+  requisição são aplicadas sobre o que outro processo tenha gravado;
+- escrita só do que mudou: save() compara os dados com os que foram lidos
+  e não escreve se são iguais (um `request.session[...] = mesmo valor`
+  marca a sessão como modificada). Com SESSION_SAVE_EVERY_REQUEST, a
+  validade no banco só é renovada quando está SESSOES_RENOVACAO mais velha
+  que a nova;
+- login com uma escrita: cycle_key() não grava a chave nova vazia para
+  depois atualizá-la; a linha é inserida já com os dados no save() do fim
+  da requisição (colisão de chave vira CreateError e outra chave);
+- limpeza das expiradas (`clearsessions`) em lotes de LOTE_EXPIRADAS, cada
+  um na sua transação, sem um DELETE gigante segurando a tabela.
+"""
+
+import threading
+import time
+from collections import OrderedDict
+from datetime import timedelta
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.contrib.auth import SESSION_KEY
+from django.contrib.sessions.backends.base import VALID_KEY_CHARS, CreateError
+from django.contrib.sessions.backends.db import SessionStore as DBStore
+from django.utils import timezone
+from django.utils.crypto import get_random_string
+
+LOTE_EXPIRADAS = 5000  # Sessões expiradas apagadas por DELETE
+MAXIMO_EM_CACHE = 10000  # Sessões guardadas no cache local, por processo
+
+
+def _segundos_em_cache():
+    return getattr(settings, 'SESSOES_CACHE_SEGUNDOS', 5)
+
+
+def _renovacao():
+    return timedelta(seconds=getattr(settings, 'SESSOES_RENOVACAO', 24 * 3600))
+
+
+class _CacheLocal:
+    """Sessões anônimas lidas recentemente: chave -> (prazo no cache, dados serializados, validade no banco)."""
+
+    def __init__(self):
+        self._trava = threading.Lock()
+        self._sessoes = OrderedDict()
+
+    def obter(self, chave):
+        with self._trava:
+            entrada = self._sessoes.get(chave)
+            if entrada is None:
+                return None
+            prazo, dados, validade = entrada
+            if prazo < time.monotonic() or validade <= timezone.now():
+                del self._sessoes[chave]
+                return None
+            return dados, validade
+
+    def guardar(self, chave, dados, validade):
+        segundos = _segundos_em_cache()
+        if segundos <= 0:
+            return
+        with self._trava:
+            self._sessoes[chave] = (time.monotonic() + segundos, dados, validade)
+            self._sessoes.move_to_end(chave)
+            while len(self._sessoes) > MAXIMO_EM_CACHE:
+                self._sessoes.popitem(last=False)  # A mais antiga
+
+    def remover(self, chave):
+        with self._trava:
+            self._sessoes.pop(chave, None)
+
+    def limpar(self):
+        with self._trava:
+            self._sessoes.clear()
+
+
+cache_local = _CacheLocal()
+
+
+class SessionStore(DBStore):
+
+    def __init__(self, session_key=None):
+        super().__init__(session_key)
+        self._lida = None  # (dados serializados, validade) como estão no banco
+        self._do_cache_local = False  # A leitura veio de cache_local, não do banco
+        self._criar_ao_salvar = False
+
+    def _serializar(self, dados):
+        return self.serializer().dumps(dados)
+
+    def _guardar_no_cache(self, dados):
+        if SESSION_KEY in dados:  # Logada: ver docstring do módulo
+            cache_local.remover(self.session_key)
+        else:
+            cache_local.guardar(self.session_key, *self._lida)
+
+    def load(self):
+        chave = self.session_key
+        self._lida = cache_local.obter(chave) if chave else None
+        self._do_cache_local = self._lida is not None
+        if self._lida is not None:
+            return self.serializer().loads(self._lida[0])  # Já verificada ao sair do banco
+
+        sessao = self._get_session_from_db()
+        if sessao is None:
+            return {}
+        dados = self.decode(sessao.session_data)
+        self._lida = (self._serializar(dados), sessao.expire_date)
+        self._guardar_no_cache(dados)
+        return dados
+
+    def _sobre_o_banco(self, dados):
+        """As mudanças desta requisição (em relação à cópia do cache) aplicadas sobre a sessão como está no banco."""
+        lidos = self.serializer().loads(self._lida[0])
+        sessao = self._get_session_from_db()
+        atuais = self.decode(sessao.session_data) if sessao else {}
+        for chave in lidos.keys() - dados.keys():
+            atuais.pop(chave, None)
+        atuais.update({chave: valor for chave, valor in dados.items() if chave not in lidos or lidos[chave] != valor})
+        self._session_cache = atuais
+        self._do_cache_local = False
+        return atuais
+
+    def _inalterada(self, dados):
+        if self._lida is None:
+            return False
+        serializados, validade = self._lida
+        return serializados == self._serializar(dados) and validade >= self.get_expiry_date() - _renovacao()
+
+    def save(self, must_create=False):
+        if self.session_key is None:
+            return self.create()
+        dados = self._get_session(no_load=must_create or self._criar_ao_salvar)
+        if not (must_create or self._criar_ao_salvar) and self._inalterada(dados):
+            return  # Nada a escrever
+        if self._do_cache_local and not (must_create or self._criar_ao_salvar):
+            cache_local.remover(self.session_key)  # Outro processo pode ter gravado depois da cópia
+            dados = self._sobre_o_banco(dados)
+
+        if self._criar_ao_salvar:
+            while True:
+                try:
+                    super().save(must_create=True)
+                except CreateError:
+                    self._session_key = self._nova_chave()  # Colisão: tenta outra chave
+                    continue
+                break
+            self._criar_ao_salvar = False
+        else:
+            super().save(must_create=must_create)
+
+        self._lida = (self._serializar(dados), self.get_expiry_date())
+        self._guardar_no_cache(dados)
+
+    def _nova_chave(self):
+        # Sem o SELECT de existência: a chave é aleatória e o INSERT acusa colisão
+        return get_random_string(32, VALID_KEY_CHARS)
+
+    def cycle_key(self):
+        dados = self._session
+        chave = self.session_key
+        self._session_key = self._nova_chave()
+        self._criar_ao_salvar = True  # Inserida com os dados no save() da resposta
+        self._session_cache = dados
+        self._lida = None
+        self._do_cache_local = False
+        self.modified = True
+        if chave:
+            self.delete(chave)
+
+    def delete(self, session_key=None):
+        if session_key is None:
+            if self.session_key is None:
+                return
+            session_key = self.session_key
+        cache_local.remover(session_key)
+        if session_key == self.session_key and self._criar_ao_salvar:
+            self._criar_ao_salvar = False  # Ainda não está no banco
+            return
+        self.model.objects.filter(session_key=session_key).delete()  # Um DELETE, sem SELECT antes
+
+    @classmethod
+    def clear_expired(cls, tamanho_lote=LOTE_EXPIRADAS):
+        """Apaga as sessões expiradas em lotes. Retorna quantas apagou."""
+        modelo = cls.get_model_class()
+        agora = timezone.now()
+        apagadas = 0
+        while True:
+            chaves = list(
+                modelo.objects.filter(expire_date__lt=agora).values_list('session_key', flat=True)[:tamanho_lote]
+            )
+            if not chaves:
+                break
+            apagadas += modelo.objects.filter(session_key__in=chaves).delete()[0]
+        return apagadas
+
+    # Versões assíncronas: a mesma lógica, na thread de banco da requisição
+
+    async def aload(self):
+        return await sync_to_async(self.load)()
+
+    async def asave(self, must_create=False):
+        return await sync_to_async(self.save)(must_create)
+
+    async def acycle_key(self):
+        await self._aget_session()
+        return await sync_to_async(self.cycle_key)()
+
+    async def adelete(self, session_key=None):
+        return await sync_to_async(self.delete)(session_key)
+
+    @classmethod
+    async def aclear_expired(cls):
+        return await sync_to_async(cls.clear_expired)()
@@ -0,0 +1,197 @@
+# Echo/Echo_app/similaridade.py
+
+"""
+Recomendações item-item (filtragem colaborativa), calculadas offline.
+
+O comando `calcular_similares` roda de madrugada:
+
+1. lê InteracaoNoticia por faixas de id (TAMANHO_LOTE por consulta), só das
+   notícias publicadas nos últimos `dias`, montando três vetores NumPy
+   (usuário, notícia, peso); o peso é o mesmo de Echo_app/interesses.py;
+2. monta a matriz esparsa usuário x notícia (scipy.sparse, CSR) e normaliza
+   as colunas, de modo que o produto de duas colunas seja o cosseno;
+3. calcula a similaridade em blocos de BLOCO notícias (Xᵀ·X restrito ao
+   bloco), descarta pares com menos de MINIMO_EM_COMUM usuários em comum
+   (ruído) e guarda as K vizinhas de cada notícia;
+4. troca o conteúdo de NoticiaSimilar por lotes de notícias, cada um numa
+   transação curta (nada de uma transação aberta durante o cálculo): quem
+   lê vê, para cada notícia, as vizinhas antigas ou as novas.
+
+Noticia.recomendar_para mistura essas vizinhas ao feed, com uma consulta
+pelo índice (noticia, -pontuacao, similar).
+
+Memória: ~20 bytes por interação lida, mais um bloco de similaridades.
+Para medir sem banco, `calcular_similares --benchmark N` gera N interações
+sintéticas (popularidade com cauda longa) e cronometra as etapas 2 e 3.
+"""
+
+import time
+from datetime import timedelta
+
+import numpy as np
+from scipy import sparse
+
+from django.db import transaction
+from django.utils import timezone
+
+from .interesses import PESOS
+from .models import InteracaoNoticia, NoticiaSimilar
+
+K = 20  # Vizinhas guardadas por notícia
+MINIMO_EM_COMUM = 2  # Usuários em comum para o par contar
+TAMANHO_LOTE = 100000  # Interações por consulta na leitura
+BLOCO = 500  # Notícias por bloco no produto Xᵀ·X
+LOTE_GRAVACAO = 5000  # Pares por transação na troca
+
+_PESOS = np.array(list(PESOS.values()), dtype=np.float32)
+
+
+def ler_interacoes(desde=None, tamanho_lote=TAMANHO_LOTE):
+    """
+    Lê as interações (das notícias publicadas a partir de `desde`) por
+    faixas de id. Retorna (usuarios, noticias, pesos) como vetores NumPy.
+    """
+    consulta = InteracaoNoticia.objects.all()
+    if desde is not None:
+        consulta = consulta.filter(noticia__data_publicacao__gte=desde)
+
+    usuarios, noticias, pesos = [], [], []
+    ultimo_id = 0
+    while True:
+        lote = list(
+            consulta.filter(pk__gt=ultimo_id).order_by('pk')
+            .values_list('pk', 'usuario_id', 'noticia_id', 'tipo')[:tamanho_lote]
+        )
+        if not lote:
+            break
+        ultimo_id = lote[-1][0]
+        _, lote_usuarios, lote_noticias, lote_tipos = zip(*lote)
+        usuarios.append(np.array(lote_usuarios, dtype=np.int64))
+        noticias.append(np.array(lote_noticias, dtype=np.int64))
+        pesos.append(np.array([PESOS[tipo] for tipo in lote_tipos], dtype=np.float32))
+
+    if not usuarios:
+        vazio = np.empty(0, dtype=np.int64)
+        return vazio, vazio, np.empty(0, dtype=np.float32)
+    return np.concatenate(usuarios), np.concatenate(noticias), np.concatenate(pesos)
+
+
+def matriz_usuario_noticia(usuarios, noticias, pesos):
+    """Matriz esparsa usuário x notícia (pesos somados) e os ids de cada coluna."""
+    ids_usuarios, linhas = np.unique(usuarios, return_inverse=True)
+    ids_noticias, colunas = np.unique(noticias, return_inverse=True)
+    matriz = sparse.csr_matrix(
+        (pesos, (linhas, colunas)), shape=(len(ids_usuarios), len(ids_noticias)), dtype=np.float32
+    )  # Curtir e salvar a mesma notícia somam
+    return matriz, ids_noticias
+
+
+def vizinhas(matriz, ids_noticias, k=K, minimo_em_comum=MINIMO_EM_COMUM, bloco=BLOCO):
+    """
+    Gera (noticia_id, ids das vizinhas, similaridades), da mais parecida
+    para a menos, calculando o cosseno entre colunas bloco a bloco.
+    """
+    normas = np.sqrt(np.asarray(matriz.multiply(matriz).sum(axis=0))).ravel()
+    normas[normas == 0] = 1
+    normalizada = (matriz @ sparse.diags(1 / normas)).tocsc()
+    transposta = normalizada.T.tocsr()
+
+    presenca = matriz.copy()
+    presenca.data[:] = 1  # Quem interagiu, sem peso: conta usuários em comum
+    presenca = presenca.tocsc()
+    presenca_transposta = presenca.T.tocsr()
+
+    for inicio in range(0, matriz.shape[1], bloco):
+        fim = min(inicio + bloco, matriz.shape[1])
+        similaridades = (transposta[inicio:fim] @ normalizada).tocsr()
+        if minimo_em_comum > 1:
+            em_comum = presenca_transposta[inicio:fim] @ presenca
+            similaridades = similaridades.multiply(em_comum >= minimo_em_comum).tocsr()
+        similaridades.setdiag(0, k=inicio)  # A própria notícia
+        similaridades.eliminate_zeros()
+
+        indptr, indices, dados = similaridades.indptr, similaridades.indices, similaridades.data
+        for linha in range(fim - inicio):
+            colunas = indices[indptr[linha]:indptr[linha + 1]]
+            valores = dados[indptr[linha]:indptr[linha + 1]]
+            if not len(valores):
+                continue
+            if len(valores) > k:
+                escolhidas = np.argpartition(-valores, k)[:k]
+                colunas, valores = colunas[escolhidas], valores[escolhidas]
+            ordem = np.argsort(-valores, kind='stable')
+            yield int(ids_noticias[inicio + linha]), ids_noticias[colunas[ordem]], valores[ordem]
+
+
+def _lotes_de_noticias(calculadas, tamanho_lote):
+    """Agrupa as notícias em lotes de até `tamanho_lote` pares (uma notícia nunca fica dividida)."""
+    grupo, pares = [], 0
+    for noticia in calculadas:
+        if grupo and pares + len(noticia[1]) > tamanho_lote:
+            yield grupo, pares
+            grupo, pares = [], 0
+        grupo.append(noticia)
+        pares += len(noticia[1])
+    if grupo:
+        yield grupo, pares
+
+
+def gravar(resultados, tamanho_lote=LOTE_GRAVACAO):
+    """
+    Substitui o conteúdo de NoticiaSimilar. Todo o cálculo acontece antes da
+    primeira escrita (K vizinhas por notícia cabem em memória); depois cada
+    lote de notícias troca as suas vizinhas numa transação curta, e as
+    notícias que saíram do cálculo perdem as suas. Retorna quantos pares gravou.
+    """
+    calculadas = list(resultados)
+    antigas = set(NoticiaSimilar.objects.values_list('noticia_id', flat=True).distinct())
+
+    total = 0
+    for grupo, pares in _lotes_de_noticias(calculadas, tamanho_lote):
+        with transaction.atomic():  # Quem lê vê as vizinhas antigas da notícia ou as novas, nunca a mistura
+            NoticiaSimilar.objects.filter(noticia_id__in=[noticia_id for noticia_id, _, _ in grupo]).delete()
+            NoticiaSimilar.objects.bulk_create([
+                NoticiaSimilar(noticia_id=noticia_id, similar_id=int(similar), pontuacao=float(valor))
+                for noticia_id, similares, valores in grupo
+                for similar, valor in zip(similares, valores)
+            ])
+        total += pares
+
+    obsoletas = sorted(antigas - {noticia_id for noticia_id, _, _ in calculadas})
+    for primeira in range(0, len(obsoletas), tamanho_lote):
+        NoticiaSimilar.objects.filter(noticia_id__in=obsoletas[primeira:primeira + tamanho_lote]).delete()
+    return total
+
+
+def calcular_similares(dias=30, k=K, minimo_em_comum=MINIMO_EM_COMUM, tamanho_lote=TAMANHO_LOTE, bloco=BLOCO):
+    """Recalcula NoticiaSimilar a partir das interações. Retorna estatísticas da rodada."""
+    desde = timezone.now() - timedelta(days=dias) if dias else None
+    tempos = {}
+
+    inicio = time.perf_counter()
+    usuarios, noticias, pesos = ler_interacoes(desde, tamanho_lote)
+    tempos['leitura'] = time.perf_counter() - inicio
+
+    inicio = time.perf_counter()
+    matriz, ids_noticias = matriz_usuario_noticia(usuarios, noticias, pesos)
+    tempos['matriz'] = time.perf_counter() - inicio
+
+    inicio = time.perf_counter()
+    pares = gravar(vizinhas(matriz, ids_noticias, k, minimo_em_comum, bloco))
+    tempos['similaridade_e_gravacao'] = time.perf_counter() - inicio
+
+    return {'interacoes': len(usuarios), 'noticias': len(ids_noticias), 'pares': pares, 'tempos': tempos}
+
+
+def interacoes_sinteticas(total, usuarios=None, noticias=None, semente=0):
+    """
+    Interações aleatórias para o benchmark: popularidade das notícias com
+    cauda longa (Zipf), como num portal de notícias real.
+    """
+    gerador = np.random.default_rng(semente)
+    usuarios = usuarios or max(total // 20, 1)
+    noticias = noticias or max(total // 200, 1)
+    ids_noticias = (gerador.zipf(1.3, size=total) - 1) % noticias
+    ids_usuarios = gerador.integers(0, usuarios, size=total)
+    pesos = _PESOS[gerador.integers(0, len(_PESOS), size=total)]
+    return ids_usuarios, ids_noticias, pesos
@@ -0,0 +1,37 @@
+from django import template
+from django.utils.html import format_html
+
+from Echo_app.imagens import agendar_variantes, srcset, variantes_atualizadas
+
+register = template.Library()
+
+
+@register.simple_tag
+def imagem_responsiva(instancia, campo, sizes, alt='', css_class='', carregamento='lazy'):
+    """
+    Renderiza uma imagem com variantes WebP/JPEG via <picture> e srcset.
+
+    Uso: {% imagem_responsiva noticia 'imagem' '(max-width: 768px) 100vw, 640px' alt=noticia.titulo %}
+
+    Se as variantes ainda não existem (imagem antiga), agenda a geração e
+    usa o arquivo original.
+    """
+    arquivo = getattr(instancia, campo)
+    if not arquivo:
+        return ''
+
+    if not variantes_atualizadas(instancia, campo):
+        agendar_variantes(instancia, campo)
+        return format_html(
+            '<img src="{}" alt="{}" class="{}" loading="{}" decoding="async">',
+            arquivo.url, alt, css_class, carregamento,
+        )
+
+    return format_html(
+        '<picture>'
+        '<source type="image/webp" srcset="{}" sizes="{}">'
+        '<img src="{}" srcset="{}" sizes="{}" alt="{}" class="{}" loading="{}" decoding="async">'
+        '</picture>',
+        srcset(instancia, campo, 'webp'), sizes,
+        arquivo.url, srcset(instancia, campo, 'jpeg'), sizes, alt, css_class, carregamento,
+    )
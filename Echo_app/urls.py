@@ -18,4 +18,15 @@ urlpatterns = [
     path('noticia/<int:pk>/', NoticiaDetalheView.as_view(), name='noticia_detalhe'),
     path('noticia/<int:noticia_id>/curtir/', views.curtir_noticia, name='noticia_curtir'),
     path('noticia/<int:noticia_id>/salvar/', views.salvar_noticia, name='noticia_salvar'),
+
+    path('buscar/', views.buscar_noticias, name='buscar'),
+
+    path('feed/categoria/<int:categoria_id>/', views.feed_noticias, {'fonte': 'categoria'}, name='feed_categoria'),
+    path('feed/<slug:fonte>/', views.feed_noticias, name='feed'),
+
+    path('notificacoes/', views.lista_notificacoes, name='lista_notificacoes'),
+    path('notificacoes/<int:notificacao_id>/lida/', views.marcar_notificacao_lida, name='marcar_notificacao_lida'),
+    path('notificacoes/lidas/', views.marcar_notificacoes_lidas, name='marcar_notificacoes_lidas'),
+    path('notificacoes/todas-lidas/', views.marcar_todas_lidas, name='marcar_todas_lidas'),
+    path('notificacoes/eventos/', views.eventos_notificacoes, name='eventos_notificacoes'),
 ]
\ No newline at end of file
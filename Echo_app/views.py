@@ -6,14 +6,29 @@ from django.contrib.auth import login, authenticate, logout
 
 from django.contrib.auth.decorators import login_required
 from django.contrib.auth import get_user_model
-from django.views.generic import DetailView
+from django.views import View
 from django.views.decorators.http import require_POST
-from django.http import JsonResponse, HttpResponseBadRequest, HttpResponseForbidden
+from django.utils.cache import get_conditional_response, patch_cache_control, patch_vary_headers
+from django.utils.http import http_date, quote_etag
+from asgiref.sync import sync_to_async
+from django.http import JsonResponse, HttpResponse, HttpResponseBadRequest, HttpResponseForbidden, Http404, StreamingHttpResponse
+from django.core.handlers.asgi import ASGIRequest
 from django.db import IntegrityError 
+from django.urls import reverse
 
 # Importe os modelos da sua aplicação
 # ASSUMINDO que você tem um modelo Categoria em .models
-from .models import Noticia, InteracaoNoticia, Notificacao, PerfilUsuario, Categoria
+from .models import Noticia, Notificacao, PerfilUsuario, Categoria
+from .cadastro import CadastroDuplicado, cadastrar, categorias_do_formulario
+from .contadores import alternar_interacao
+from .estado_interacoes import anotar_interacoes, estado_interacoes, versao_do_estado
+from .orcamento import orcamento_consultas
+from .replicas import le_da_replica
+from .busca import buscar
+from .concorrencia import em_paralelo
+from .eventos import fluxo
+from .notificacoes import marcar_lidas, nao_lidas
+from .paginacao import NOTICIAS_POR_PAGINA, codificar_cursor, fonte_categoria, fonte_recomendadas, fonte_urgentes, pagina
 
 User = get_user_model()
 
@@ -24,6 +39,7 @@ User = get_user_model()
 
 # Em Echo/Echo_app/views.py
 
+@orcamento_consultas(20)
 def registrar(request):
     """
     Renderiza a página de registro e processa a criação de um novo usuário
@@ -31,10 +47,8 @@ def registrar(request):
     """
     contexto = {'erros': [], 'dados_preenchidos': {}} 
     
-    try:
-        contexto['todas_categorias'] = Categoria.objects.all()
-    except:
-        contexto['todas_categorias'] = []
+    # Lista cacheada (ver Echo_app/cadastro.py): nem o GET nem um POST com erro consultam o banco
+    contexto['todas_categorias'] = categorias_do_formulario()
     
     if request.method == "POST":
         # 2. Obter dados crus do POST
@@ -59,36 +73,29 @@ def registrar(request):
         if password != password_confirm:
             contexto['erros'].append('As senhas não coincidem.')
         
-        # A geração automática de username foi removida.
-        # Agora, se o username já existe, apenas informamos o erro.
-        if username and User.objects.filter(username__iexact=username).exists(): # <-- MUDANÇA
-            contexto['erros'].append('Este nome de usuário já está em uso. Por favor, escolha outro.')
-        
-        if email and User.objects.filter(email__iexact=email).exists():
-            contexto['erros'].append('Este e-mail já está cadastrado.')
+        # Nome de usuário e e-mail repetidos não são consultados antes: os
+        # índices únicos do banco recusam o INSERT (ver Echo_app/cadastro.py)
 
         # 5. Se não houver erros, criar o usuário
         if not contexto['erros']:
+            # Só ids da lista do formulário; `cadastrar` ainda confere no banco
+            categoria_ids = [c.pk for c in contexto['todas_categorias'] if str(c.pk) in categorias_selecionadas_ids]
             try:
-                user = User.objects.create_user(
-                    username=username, # <-- MUDANÇA: Usando o username do formulário
-                    email=email,
-                    password=password
-                    # NOTA: O campo 'first_name' não está mais sendo salvo aqui.
-                    # Se você quiser salvar o "Nome completo" também,
-                    # precisará adicionar um novo campo no registrar.html
-                )
-                
-                # 6. Salvar as categorias no PerfilUsuario
-                if categorias_selecionadas_ids:
-                    categorias = Categoria.objects.filter(pk__in=categorias_selecionadas_ids)
-                    perfil, created = PerfilUsuario.objects.get_or_create(usuario=user)
-                    perfil.categorias_de_interesse.set(categorias)
+                # 6. Usuário, perfil e categorias numa única transação
+                user = cadastrar(username, email, password, categoria_ids)
+                # NOTA: O campo 'first_name' não está mais sendo salvo aqui.
+                # Se você quiser salvar o "Nome completo" também,
+                # precisará adicionar um novo campo no registrar.html
                 
                 # 7. Logar o usuário automaticamente
                 login(request, user)
                 return redirect("dashboard")
                 
+            except CadastroDuplicado as duplicado:
+                if duplicado.username_em_uso:
+                    contexto['erros'].append('Este nome de usuário já está em uso. Por favor, escolha outro.')
+                if duplicado.email_em_uso:
+                    contexto['erros'].append('Este e-mail já está cadastrado.')
             except IntegrityError:
                 contexto['erros'].append('Erro ao criar usuário. Tente novamente.')
             except Exception as e:
@@ -101,6 +108,7 @@ def registrar(request):
 
 # Em Echo/Echo_app/views.py
 
+@orcamento_consultas(10)
 def entrar(request):
     """
     Renderiza a página de login e processa a autenticação do usuário.
@@ -141,6 +149,7 @@ def entrar(request):
     # Se for GET ou se a autenticação falhar, renderiza a página
     return render(request, "Echo_app/entrar.html", contexto)
 
+@orcamento_consultas(4)
 def sair(request):
     """
     Desloga o usuário e o redireciona para a página de login.
@@ -155,6 +164,16 @@ def sair(request):
 # Parte do Dashboard (Fialho)
 # ===============================================
 
+async def _usuario_da_requisicao(request):
+    """
+    Usuário da requisição numa view assíncrona. Também guarda em
+    request.user, que o template (context processor) lê de forma síncrona e
+    que, senão, repetiria a consulta do usuário.
+    """
+    request.user = await request.auser()
+    return request.user
+
+
 @login_required
 def dashboard(request):
     """
@@ -188,33 +207,75 @@ def dashboard(request):
 # Parte de Notícias e Interações (Teteu)
 # ===============================================
 
-class NoticiaDetalheView(DetailView):
+def _etag_noticia(pk, versao, usuario):
+    atualizado_em, versao_noticia, versao_categoria = versao
+    # A página de quem está logado traz estado pessoal (curtiu/salvou, menu)
+    leitor = usuario.pk if usuario.is_authenticated else 'anonimo'
+    return quote_etag(f"{pk}-{versao_noticia}-{versao_categoria or 0}-{atualizado_em.timestamp()}-{leitor}")
+
+
+def _cabecalhos_cache_noticia(response, usuario):
     """
-    Exibe os detalhes de uma única notícia.
+    Cache-Control/Vary da página de notícia, inclusive nas respostas 304.
+    Anônimos: cacheável pela CDN. Logados: só no navegador, revalidando
+    sempre com o ETag.
     """
-    model = Noticia
-    template_name = 'Echo_app/noticia_detalhe.html'
-    context_object_name = 'noticia'
+    if usuario.is_authenticated:
+        patch_cache_control(response, private=True, no_cache=True)
+    else:
+        patch_cache_control(response, public=True, max_age=60, s_maxage=300)
+    patch_vary_headers(response, ('Cookie',))
+    return response
 
-    def get_context_data(self, **kwargs):
-        context = super().get_context_data(**kwargs)
-        noticia = context['noticia']
-        
-        context['usuario_curtiu'] = False
-        context['usuario_salvou'] = False
 
-        if self.request.user.is_authenticated:
-            usuario = self.request.user
-            
-            context['usuario_curtiu'] = InteracaoNoticia.objects.filter(
-                usuario=usuario, noticia=noticia, tipo='CURTIDA'
-            ).exists()
-            
-            context['usuario_salvou'] = InteracaoNoticia.objects.filter(
-                usuario=usuario, noticia=noticia, tipo='SALVAMENTO'
-            ).exists()
+@orcamento_consultas(7)
+@le_da_replica
+class NoticiaDetalheView(View):
+    """
+    Exibe os detalhes de uma única notícia (view assíncrona).
 
-        return context
+    Responde 304 a If-None-Match/If-Modified-Since consultando só a versão
+    da notícia. Senão, busca a notícia e o estado de curtida/salvamento do
+    usuário (Echo_app/estado_interacoes.py) ao mesmo tempo (ver
+    Echo_app/concorrencia.py).
+    """
+    template_name = 'Echo_app/noticia_detalhe.html'
+
+    async def get(self, request, pk):
+        usuario = await _usuario_da_requisicao(request)
+
+        # (atualizado_em, versao, versao da categoria): uma consulta leve
+        versao = await Noticia.objects.filter(pk=pk).values_list(
+            'atualizado_em', 'versao', 'categoria__versao'
+        ).afirst()
+        if versao is None:
+            raise Http404("Notícia não encontrada.")
+
+        etag = _etag_noticia(pk, versao, usuario)
+        ultima_modificacao = int(versao[0].timestamp())
+        response = get_conditional_response(request, etag=etag, last_modified=ultima_modificacao)
+        if response is None:
+            response = await self._renderizar(request, pk, usuario)
+        response.headers.setdefault('ETag', etag)
+        response.headers.setdefault('Last-Modified', http_date(ultima_modificacao))
+        return _cabecalhos_cache_noticia(response, usuario)
+
+    async def _renderizar(self, request, pk, usuario):
+        noticia, estado = await em_paralelo(
+            # select_related evita buscas extras no template
+            lambda: Noticia.objects.select_related('autor', 'categoria').filter(pk=pk).first(),
+            lambda: estado_interacoes(usuario),
+        )
+        if noticia is None:  # Removida entre as duas consultas
+            raise Http404("Notícia não encontrada.")
+        anotar_interacoes([noticia], estado)
+
+        context = {
+            'noticia': noticia,
+            'usuario_curtiu': noticia.usuario_curtiu,
+            'usuario_salvou': noticia.usuario_salvou,
+        }
+        return await sync_to_async(render)(request, self.template_name, context)
 
 
 @require_POST
@@ -225,34 +286,18 @@ def toggle_interacao(request, noticia_id, tipo_interacao):
     if tipo_interacao not in ['CURTIDA', 'SALVAMENTO']:
         return HttpResponseBadRequest("Tipo de interação inválido.")
 
-    noticia = get_object_or_404(Noticia, id=noticia_id)
+    noticia = get_object_or_404(Noticia.objects.only('pk'), id=noticia_id)
     usuario = request.user
-    
-    interacao, created = InteracaoNoticia.objects.get_or_create(
-        usuario=usuario,
-        noticia=noticia,
-        tipo=tipo_interacao
-    )
 
-    if not created:
-        interacao.delete()
-        acao_realizada = 'removida'
-        status_interacao = False
-    else:
-        acao_realizada = 'adicionada'
-        status_interacao = True
-    
-    if tipo_interacao == 'CURTIDA':
-        noticia.curtidas_count = noticia.interacoes.filter(tipo='CURTIDA').count()
-    elif tipo_interacao == 'SALVAMENTO':
-        noticia.salvamentos_count = noticia.interacoes.filter(tipo='SALVAMENTO').count()
-    noticia.save()
+    # Insere/remove a interação e aplica o delta no contador na mesma transação
+    status_interacao, nova_contagem = alternar_interacao(usuario, noticia.pk, tipo_interacao)
+    acao_realizada = 'adicionada' if status_interacao else 'removida'
 
     if request.headers.get('x-requested-with') == 'XMLHttpRequest':
         return JsonResponse({
             'success': True,
             'acao': acao_realizada,
-            'nova_contagem': getattr(noticia, f'{tipo_interacao.lower()}s_count'),
+            'nova_contagem': nova_contagem,
             'status_interacao': status_interacao,
             'tipo': tipo_interacao.lower()
         })
@@ -260,6 +305,7 @@ def toggle_interacao(request, noticia_id, tipo_interacao):
     return redirect(request.META.get('HTTP_REFERER', '/'))
 
 
+@orcamento_consultas(15)
 @login_required
 @require_POST
 def curtir_noticia(request, noticia_id):
@@ -267,6 +313,7 @@ def curtir_noticia(request, noticia_id):
     return toggle_interacao(request, noticia_id, 'CURTIDA')
 
 
+@orcamento_consultas(15)
 @login_required
 @require_POST
 def salvar_noticia(request, noticia_id):
@@ -274,65 +321,251 @@ def salvar_noticia(request, noticia_id):
     return toggle_interacao(request, noticia_id, 'SALVAMENTO')
 
 
+# ===============================================
+# Feed paginado ("Ver mais")
+# ===============================================
+
+@orcamento_consultas(8)
+@le_da_replica
+@login_required
+def feed_noticias(request, fonte, categoria_id=None):
+    """
+    Próxima página de notícias para o "Ver mais" / rolagem infinita.
+
+    Fontes: recomendadas, urgentes ou categoria. A paginação é por cursor
+    (?cursor=...), nunca por OFFSET. Devolve um fragmento HTML com os cards
+    (próximo cursor no cabeçalho X-Proximo-Cursor) ou, com ?formato=json,
+    um JSON compacto.
+    """
+    if fonte == 'recomendadas':
+        noticias = fonte_recomendadas(request.user)
+    elif fonte == 'urgentes':
+        noticias = fonte_urgentes()
+    elif fonte == 'categoria':
+        noticias = fonte_categoria(categoria_id)
+    else:
+        raise Http404("Fonte de notícias desconhecida.")
+
+    try:
+        limite = int(request.GET.get('limite', NOTICIAS_POR_PAGINA))
+    except ValueError:
+        limite = NOTICIAS_POR_PAGINA
+
+    noticias, proximo_cursor = pagina(noticias, cursor=request.GET.get('cursor'), limite=limite)
+    anotar_interacoes(noticias, estado_interacoes(request.user))
+
+    if request.GET.get('formato') == 'json':
+        return JsonResponse({
+            'noticias': [
+                {
+                    'id': noticia.pk,
+                    'titulo': noticia.titulo,
+                    'categoria': noticia.categoria.nome if noticia.categoria else None,
+                    'data': noticia.data_publicacao.isoformat(),
+                    'imagem': noticia.imagem.url if noticia.imagem else None,
+                    'curtiu': noticia.usuario_curtiu,
+                    'salvou': noticia.usuario_salvou,
+                }
+                for noticia in noticias
+            ],
+            'proximo_cursor': proximo_cursor,
+        })
+
+    response = render(request, 'Echo_app/feed_fragmento.html', {'noticias': noticias})
+    response['X-Proximo-Cursor'] = proximo_cursor or ''
+    return response
+
+
+# ===============================================
+# Busca
+# ===============================================
+
+@orcamento_consultas(7)
+def buscar_noticias(request):
+    """
+    Busca notícias por texto (titulo e conteudo), ordenadas por relevância.
+
+    Parâmetros GET: q (termo), categoria (id, opcional) e cursor (próxima
+    página). Requisições AJAX recebem JSON; as demais, a página de resultados.
+    """
+    termo = request.GET.get('q', '').strip()
+    cursor = request.GET.get('cursor') or None
+    try:
+        categoria_id = int(request.GET['categoria'])
+    except (KeyError, ValueError):
+        categoria_id = None
+
+    noticias, proximo_cursor = buscar(termo, categoria_id=categoria_id, cursor=cursor) if termo else ([], None)
+    if noticias:
+        anotar_interacoes(noticias, estado_interacoes(request.user))
+
+    if request.headers.get('x-requested-with') == 'XMLHttpRequest':
+        return JsonResponse({
+            'resultados': [
+                {
+                    'id': noticia.pk,
+                    'titulo': noticia.titulo,
+                    'categoria': noticia.categoria.nome if noticia.categoria else None,
+                    'data_publicacao': noticia.data_publicacao.isoformat(),
+                    'url': reverse('noticia_detalhe', args=[noticia.pk]),
+                }
+                for noticia in noticias
+            ],
+            'proximo_cursor': proximo_cursor,
+        })
+
+    context = {
+        'termo': termo,
+        'categoria_id': categoria_id,
+        'todas_categorias': Categoria.objects.all(),
+        'noticias': noticias,
+        'proximo_cursor': proximo_cursor,
+    }
+    return render(request, 'Echo_app/busca.html', context)
+
+
 # ===============================================
 # Parte das Notificações (Oliver)
 # ===============================================
 
+NOTIFICACOES_POR_PAGINA = 20
+MAXIMO_IDS_POR_MARCACAO = 500  # Limite de ids aceitos num único "marcar como lidas"
+
+
+@orcamento_consultas(5)
 @login_required
 def lista_notificacoes(request):
     """
-    Exibe a lista de notificações do usuário.
+    Exibe as notificações do usuário, da mais recente para a mais antiga,
+    paginadas por cursor (?cursor=...). O total de não lidas vem do contador
+    do perfil (context processor), sem COUNT.
     """
-    notificacoes = Notificacao.objects.filter(usuario=request.user)
-    nao_lidas_count = notificacoes.filter(lida=False).count()
-    
+    notificacoes, proximo_cursor = pagina(
+        Notificacao.objects.filter(usuario=request.user),
+        cursor=request.GET.get('cursor'),
+        limite=NOTIFICACOES_POR_PAGINA,
+        campo='data_criacao',
+    )
+
     context = {
         'notificacoes': notificacoes,
-        'nao_lidas_count': nao_lidas_count
+        'proximo_cursor': proximo_cursor,
     }
     return render(request, 'Echo_app/lista_notificacoes.html', context)
 
+
+@orcamento_consultas(4)
 @login_required
-@require_POST 
-def marcar_notificacao_lida(request, notificacao_id):   
+async def eventos_notificacoes(request):
+    """
+    Stream SSE (text/event-stream) com as notificações novas e o contador
+    de não lidas do usuário (ver Echo_app/eventos.py). Só faz sentido sob
+    ASGI: no WSGI cada conexão prenderia uma thread, então responde 204,
+    que faz o EventSource desistir de reconectar.
+    """
+    if not isinstance(request, ASGIRequest):
+        return HttpResponse(status=204)
+
+    usuario = await request.auser()
+    try:
+        ultimo_id = int(request.headers['Last-Event-ID'])
+    except (KeyError, ValueError):
+        ultimo_id = None
+
+    response = StreamingHttpResponse(fluxo(usuario.pk, ultimo_id), content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'  # nginx: não acumular o stream
+    return response
+
+
+def _resposta_marcacao(request, marcadas):
+    """JSON para requisições AJAX; senão volta para a lista de notificações."""
+    if request.headers.get('x-requested-with') == 'XMLHttpRequest':
+        return JsonResponse({
+            'success': True,
+            'marcadas': marcadas,
+            'nao_lidas': nao_lidas(request.user.pk),
+        })
+    return redirect('lista_notificacoes')
+
+
+@orcamento_consultas(8)
+@login_required
+@require_POST
+def marcar_notificacao_lida(request, notificacao_id):
     """
     Marca uma notificação específica como lida.
     """
-    notificacao = get_object_or_404(Notificacao, id=notificacao_id, usuario=request.user)
-    notificacao.marcar_como_lida()
-    return redirect('lista_notificações')
+    marcadas = marcar_lidas(request.user.pk, [notificacao_id])
+    if not marcadas and not Notificacao.objects.filter(pk=notificacao_id, usuario=request.user).exists():
+        raise Http404("Notificação não encontrada.")
+    return _resposta_marcacao(request, marcadas)
+
+
+@orcamento_consultas(8)
+@login_required
+@require_POST
+def marcar_notificacoes_lidas(request):
+    """
+    Marca como lidas, num único UPDATE, as notificações enviadas em `ids`
+    (POST, repetido: ids=1&ids=2...).
+    """
+    try:
+        ids = [int(valor) for valor in request.POST.getlist('ids')]
+    except ValueError:
+        return HttpResponseBadRequest("Ids de notificação inválidos.")
+    if len(ids) > MAXIMO_IDS_POR_MARCACAO:
+        return HttpResponseBadRequest(f"Envie no máximo {MAXIMO_IDS_POR_MARCACAO} notificações por vez.")
 
+    marcadas = marcar_lidas(request.user.pk, ids) if ids else 0
+    return _resposta_marcacao(request, marcadas)
+
+
+@orcamento_consultas(8)
 @login_required
 @require_POST
 def marcar_todas_lidas(request):
     """
     Marca todas as notificações não lidas do usuário como lidas.
     """
-    Notificacao.objects.filter(usuario=request.user, lida=False).update(lida=True)
-    return redirect('lista_notificacoes')
+    return _resposta_marcacao(request, marcar_lidas(request.user.pk))
+
+
+NOTICIAS_URGENTES = 2
+MAXIMO_RECOMENDADAS = 10 + Noticia.VIZINHAS  # Feed + filtragem colaborativa (ver Noticia.recomendar_para)
+
+
+@orcamento_consultas(11)
+@le_da_replica
 @login_required
-def dashboard(request):
+async def dashboard(request):
     """
     Exibe a página principal para o usuário logado, incluindo
     notícias recomendadas e suas categorias de interesse.
+
+    Perfil, categorias, recomendadas e urgentes não dependem umas das
+    outras: são buscadas ao mesmo tempo (ver Echo_app/concorrencia.py).
     """
-    user = request.user
-    categorias_interesse = []
+    user = await _usuario_da_requisicao(request)
+
+    # Urgentes: as primeiras do ranking em alta (Echo_app/em_alta.py) que não
+    # estão entre as recomendadas. Busca candidatas suficientes para cobrir
+    # todas as recomendadas e filtra aqui, sem esperar por elas
+    versao, categorias_interesse, noticias_recomendadas, candidatas_urgentes = await em_paralelo(
+        lambda: versao_do_estado(user.pk),  # None: sem perfil
+        lambda: list(Categoria.objects.filter(perfis_interessados__usuario=user)),
+        lambda: list(Noticia.recomendar_para(user)),
+        lambda: Noticia.em_alta(NOTICIAS_URGENTES + MAXIMO_RECOMENDADAS),
+    )
+    perfil_existe = versao is not None
+    estado = await sync_to_async(estado_interacoes)(user, versao or 0)  # Curtiu/salvou de cada card, em geral do cache
+    recomendadas = {noticia.pk for noticia in noticias_recomendadas}
+    noticias_urgentes = [noticia for noticia in candidatas_urgentes if noticia.pk not in recomendadas][:NOTICIAS_URGENTES]  # O template indexa .0, .1, ...
+    anotar_interacoes(noticias_recomendadas + noticias_urgentes, estado)
 
-    # Tenta buscar o perfil do usuário e suas categorias de interesse
-    try:
-        perfil = user.perfil 
-        categorias_interesse = perfil.categorias_de_interesse.all()
-    except PerfilUsuario.DoesNotExist:
-        perfil, created = PerfilUsuario.objects.get_or_create(usuario=user)
-    
-    # Adicionando Notícias Urgentes (Exemplo: as 2 mais recentes, exceto as recomendadas)
-    noticias_recomendadas = Noticia.recomendar_para(user)
-    
-    # 🚨 NOVO: BUSCA NOTÍCIAS URGENTES 🚨
-    # Buscamos as 2 notícias mais recentes que não estão na lista de recomendadas
-    noticias_urgentes = Noticia.objects.exclude(pk__in=noticias_recomendadas.values_list('pk', flat=True)).order_by('-data_publicacao')[:2]
-    # ----------------------------------
+    if not perfil_existe:
+        # Se o perfil não existir por algum motivo, cria um
+        await PerfilUsuario.objects.aget_or_create(usuario=user)
 
     # Monta o contexto para enviar ao template
     context = {
@@ -340,9 +573,10 @@ def dashboard(request):
         "email": user.email,
         "noticias_recomendadas": noticias_recomendadas,
         "categorias_interesse": categorias_interesse,
-        # 🚨 NOVO: ADICIONA NOTÍCIAS URGENTES AO CONTEXTO 🚨
-        "noticias_urgentes": noticias_urgentes 
-        # ------------------------------------------------
+        "noticias_urgentes": noticias_urgentes,
+        # Cursores do "Ver mais": continuam depois do que já está na tela
+        "cursor_recomendadas": codificar_cursor(noticias_recomendadas[0]) if noticias_recomendadas else '',
+        "cursor_urgentes": '',  # O ranking não segue a data: o "Ver mais" começa pelas mais recentes
     }
-    
-    return render(request, "Echo_app/dashboard.html", context)
\ No newline at end of file
+
+    return await sync_to_async(render)(request, "Echo_app/dashboard.html", context)
@@ -23,8 +23,16 @@ if NOT_PROD:
         'default': {
             'ENGINE': 'django.db.backends.sqlite3',
             'NAME': BASE_DIR / 'db.sqlite3',
-        }
+        },
+        # Réplica local: o mesmo arquivo, somente leitura (escrita nela é erro).
+        # Nos testes, espelho do banco de teste
+        'replica_1': {
+            'ENGINE': 'django.db.backends.sqlite3',
+            'NAME': f"file:{BASE_DIR / 'db.sqlite3'}?mode=ro",
+            'TEST': {'MIRROR': 'default'},
+        },
     }
+    BANCOS_REPLICAS = ['replica_1'] if os.getenv('REPLICAS_LOCAIS', '0').lower() in ['true', 't', '1'] else []
 else:
     SECRET_KEY = os.getenv('SECRET_KEY')
     DEBUG = os.getenv('DEBUG', '0').lower() in ['true', 't', '1']
@@ -45,9 +53,25 @@ else:
             'USER': os.environ.get('DBUSER'),
             'PASSWORD': os.environ.get('DBPASS'),
             'OPTIONS': {'sslmode': 'require'},
+            # Conexões persistentes: as threads de consultas concorrentes
+            # (Echo_app/concorrencia.py) reaproveitam a sua entre requisições
+            'CONN_MAX_AGE': int(os.getenv('DB_CONN_MAX_AGE', '60')),
+            'CONN_HEALTH_CHECKS': True,
         }
     }
-    
+    # Réplicas de leitura: mesmas credenciais, outro host (DBREPLICAS="host1 host2")
+    BANCOS_REPLICAS = []
+    for numero, host in enumerate(os.getenv('DBREPLICAS', '').split(), start=1):
+        DATABASES[f'replica_{numero}'] = {**DATABASES['default'], 'HOST': host, 'TEST': {'MIRROR': 'default'}}
+        BANCOS_REPLICAS.append(f'replica_{numero}')
+
+# Leituras das views marcadas com @le_da_replica nas réplicas (Echo_app/replicas.py).
+# Depois de uma escrita, o navegador lê do primário por REPLICAS_JANELA_PRIMARIO
+# segundos; réplicas mais atrasadas que isso ficam de fora
+DATABASE_ROUTERS = ['Echo_app.replicas.RoteadorReplicas']
+REPLICAS_JANELA_PRIMARIO = int(os.getenv('REPLICAS_JANELA_PRIMARIO', '5'))
+REPLICAS_VERIFICACAO = 10  # Segundos entre verificações de saúde de cada réplica, por processo
+
 # Application definition
 
 
@@ -64,13 +88,16 @@ INSTALLED_APPS = [
 
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
+    'whitenoise.middleware.WhiteNoiseMiddleware',  # Estáticos e mídia antes do resto: não usam sessão nem banco
+    'Echo_app.midia.MidiaMiddleware',
+    'Echo_app.orcamento.OrcamentoConsultasMiddleware',  # Conta consultas por view (ver Echo_app/orcamento.py)
+    'Echo_app.replicas.ReplicasMiddleware',  # Leituras nas réplicas; antes das sessões, para ver a escrita delas
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
-    'whitenoise.middleware.WhiteNoiseMiddleware',
 ]
 TEMPLATES = [
     {
@@ -84,6 +111,7 @@ TEMPLATES = [
                 'django.template.context_processors.request',
                 'django.contrib.auth.context_processors.auth',
                 'django.contrib.messages.context_processors.messages',
+                'Echo_app.context_processors.notificacoes',
             ],
         },
     },
@@ -93,8 +121,89 @@ ROOT_URLCONF = 'Echoproject.urls'
 STATIC_URL = os.environ.get('DJANGO_STATIC_URL', "/static/")
 STATIC_ROOT = os.path.join(BASE_DIR, 'staticfiles')
 
-STATICFILES_STORAGE = ('whitenoise.storage.CompressedManifestStaticFilesStorage')
+# STATICFILES_STORAGE deixou de existir no Django 5.1. Em produção, estáticos
+# com hash no nome (cache immutable pelo WhiteNoise); em dev, sem manifest.
+# Uploads com hash do conteúdo no nome (Echo_app/midia.py)
+STORAGES = {
+    'default': {'BACKEND': 'Echo_app.midia.ArmazenamentoMidia'},
+    'staticfiles': {
+        'BACKEND': 'django.contrib.staticfiles.storage.StaticFilesStorage' if NOT_PROD
+        else 'whitenoise.storage.CompressedManifestStaticFilesStorage',
+    },
+}
+
+# Cache (fragmentos de template, estado das interações, ranking em alta e
+# categorias do cadastro). CACHE_URL aponta para um Redis compartilhado entre
+# os workers (pacote `redis`, em requirements.txt). Com mais de um worker ela
+# é obrigatória: o cache local é de cada processo, e a invalidação feita num
+# worker não chega aos outros. Sem ela, só para dev (um processo).
+if os.getenv('CACHE_URL'):
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': os.getenv('CACHE_URL'),
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        }
+    }
 
 MEDIA_URL = '/media/'
 MEDIA_ROOT = BASE_DIR / 'media'
-LOGIN_URL = 'entrar'
\ No newline at end of file
+# Como servir a mídia (Echo_app/midia.py): 'python' no processo (Range, sendfile
+# do gunicorn), 'x-accel' pelo nginx (location interna MIDIA_ACCEL_PREFIXO) ou
+# 'x-sendfile' pelo Apache
+MIDIA_ENVIO = os.getenv('MIDIA_ENVIO', 'python')
+MIDIA_ACCEL_PREFIXO = '/_midia/'
+MIDIA_MAX_AGE = 3600  # Cache dos arquivos sem hash no nome (enviados antes do ArmazenamentoMidia)
+LOGIN_URL = 'entrar'
+
+# Sessões no banco com escrita só do que mudou e cache de leitura local só
+# para sessões anônimas (Echo_app/sessoes.py): as logadas são sempre lidas
+# do banco, para que um logout em outro processo valha na hora
+SESSION_ENGINE = 'Echo_app.sessoes'
+SESSOES_CACHE_SEGUNDOS = int(os.getenv('SESSOES_CACHE_SEGUNDOS', '5'))
+SESSOES_RENOVACAO = 24 * 3600  # Com SESSION_SAVE_EVERY_REQUEST: renova a validade no banco no máximo 1x por dia
+
+# Orçamento de consultas: com True, views acima do orçamento ou com N+1 geram erro
+ORCAMENTO_CONSULTAS_ESTRITO = False
+# Com True, as respostas informam o total de consultas no cabeçalho X-Consultas (`manage.py loadtest`)
+ORCAMENTO_CABECALHO = os.getenv('ORCAMENTO_CABECALHO', '0').lower() in ['true', 't', '1']
+
+# Admin (Echo_app/admin.py): acima de tantas linhas estimadas pelo banco, as
+# changelists das tabelas grandes mostram a estimativa em vez do COUNT(*)
+ADMIN_CONTAGEM_EXATA_ATE = 10000
+
+# Leituras independentes das views assíncronas em paralelo (Echo_app/concorrencia.py).
+# Cada thread do pool mantém uma conexão aberta com o banco, por processo.
+CONSULTAS_CONCORRENTES = os.getenv('CONSULTAS_CONCORRENTES', '1').lower() in ['true', 't', '1']
+CONSULTAS_CONCORRENTES_THREADS = int(os.getenv('CONSULTAS_CONCORRENTES_THREADS', '8'))
+
+# Stream de notificações (Echo_app/eventos.py): de quanto em quanto tempo (s)
+# cada processo busca no banco as novidades vindas de outros processos, e
+# o intervalo dos comentários de keep-alive
+EVENTOS_INTERVALO = float(os.getenv('EVENTOS_INTERVALO', '2'))
+EVENTOS_KEEPALIVE = 15
+# Por quantos segundos o vigia relê os ids já vistos: notificações com id menor
+# que outro já visto (commit fora de ordem) ainda chegam nesse prazo
+EVENTOS_JANELA_ATRASO = 30
+
+# Pontuação de interesses (Echo_app/interesses.py): segundos que os deltas das
+# curtidas/salvamentos ficam acumulados antes do upsert em lote (0 = na hora)
+INTERESSES_INTERVALO = float(os.getenv('INTERESSES_INTERVALO', '5'))
+
+# Notícias em alta (Echo_app/em_alta.py): por quantos segundos o ranking
+# compartilhado fica no cache antes de ser recalculado
+EM_ALTA_INTERVALO = int(os.getenv('EM_ALTA_INTERVALO', '60'))
+
+# Ciclo de vida dos dados (Echo_app/retencao.py): `podar_notificacoes` apaga as
+# notificações lidas mais antigas que isso; `arquivar_interacoes` resume as
+# curtidas e salvamentos das notícias publicadas há mais tempo que isso
+NOTIFICACOES_RETENCAO_DIAS = int(os.getenv('NOTIFICACOES_RETENCAO_DIAS', '90'))
+INTERACOES_ARQUIVO_DIAS = int(os.getenv('INTERACOES_ARQUIVO_DIAS', '365'))
+# Só no PostgreSQL: InteracaoNoticia e Notificacao particionadas por mês
+# (`criar_particoes --converter` uma vez; depois `criar_particoes` todo mês)
+PARTICIONAR_TABELAS = os.getenv('PARTICIONAR_TABELAS', '0').lower() in ['true', 't', '1']
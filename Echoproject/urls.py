@@ -1,10 +1,13 @@
 # Echoproject/urls.py
 
 from django.contrib import admin
-from django.urls import path, include
+from django.urls import path, include, re_path
 # --- NOVOS IMPORTS ---
+import re
+
 from django.conf import settings
-from django.conf.urls.static import static
+
+from Echo_app.midia import servir_midia
 # --- FIM DOS NOVOS IMPORTS ---
 
 urlpatterns = [
@@ -15,7 +18,10 @@ urlpatterns = [
 ]
 
 # --- BLOCO ADICIONADO ---
-# Adiciona as URLs para servir ficheiros de media APENAS em modo DEBUG
-if settings.DEBUG:
-    urlpatterns += static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
+# Ficheiros de media em todos os ambientes. Normalmente o MidiaMiddleware
+# responde antes; a rota fica para os 404 e para quando ele estiver desligado
+if settings.MEDIA_URL.startswith('/'):
+    urlpatterns += [
+        re_path(rf"^{re.escape(settings.MEDIA_URL.lstrip('/'))}(?P<caminho>.+)$", servir_midia, name='midia'),
+    ]
 # --- FIM DO BLOCO ADICIONADO ---
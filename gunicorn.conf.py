@@ -0,0 +1,36 @@
+# Echo/gunicorn.conf.py
+
+"""
+Configuração do gunicorn (lida automaticamente ao rodar `gunicorn` na raiz).
+
+    ECHO_SERVIDOR=wsgi gunicorn    # workers síncronos (uma requisição por worker)
+    ECHO_SERVIDOR=asgi gunicorn    # workers uvicorn: views assíncronas, várias requisições por worker
+
+Para comparar os dois modos, veja `python manage.py benchmark_views --help`.
+
+Com mais de um worker, defina CACHE_URL (Redis; ver Echoproject/settings.py):
+sem ela cada worker tem o seu cache e não vê as invalidações dos outros.
+"""
+
+import multiprocessing
+import os
+
+SERVIDOR = os.getenv('ECHO_SERVIDOR', 'asgi')
+
+bind = os.getenv('GUNICORN_BIND', '0.0.0.0:8000')
+workers = int(os.getenv('GUNICORN_WORKERS', multiprocessing.cpu_count() * 2 + 1))
+timeout = int(os.getenv('GUNICORN_TIMEOUT', '30'))
+keepalive = 5
+accesslog = '-'
+
+if SERVIDOR == 'asgi':
+    wsgi_app = 'Echoproject.asgi:application'
+    worker_class = 'uvicorn_worker.UvicornWorker'
+else:
+    wsgi_app = 'Echoproject.wsgi:application'
+    worker_class = 'sync'
+
+
+def on_starting(server):
+    if workers > 1 and not os.getenv('CACHE_URL'):
+        server.log.warning("%s workers sem CACHE_URL: cada um com o seu cache local, sem as invalidações dos outros.", workers)